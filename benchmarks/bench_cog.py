@@ -0,0 +1,117 @@
+# benchmarks/bench_cog.py
+"""
+Measure windowed and overview read times before and after COG transcoding.
+
+Synthetic scenes are written as compressed, striped GeoTIFFs without overviews
+and as JPEG2000, the way assets may be stored as published. Random windows and an
+overview are read through DataAccessLayer, the files are transcoded with
+COGTranscoder, and the reads are repeated. Results are printed as JSON.
+
+Usage:
+    python benchmarks/bench_cog.py --size 4096 --window 512 --reads 20
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import rasterio
+from omegaconf import DictConfig
+from pystac import Item
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+
+from eo_data_pipeline.data_access.access_layer import DataAccessLayer
+from eo_data_pipeline.data_loader.cog import COGTranscoder
+
+# Band -> (driver, creation options) of the files as published
+SOURCES = {
+    "blue": ("GTiff", {"compress": "deflate"}),
+    "blue-jp2": ("JP2OpenJPEG", {}),
+}
+
+
+def write_scene(path, driver, options, size):
+    # Smooth field plus noise, compressible like reflectances
+    y, x = np.mgrid[0:size, 0:size]
+    rng = np.random.default_rng(0)
+    data = (2000 + 1000 * np.sin(x / 200) * np.cos(y / 300)).astype("uint16")
+    data += rng.integers(0, 200, data.shape, dtype="uint16")
+    with rasterio.open(
+        path,
+        "w",
+        driver=driver,
+        dtype="uint16",
+        count=1,
+        width=size,
+        height=size,
+        crs="EPSG:32633",
+        transform=from_origin(399960, 5100000, 10, 10),
+        **options,
+    ) as dst:
+        dst.write(data, 1)
+
+
+def timed_reads(path, size, window, reads):
+    rng = np.random.default_rng(1)
+    access = DataAccessLayer(path)
+    start = time.perf_counter()
+    for _ in range(reads):
+        col, row = rng.integers(0, size - window, 2)
+        access.load_data(window=Window(col, row, window, window))
+    window_s = (time.perf_counter() - start) / reads
+    start = time.perf_counter()
+    with rasterio.open(path) as src:
+        has_overviews = bool(src.overviews(1))
+    if has_overviews:
+        access.load_data(overview_level=1)
+    else:
+        # Without overviews, a decimated read decodes the full resolution image
+        with rasterio.open(path) as src:
+            src.read(1, out_shape=(size // 4, size // 4))
+    overview_s = time.perf_counter() - start
+    return {
+        "window_read_ms": round(window_s * 1000, 2),
+        "overview_read_ms": round(overview_s * 1000, 2),
+        "size_mb": round(os.path.getsize(path) / 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--size", type=int, default=4096)
+    parser.add_argument("--window", type=int, default=512)
+    parser.add_argument("--reads", type=int, default=20)
+    parser.add_argument("--codec", default="DEFLATE")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    item = Item("scene", None, None, datetime(2023, 1, 1), {})
+    for band, (driver, options) in SOURCES.items():
+        write_scene(os.path.join(root, f"scene_{band}.tif"), driver, options, args.size)
+
+    results = {}
+    for band, (driver, _) in SOURCES.items():
+        path = os.path.join(root, f"scene_{band}.tif")
+        results[driver] = {
+            "before": timed_reads(path, args.size, args.window, args.reads)
+        }
+
+    config = DictConfig({"storage": {"path": root}, "cog": {"codec": args.codec}})
+    start = time.perf_counter()
+    COGTranscoder(config).transcode([item], list(SOURCES))
+    transcode_s = time.perf_counter() - start
+
+    for band, (driver, _) in SOURCES.items():
+        path = os.path.join(root, f"scene_{band}.tif")
+        results[driver]["after"] = timed_reads(path, args.size, args.window, args.reads)
+    results["transcode_s"] = round(transcode_s, 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
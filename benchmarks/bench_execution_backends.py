@@ -0,0 +1,112 @@
+# benchmarks/bench_execution_backends.py
+"""
+Measure asset download throughput of the execution backends by number of workers.
+
+A local stand-in object store, running in a separate process, serves synthetic
+asset files with a fixed latency per request to mimic the time to first byte of
+S3. For each backend and worker count, all (item, band) assets are loaded with
+AssetExecutor into a fresh directory and the throughput is printed as JSON.
+
+Usage:
+    python benchmarks/bench_execution_backends.py --items 32 --workers 1 2 4 8 16
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from omegaconf import DictConfig
+from pystac import Item
+
+from eo_data_pipeline.pipeline.execution import AssetExecutor
+from eo_data_pipeline.testing.servers import (
+    LocalAssetServer,
+    make_catalog,
+    serve_in_process,
+)
+
+BANDS = ["blue", "green", "red", "nir"]
+
+
+def timed_load(root, items, backend, workers):
+    config = DictConfig(
+        {
+            "storage": {
+                "path": tempfile.mkdtemp(dir=root),
+                "catalog_path": tempfile.mkdtemp(dir=root),
+            },
+            "execution": {"backend": backend, "max_workers": workers},
+        }
+    )
+    with AssetExecutor(config) as executor:
+        # Start worker processes before timing, like a long-running flow would
+        executor.start()
+        start = time.perf_counter()
+        saved_files = executor.load(items, BANDS)
+        seconds = time.perf_counter() - start
+    return seconds, len(saved_files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=32)
+    parser.add_argument("--size-mb", type=float, default=1.0)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--backends", nargs="+", default=["thread", "process"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        remote = os.path.join(root, "remote")
+        os.makedirs(remote)
+        size = int(args.size_mb * 1024**2)
+
+        with serve_in_process(LocalAssetServer, remote, latency=args.latency) as server:
+            items = [
+                Item.from_dict(item)
+                for item in make_catalog(
+                    args.items,
+                    [14.0, 46.0, 14.5, 46.5],
+                    bands=BANDS,
+                    asset_url=server.url,
+                )
+            ]
+            for item in items:
+                for band in BANDS:
+                    with open(os.path.join(remote, f"{item.id}_{band}.tif"), "wb") as f:
+                        f.write(os.urandom(size))
+
+            results = {}
+            for backend in args.backends:
+                runs = []
+                for workers in args.workers:
+                    seconds, count = timed_load(root, items, backend, workers)
+                    runs.append(
+                        {
+                            "workers": workers,
+                            "seconds": round(seconds, 3),
+                            "assets_per_s": round(count / seconds, 1),
+                            "mb_per_s": round(count * args.size_mb / seconds, 1),
+                        }
+                    )
+                for run in runs:
+                    run["speedup"] = round(runs[0]["seconds"] / run["seconds"], 2)
+                results[backend] = runs
+
+    print(
+        json.dumps(
+            {
+                "assets": args.items * len(BANDS),
+                "asset_mb": args.size_mb,
+                "latency_s": args.latency,
+                "backends": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/bench_partitioned_search.py
+"""
+Compare a single STAC search with a partitioned, concurrent search.
+
+A local stand-in STAC API, running in a separate process, serves a synthetic
+catalog of Sentinel-2 items on a regular grid of tiles over a continental AOI,
+with a fixed latency per request to mimic the query cost of Earth Search. Both
+search strategies are timed and the results are printed as JSON.
+
+Usage:
+    python benchmarks/bench_partitioned_search.py --tiles-x 10 --tiles-y 5 --dates 60
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from omegaconf import DictConfig
+
+from eo_data_pipeline.data_fetcher.fetcher import DataFetcher
+from eo_data_pipeline.testing.servers import LocalStacAPI, make_item, serve_in_process
+
+
+def synthetic_catalog(aoi, tiles_x, tiles_y, dates, revisit_days):
+    lon_min, lat_min, lon_max, lat_max = aoi
+    width = (lon_max - lon_min) / tiles_x
+    height = (lat_max - lat_min) / tiles_y
+    first = datetime(2022, 1, 1, 10, tzinfo=timezone.utc)
+    items = []
+    for d in range(dates):
+        for ty in range(tiles_y):
+            for tx in range(tiles_x):
+                bbox = [
+                    lon_min + tx * width,
+                    lat_min + ty * height,
+                    lon_min + (tx + 1) * width,
+                    lat_min + (ty + 1) * height,
+                ]
+                items.append(
+                    make_item(
+                        f"S2A_{tx:02d}{ty:02d}_{d:04d}",
+                        first + timedelta(days=d * revisit_days),
+                        bbox,
+                        ["blue", "nir"],
+                        cloud_cover=float((tx + ty + d) % 20),
+                    )
+                )
+    return items
+
+
+def timed_fetch(url, time_range, aoi, **earth_search):
+    fetcher = DataFetcher(DictConfig({"earth_search": {"url": url, **earth_search}}))
+    start = time.perf_counter()
+    items = fetcher.fetch_data(time_range, aoi, ["blue", "nir"])
+    return time.perf_counter() - start, len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tiles-x", type=int, default=10)
+    parser.add_argument("--tiles-y", type=int, default=5)
+    parser.add_argument("--dates", type=int, default=60)
+    parser.add_argument("--revisit-days", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--tile-size", type=float, default=10.0)
+    parser.add_argument("--partition-days", type=int, default=90)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    aoi = [-10.0, 35.0, 30.0, 70.0]
+    end = datetime(2022, 1, 1) + timedelta(days=args.dates * args.revisit_days)
+    time_range = ("2022-01-01", end.strftime("%Y-%m-%d"))
+    items = synthetic_catalog(
+        aoi, args.tiles_x, args.tiles_y, args.dates, args.revisit_days
+    )
+
+    with serve_in_process(LocalStacAPI, items, latency=args.latency) as api:
+        single_seconds, single_count = timed_fetch(
+            api.url, time_range, aoi, page_size=args.page_size
+        )
+    single_requests = api.request_count
+
+    with serve_in_process(LocalStacAPI, items, latency=args.latency) as api:
+        partitioned_seconds, partitioned_count = timed_fetch(
+            api.url,
+            time_range,
+            aoi,
+            page_size=args.page_size,
+            partition_tile_size=args.tile_size,
+            partition_days=args.partition_days,
+            max_concurrent_searches=args.workers,
+        )
+    partitioned_requests = api.request_count
+
+    print(
+        json.dumps(
+            {
+                "catalog_items": len(items),
+                "latency_s": args.latency,
+                "single": {
+                    "seconds": round(single_seconds, 3),
+                    "items": single_count,
+                    "requests": single_requests,
+                },
+                "partitioned": {
+                    "seconds": round(partitioned_seconds, 3),
+                    "items": partitioned_count,
+                    "requests": partitioned_requests,
+                    "workers": args.workers,
+                },
+                "speedup": round(single_seconds / partitioned_seconds, 2),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
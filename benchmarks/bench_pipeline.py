@@ -0,0 +1,233 @@
+# benchmarks/bench_pipeline.py
+"""
+Run the whole pipeline against a local stand-in of Earth Search and time each stage.
+
+A stand-in STAC API and a stand-in object store, each running in a separate
+process with a configurable latency per request, serve a synthetic catalog
+whose assets are cloud-optimized GeoTIFFs. The stages of ``eo_pipeline``
+(fetch, save_metadata, load_data and process_data) are then run one after the
+other with the same code as the Prefect flow, and throughput, peak memory and
+per-stage timings are printed as JSON for regression tracking.
+
+Usage:
+    python benchmarks/bench_pipeline.py --items 50 --bands 4 --size 1024 --latency 0.05
+"""
+
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import rasterio
+import rasterio.shutil
+from rasterio.io import MemoryFile
+from rasterio.transform import from_origin
+from rasterio.warp import transform_bounds
+
+from eo_data_pipeline.config.config_schema import (
+    Config,
+    EarthSearchConfig,
+    ExecutionConfig,
+    PipelineConfig,
+    ProcessingConfig,
+    StorageConfig,
+    TimeStepsConfig,
+)
+from eo_data_pipeline.pipeline import flow
+from eo_data_pipeline.pipeline.execution import AssetExecutor
+from eo_data_pipeline.testing.servers import (
+    LocalAssetServer,
+    LocalStacAPI,
+    make_item,
+    serve_in_process,
+)
+
+BANDS = ["blue", "green", "red", "nir", "swir16", "swir22", "rededge1", "rededge2"]
+CRS = "EPSG:32633"
+TRANSFORM = from_origin(400000, 5100000, 10, 10)
+
+
+def write_cog(path, size, seed):
+    """Write a single band uint16 COG with noisy, compressible content."""
+    rng = np.random.default_rng(seed)
+    gradient = np.add.outer(np.arange(size), np.arange(size)).astype("uint16")
+    data = gradient + rng.integers(0, 64, (size, size), dtype="uint16")
+    profile = {
+        "driver": "GTiff",
+        "dtype": "uint16",
+        "count": 1,
+        "width": size,
+        "height": size,
+        "crs": CRS,
+        "transform": TRANSFORM,
+        "nodata": 0,
+    }
+    with MemoryFile() as memfile:
+        with memfile.open(**profile) as dst:
+            dst.write(data, 1)
+        with memfile.open() as src:
+            rasterio.shutil.copy(
+                src, path, driver="COG", compress="DEFLATE", blocksize=512
+            )
+
+
+def synthetic_catalog(remote, asset_url, count, bands, size):
+    """
+    Write one COG per band and use it as the asset of every item.
+
+    Returns:
+        tuple: STAC item dictionaries and the AOI covering the assets.
+    """
+    for i, band in enumerate(bands):
+        write_cog(os.path.join(remote, f"{band}.tif"), size, seed=i)
+    aoi = list(
+        transform_bounds(
+            CRS, "EPSG:4326", *rasterio.transform.array_bounds(size, size, TRANSFORM)
+        )
+    )
+
+    items = []
+    first = datetime(2023, 1, 1, 10, tzinfo=timezone.utc)
+    for i in range(count):
+        item = make_item(
+            f"S2A_33TVM_{i:06d}",
+            first + timedelta(days=i),
+            aoi,
+            bands,
+            cloud_cover=float(i % 10),
+            asset_url=asset_url,
+        )
+        for band in bands:
+            os.link(
+                os.path.join(remote, f"{band}.tif"),
+                os.path.join(remote, f"{item['id']}_{band}.tif"),
+            )
+        items.append(item)
+    return items, aoi
+
+
+def peak_rss_mb():
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / 1024, 1)  # ru_maxrss is in KiB on Linux
+
+
+def timed(stages, name, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    stages[name] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_stages(config):
+    """
+    Run the stages of eo_pipeline one after the other and time them.
+
+    Returns:
+        tuple: Per-stage timings, items, saved files and datacubes.
+    """
+    stages = {}
+    timed(stages, "validate", flow.validate_inputs.fn, config)
+    items = timed(stages, "fetch", flow.fetch_data.fn, config)
+    items = timed(stages, "save_metadata", flow.save_metadata.fn, config, items)
+    with AssetExecutor(config) as executor:
+        saved_files = timed(
+            stages, "load_data", flow.load_data.fn, config, items, executor
+        )
+    cubes = timed(
+        stages, "process_data", flow.process_data.fn, config, items, [saved_files]
+    )
+    return stages, items, saved_files, cubes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--bands", type=int, default=4, help=f"At most {len(BANDS)}")
+    parser.add_argument("--size", type=int, default=1024, help="Pixels per side")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--backend", default="thread")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--load-mode", default="full", choices=["full", "clip"])
+    parser.add_argument("--format", default="netcdf", choices=["netcdf", "zarr"])
+    parser.add_argument("--output", help="Also write the results to this file")
+    args = parser.parse_args()
+    bands = BANDS[: args.bands]
+
+    with tempfile.TemporaryDirectory() as root:
+        remote = os.path.join(root, "remote")
+        os.makedirs(remote)
+        with serve_in_process(LocalAssetServer, remote, latency=args.latency) as assets:
+            items, aoi = synthetic_catalog(
+                remote, assets.url, args.items, bands, args.size
+            )
+            with serve_in_process(LocalStacAPI, items, latency=args.latency) as api:
+                config = Config(
+                    earth_search=EarthSearchConfig(
+                        url=api.url, page_size=args.page_size
+                    ),
+                    pipeline=PipelineConfig(
+                        time_steps=TimeStepsConfig(
+                            start="2023-01-01",
+                            end=(
+                                datetime(2023, 1, 1) + timedelta(days=args.items)
+                            ).strftime("%Y-%m-%d"),
+                        ),
+                        aoi=aoi,
+                        spectral_bands=bands,
+                    ),
+                    storage=StorageConfig(
+                        type="local",
+                        path=os.path.join(root, "raw"),
+                        catalog_path=os.path.join(root, "catalog"),
+                        load_mode=args.load_mode,
+                    ),
+                    processing=ProcessingConfig(
+                        output_path=os.path.join(root, "cube"), format=args.format
+                    ),
+                    execution=ExecutionConfig(
+                        backend=args.backend, max_workers=args.workers
+                    ),
+                )
+                start = time.perf_counter()
+                stages, fetched, saved_files, cubes = run_stages(config)
+                total = time.perf_counter() - start
+
+        downloaded_mb = sum(os.path.getsize(path) for path in saved_files) / 1024**2
+        results = {
+            "scale": {
+                "items": args.items,
+                "bands": len(bands),
+                "size": args.size,
+                "asset_mb": round(
+                    os.path.getsize(os.path.join(remote, "blue.tif")) / 1024**2, 3
+                ),
+                "latency_s": args.latency,
+                "backend": args.backend,
+                "workers": args.workers,
+                "load_mode": args.load_mode,
+                "format": args.format,
+            },
+            "items": len(fetched),
+            "files": len(saved_files),
+            "datacubes": len(cubes),
+            "total_s": round(total, 3),
+            "stages_s": stages,
+            "items_per_s": round(len(fetched) / total, 2),
+            "load_mb_per_s": round(downloaded_mb / stages["load_data"], 1),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_startup.py
+"""
+Compare the startup time of the pipeline entry points.
+
+Each entry point is started in a fresh interpreter ``--repeat`` times and the
+median wall time is printed as JSON, together with whether Prefect, rasterio
+and the STAC client were imported. ``run_pipeline_imports`` are the imports
+``scripts/run_pipeline.py`` needed before it could validate anything, while the
+``cli_*`` entries are the commands of ``eo_data_pipeline/cli.py`` that do not
+load any data.
+
+Usage:
+    python benchmarks/bench_startup.py --repeat 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHECK_MODULES = (
+    "import sys; "
+    "print(*[m in sys.modules for m in ('prefect', 'rasterio', 'pystac_client')])"
+)
+
+ENTRY_POINTS = {
+    "run_pipeline_imports": [
+        "-c",
+        "import hydra, eo_data_pipeline.pipeline.flow; " + CHECK_MODULES,
+    ],
+    "flow_import_no_prefect": [
+        "-c",
+        "import os; os.environ['EO_PIPELINE_ENGINE'] = 'local'; "
+        "import eo_data_pipeline.pipeline.flow; " + CHECK_MODULES,
+    ],
+    "cli_validate": [
+        "-c",
+        "from eo_data_pipeline.cli import main; main(['validate']); " + CHECK_MODULES,
+    ],
+    "cli_search_imports": [
+        "-c",
+        "from eo_data_pipeline.cli import main, load_config; "
+        "import eo_data_pipeline.data_fetcher.fetcher; " + CHECK_MODULES,
+    ],
+}
+
+
+def time_entry_point(args, repeat):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, *args],
+            capture_output=True,
+            text=True,
+            check=True,
+            env=dict(os.environ, PYTHONPATH=os.getcwd()),
+        ).stdout
+        seconds.append(time.perf_counter() - start)
+    prefect, rasterio, stac_client = output.split()[-3:]
+    return {
+        "median_s": round(statistics.median(seconds), 3),
+        "min_s": round(min(seconds), 3),
+        "imports_prefect": prefect == "True",
+        "imports_rasterio": rasterio == "True",
+        "imports_stac_client": stac_client == "True",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {
+        name: time_entry_point(entry_args, args.repeat)
+        for name, entry_args in ENTRY_POINTS.items()
+    }
+    baseline = results["run_pipeline_imports"]["median_s"]
+    for result in results.values():
+        result["speedup"] = round(baseline / result["median_s"], 1)
+    print(json.dumps({"repeat": args.repeat, "entry_points": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/bench_transfer.py
+"""
+Compare fixed-size download pools with the adaptive TransferEngine under throttling.
+
+A local stand-in object store, running in a separate process, answers requests
+beyond ``--max-concurrent`` in flight with 503 (SlowDown), like S3 does when a
+prefix is overloaded. All (item, band) assets are loaded with AssetExecutor,
+once with the fixed thread pools of AssetDownloader for each worker count and
+once with the TransferEngine. The number of saved assets, the requests needed
+per asset and the throughput are printed as JSON.
+
+Usage:
+    python benchmarks/bench_transfer.py --items 16 --max-concurrent 6 --workers 4 16
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from omegaconf import DictConfig
+from pystac import Item
+
+from eo_data_pipeline.pipeline.execution import AssetExecutor
+from eo_data_pipeline.testing.servers import (
+    LocalAssetServer,
+    make_catalog,
+    serve_in_process,
+)
+
+BANDS = ["blue", "green", "red", "nir"]
+
+
+def timed_load(root, remote, args, workers=None, transfer=False):
+    with serve_in_process(
+        LocalAssetServer,
+        remote,
+        latency=args.latency,
+        max_concurrent=args.max_concurrent,
+    ) as server:
+        items = [
+            Item.from_dict(item)
+            for item in make_catalog(
+                args.items, [14.0, 46.0, 14.5, 46.5], bands=BANDS, asset_url=server.url
+            )
+        ]
+        config = DictConfig(
+            {
+                "storage": {
+                    "path": tempfile.mkdtemp(dir=root),
+                    "catalog_path": tempfile.mkdtemp(dir=root),
+                    "index": False,
+                },
+                "execution": {"backend": "thread", "max_workers": workers},
+                "transfer": {
+                    "enabled": transfer,
+                    "max_per_host": args.max_per_host,
+                    "backoff_base": 0.05,
+                },
+            }
+        )
+        with AssetExecutor(config) as executor:
+            start = time.perf_counter()
+            saved_files = executor.load(items, BANDS)
+            seconds = time.perf_counter() - start
+            limits = (
+                executor.loader.downloader.limits() if transfer else {"fixed": workers}
+            )
+    assets = args.items * len(BANDS)
+    return {
+        "saved": len(saved_files),
+        "failed": assets - len(saved_files),
+        "seconds": round(seconds, 3),
+        "requests_per_asset": round(server.request_count / assets, 2),
+        "mb_per_s": round(len(saved_files) * args.size_mb / seconds, 1),
+        "final_concurrency": list(limits.values())[0] if limits else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=16)
+    parser.add_argument("--size-mb", type=float, default=1.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--max-concurrent", type=int, default=6)
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--max-per-host", type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        remote = os.path.join(root, "remote")
+        os.makedirs(remote)
+        size = int(args.size_mb * 1024**2)
+        for item in make_catalog(args.items, [14.0, 46.0, 14.5, 46.5], bands=BANDS):
+            for band in BANDS:
+                with open(os.path.join(remote, f"{item['id']}_{band}.tif"), "wb") as f:
+                    f.write(os.urandom(size))
+
+        results = {
+            f"fixed_{workers}": timed_load(root, remote, args, workers=workers)
+            for workers in args.workers
+        }
+        results["adaptive"] = timed_load(root, remote, args, transfer=True)
+
+    print(
+        json.dumps(
+            {
+                "assets": args.items * len(BANDS),
+                "asset_mb": args.size_mb,
+                "latency_s": args.latency,
+                "server_max_concurrent": args.max_concurrent,
+                "runs": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
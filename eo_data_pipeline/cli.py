@@ -0,0 +1,322 @@
+# eo_data_pipeline/cli.py
+"""
+Command line interface of the EO data pipeline.
+
+Each command only imports the modules of the stages it runs: ``validate`` needs
+neither the STAC client, nor rasterio nor Prefect, ``search`` adds the STAC
+client, ``dry-run`` the loader it sends HEAD requests with, and only
+``download``, ``process`` and ``run`` import the flow. With
+``--no-prefect`` the flows run in-process, without starting the Prefect engine.
+
+Usage:
+    eo-pipeline validate pipeline.aoi=[14.0,46.0,14.5,46.5]
+    eo-pipeline search --items
+    eo-pipeline dry-run plan.bandwidth_mbps=500
+    eo-pipeline --no-prefect download --resume
+    eo-pipeline --no-prefect process
+    eo-pipeline run --config job.yaml execution.backend=process
+    eo-pipeline --no-prefect run shard.count=8 shard.index=3
+    eo-pipeline merge shard.count=8
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import sys
+
+from omegaconf import OmegaConf
+
+from eo_data_pipeline.config.config_schema import config_from_dict
+from eo_data_pipeline.data_fetcher.validator import ParameterValidator
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(__file__), "config", "hydra_config.yaml")
+
+
+def load_config(config_file: str = None, overrides: list = ()):
+    """
+    Build the pipeline configuration without Hydra.
+
+    The packaged ``hydra_config.yaml`` is merged with an optional YAML file and
+    ``key=value`` overrides in dot notation, as accepted by
+    ``OmegaConf.from_dotlist``.
+
+    Args:
+        config_file (str, optional): YAML file overriding the defaults.
+        overrides (list): Overrides such as ``execution.backend=process``.
+
+    Returns:
+        Config: The configuration.
+    """
+    config = OmegaConf.load(DEFAULT_CONFIG)
+    config.pop("defaults", None)
+    if config_file:
+        config = OmegaConf.merge(config, OmegaConf.load(config_file))
+    if overrides:
+        config = OmegaConf.merge(config, OmegaConf.from_dotlist(list(overrides)))
+    return config_from_dict(OmegaConf.to_container(config, resolve=True))
+
+
+def _batch_enabled(config) -> bool:
+    return bool(config.batch.aois or config.batch.aoi_file)
+
+
+def search(config) -> dict:
+    """
+    Search the items of a run without loading any of their assets.
+
+    In sharded runs only the items of shard ``shard.index`` are returned, as
+    loaded by the flows on that worker.
+
+    Args:
+        config (Config): Pipeline configuration.
+
+    Returns:
+        dict: The items, the number of searches, the items of each AOI in batch
+        jobs, and the bounding box (or boxes by item id) assets are clipped to.
+    """
+    from eo_data_pipeline.data_fetcher.fetcher import DataFetcher
+
+    time_range = [config.pipeline.time_steps.start, config.pipeline.time_steps.end]
+    fetcher = DataFetcher(config)
+    if not _batch_enabled(config):
+        items = fetcher.fetch_data(
+            time_range, config.pipeline.aoi, config.pipeline.spectral_bands
+        )
+        if config.shard.count > 1:
+            from eo_data_pipeline.pipeline.sharding import shard_items
+
+            # Same items as the flows load on this worker
+            items = shard_items(config, items)
+        return {
+            "items": items,
+            "searches": 1,
+            "aois": None,
+            "bounds": config.pipeline.aoi,
+        }
+
+    from eo_data_pipeline.data_fetcher.aois import (
+        item_bounds,
+        load_aois,
+        merge_aois,
+        search_aois,
+    )
+
+    aois = load_aois(
+        config.batch.aois, config.batch.aoi_file, config.batch.name_property
+    )
+    searches = merge_aois(
+        aois, config.batch.merge_distance, config.batch.max_search_size
+    )
+    items, assigned = search_aois(
+        lambda bbox: fetcher.fetch_data(
+            time_range, bbox, config.pipeline.spectral_bands
+        ),
+        aois,
+        searches,
+    )
+    return {
+        "items": items,
+        "searches": len(searches),
+        "aois": assigned,
+        "bounds": item_bounds(assigned, aois),
+    }
+
+
+def summarize(config, result: dict, list_items: bool = False) -> dict:
+    """
+    Summarize a search result as a JSON-serializable report.
+
+    Args:
+        config (Config): Pipeline configuration.
+        result (dict): Result of search.
+        list_items (bool): Whether to include the ids of the items.
+
+    Returns:
+        dict: Number of items, searches and assets per band, and the time span
+        of the items.
+    """
+    items = result["items"]
+    dates = sorted(item.datetime.isoformat() for item in items if item.datetime)
+    report = {
+        "items": len(items),
+        "searches": result["searches"],
+        "assets": {
+            band: sum(band in item.assets for item in items)
+            for band in config.pipeline.spectral_bands
+        },
+        "first": dates[0] if dates else None,
+        "last": dates[-1] if dates else None,
+    }
+    if config.shard.count > 1:
+        report["shard"] = config.shard.index
+    if result["aois"] is not None:
+        report["aois"] = {
+            name: len(aoi_items) for name, aoi_items in result["aois"].items()
+        }
+    if list_items:
+        report["item_ids"] = [item.id for item in items]
+    return report
+
+
+def plan(config, result: dict) -> dict:
+    """
+    Estimate the bytes and duration of loading the items of a search result.
+
+    Args:
+        config (Config): Pipeline configuration.
+        result (dict): Result of search.
+
+    Returns:
+        dict: The totals of the plan, see DownloadPlanner.summarize.
+    """
+    from eo_data_pipeline.data_loader.planner import DownloadPlanner
+
+    planner = DownloadPlanner(config)
+    try:
+        estimates = planner.plan(
+            result["items"], config.pipeline.spectral_bands, aoi=result["bounds"]
+        )
+    finally:
+        planner.close()
+    return planner.summarize(estimates)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the argument parser of the command line interface."""
+    parser = argparse.ArgumentParser(
+        prog="eo-pipeline",
+        description="Fetch, load and process Earth Observation data.",
+    )
+    parser.add_argument(
+        "--config",
+        help="YAML file overriding eo_data_pipeline/config/hydra_config.yaml",
+    )
+    parser.add_argument(
+        "--no-prefect",
+        action="store_true",
+        help="Run the flows in-process instead of with the Prefect engine",
+    )
+    parser.add_argument("--log-level", default="INFO")
+
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("validate", help="Validate the configuration")
+    for name, description in (
+        ("search", "Search and summarize the items of a run without loading them"),
+        ("dry-run", "Search and estimate the bytes and duration of loading them"),
+    ):
+        commands.add_parser(name, help=description).add_argument(
+            "--items", action="store_true", help="List the ids of the items"
+        )
+    for name, description in (
+        ("download", "Search, save the metadata of and load the items of a run"),
+        ("process", "Build the datacubes of a completed download"),
+        ("run", "Run the whole pipeline"),
+    ):
+        command = commands.add_parser(name, help=description)
+        if name != "process":
+            command.add_argument(
+                "--resume",
+                action="store_true",
+                help="Continue an interrupted run, same as run.resume=true",
+            )
+    commands.add_parser(
+        "merge", help="Merge the catalogs of the shards of a run"
+    ).add_argument(
+        "--allow-partial",
+        action="store_true",
+        help="Merge the completed shards even if others have not completed",
+    )
+    for command in commands.choices.values():
+        command.add_argument(
+            "overrides",
+            nargs="*",
+            help="Overrides in dot notation, e.g. run.verify=checksum",
+        )
+    return parser
+
+
+def main(argv: list = None) -> int:
+    """
+    Run the command line interface.
+
+    Args:
+        argv (list, optional): Arguments, defaults to ``sys.argv[1:]``.
+
+    Returns:
+        int: Exit status.
+    """
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper())
+
+    overrides = list(args.overrides)
+    if getattr(args, "resume", False):
+        overrides.append("run.resume=true")
+    try:
+        config = load_config(args.config, overrides)
+        # Same checks as the first stage of every flow
+        ParameterValidator.validate_config(config)
+    except (TypeError, ValueError) as e:
+        print(f"Invalid configuration: {e}", file=sys.stderr)
+        return 2
+
+    if args.command == "validate":
+        print("Configuration is valid")
+        return 0
+    if args.command in ("search", "dry-run"):
+        if config.shard.count > 1:
+            from eo_data_pipeline.pipeline.sharding import shard_config
+
+            if config.shard.index is None:
+                print("Set shard.index to the shard to search", file=sys.stderr)
+                return 2
+            # Plans against the partitions this worker writes to
+            config = shard_config(config)
+        # Keeps stdout to the JSON report, e.g. for cron jobs parsing it
+        with contextlib.redirect_stdout(sys.stderr):
+            result = search(config)
+            report = summarize(config, result, list_items=args.items)
+            if args.command == "dry-run":
+                report["plan"] = plan(config, result)
+        print(json.dumps(report, indent=2))
+        return 0
+    if args.command == "merge":
+        from eo_data_pipeline.pipeline.sharding import merge_shards
+
+        if config.shard.count < 2:
+            print("Set shard.count to the number of shards to merge", file=sys.stderr)
+            return 2
+        try:
+            result = merge_shards(config, allow_partial=args.allow_partial)
+        except RuntimeError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        print(json.dumps(result, indent=2))
+        return 0
+
+    if args.no_prefect:
+        from eo_data_pipeline.pipeline.engine import ENGINE_VARIABLE
+
+        os.environ[ENGINE_VARIABLE] = "local"
+    from eo_data_pipeline.pipeline import flow
+
+    if args.command == "run":
+        result = flow.run_pipeline(config)
+    elif _batch_enabled(config):
+        print("Batch jobs only support the run command", file=sys.stderr)
+        return 2
+    elif args.command == "download":
+        result = flow.eo_download_pipeline(config)
+    else:
+        try:
+            result = flow.eo_process_pipeline(config)
+        except RuntimeError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+    print(f"Pipeline execution completed. Result: {result}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
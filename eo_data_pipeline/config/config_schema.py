@@ -1,11 +1,21 @@
 # eo_data_pipeline/config/config_schema.py
 from dataclasses import dataclass, field
-from typing import List
+from typing import Any, Dict, List, Optional
 
 
 @dataclass
 class EarthSearchConfig:
     url: str
+    page_size: int = 100
+    fields: Optional[Dict[str, List[str]]] = None
+    streaming: bool = False
+    partition_tile_size: Optional[float] = None
+    partition_days: Optional[int] = None
+    max_concurrent_searches: int = 4
+    search_retries: int = 3
+    cache_path: Optional[str] = None
+    cache_ttl: float = 3600
+    incremental: bool = False
 
 
 @dataclass
@@ -19,6 +29,36 @@ class PipelineConfig:
     time_steps: TimeStepsConfig
     aoi: List[float]
     spectral_bands: List[str]
+    max_cloud_cover: float = 20
+    min_valid_fraction: Optional[float] = None
+    valid_scl_classes: List[int] = field(default_factory=lambda: [4, 5, 6, 11])
+    scl_band: str = "scl"
+    scl_overview_level: Optional[int] = None
+
+
+@dataclass
+class BatchConfig:
+    aois: List[Any] = field(default_factory=list)
+    aoi_file: Optional[str] = None
+    name_property: str = "name"
+    merge_distance: float = 0.1
+    max_search_size: float = 1.0
+    output_path: str = "./data/aois/"
+    datacubes: bool = True
+
+
+@dataclass
+class PlanConfig:
+    dry_run: bool = False
+    bandwidth_mbps: float = 100.0
+    head_requests: bool = True
+    max_concurrent_requests: int = 16
+
+
+@dataclass
+class ShardConfig:
+    count: int = 1
+    index: Optional[int] = None
 
 
 @dataclass
@@ -26,6 +66,99 @@ class StorageConfig:
     type: str
     path: str
     catalog_path: str
+    max_concurrent_downloads: int = 4
+    load_mode: str = "full"
+    catalog_mode: str = "upsert"
+    index: bool = True
+    geoparquet_path: Optional[str] = None
+    cache_path: Optional[str] = None
+    cache_max_size_gb: Optional[float] = None
+
+
+@dataclass
+class TransferConfig:
+    enabled: bool = False
+    max_per_host: int = 16
+    initial_per_host: int = 4
+    min_per_host: int = 1
+    rate: Optional[float] = None
+    burst: Optional[float] = None
+    max_retries: int = 5
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    latency_target: Optional[float] = None
+    timeout: float = 60
+
+
+@dataclass
+class CogConfig:
+    enabled: bool = False
+    codec: str = "DEFLATE"
+    predictor: Optional[int] = None
+    level: Optional[int] = None
+    max_z_error: float = 0
+    block_size: int = 512
+    overview_resampling: str = "average"
+    max_workers: Optional[int] = None
+
+
+@dataclass
+class ProcessingConfig:
+    output_path: str = "./data/cube/"
+    format: str = "netcdf"
+    chunks: Dict[str, int] = field(
+        default_factory=lambda: {"time": 16, "y": 256, "x": 256}
+    )
+    compression_level: int = 4
+    indices: Dict[str, Optional[str]] = field(default_factory=dict)
+    index_block_size: int = 1024
+
+
+@dataclass
+class GridConfig:
+    crs: Optional[str] = None
+    resolution: float = 10
+    bounds: Optional[List[float]] = None
+    resampling: str = "bilinear"
+    output_path: str = "./data/aligned/"
+    block_size: int = 512
+    max_workers: Optional[int] = None
+
+
+@dataclass
+class CompositeConfig:
+    enabled: bool = False
+    period: str = "month"
+    method: str = "median"
+    output_path: str = "./data/composites/"
+    bands: Optional[List[str]] = None
+    mask_band: Optional[str] = "scl"
+    score: str = "ndvi"
+    block_size: int = 512
+    max_block_mb: float = 256
+    max_workers: Optional[int] = None
+
+
+@dataclass
+class ExecutionConfig:
+    backend: str = "thread"
+    max_workers: Optional[int] = None
+    dask_scheduler: str = "processes"
+
+
+@dataclass
+class RunConfig:
+    resume: bool = False
+    manifest_path: Optional[str] = None
+    verify: str = "size"
+
+
+@dataclass
+class MetricsConfig:
+    enabled: bool = False
+    output_path: Optional[str] = None
+    prometheus_path: Optional[str] = None
+    opentelemetry: bool = False
 
 
 @dataclass
@@ -33,3 +166,44 @@ class Config:
     earth_search: EarthSearchConfig
     pipeline: PipelineConfig
     storage: StorageConfig
+    processing: ProcessingConfig = field(default_factory=ProcessingConfig)
+    execution: ExecutionConfig = field(default_factory=ExecutionConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    grid: GridConfig = field(default_factory=GridConfig)
+    composite: CompositeConfig = field(default_factory=CompositeConfig)
+    cog: CogConfig = field(default_factory=CogConfig)
+    run: RunConfig = field(default_factory=RunConfig)
+    transfer: TransferConfig = field(default_factory=TransferConfig)
+    batch: BatchConfig = field(default_factory=BatchConfig)
+    plan: PlanConfig = field(default_factory=PlanConfig)
+    shard: ShardConfig = field(default_factory=ShardConfig)
+
+
+def config_from_dict(config_dict: dict) -> Config:
+    """
+    Build a Config from plain sections, e.g. a resolved OmegaConf container.
+
+    Args:
+        config_dict (dict): Configuration sections keyed by name.
+
+    Returns:
+        Config: The configuration, with defaults for missing optional sections.
+    """
+    pipeline_dict = dict(config_dict["pipeline"])
+    time_steps = TimeStepsConfig(**pipeline_dict.pop("time_steps"))
+    return Config(
+        earth_search=EarthSearchConfig(**config_dict["earth_search"]),
+        pipeline=PipelineConfig(time_steps=time_steps, **pipeline_dict),
+        storage=StorageConfig(**config_dict["storage"]),
+        cog=CogConfig(**config_dict.get("cog", {})),
+        processing=ProcessingConfig(**config_dict.get("processing", {})),
+        grid=GridConfig(**config_dict.get("grid", {})),
+        composite=CompositeConfig(**config_dict.get("composite", {})),
+        execution=ExecutionConfig(**config_dict.get("execution", {})),
+        metrics=MetricsConfig(**config_dict.get("metrics", {})),
+        run=RunConfig(**config_dict.get("run", {})),
+        transfer=TransferConfig(**config_dict.get("transfer", {})),
+        batch=BatchConfig(**config_dict.get("batch", {})),
+        plan=PlanConfig(**config_dict.get("plan", {})),
+        shard=ShardConfig(**config_dict.get("shard", {})),
+    )
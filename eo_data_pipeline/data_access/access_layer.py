@@ -1,19 +1,178 @@
+import os
+
 import rasterio
+import rioxarray
+import xarray as xr
+from pystac import Catalog
+
+from eo_data_pipeline.data_access.index import CatalogIndex
+from eo_data_pipeline.data_loader.clipper import aoi_window
+from eo_data_pipeline.metrics import metrics
 
 
 class DataAccessLayer:
+    """
+    A class for reading raster files saved by the pipeline.
+
+    Reads can be restricted to a window or bounding box, a subset of bands and a
+    decimated overview level, so that memory use scales with the data requested
+    rather than with the size of the scene. ``open_lazy`` and ``open_stack`` return
+    dask-backed arrays that are only read when computed. ``query`` looks up saved
+    files by area, time and band in the CatalogIndex of the local catalog.
+
+    Attributes:
+        storage_path (str): Path of the raster file.
+    """
+
     def __init__(self, path: str):
         self.storage_path = path
 
-    def load_data(self):
+    def load_data(self, window=None, bbox=None, bands=None, overview_level=None):
         """
         Helper function to load data for the specified item and band.
 
+        Args:
+            window (rasterio.windows.Window, optional): Pixel window to read.
+            bbox (list, optional): Bounding box [lon_min, lat_min, lon_max, lat_max]
+                to read; ignored if ``window`` is given.
+            bands (list, optional): 1-based indexes of the bands to read.
+            overview_level (int, optional): Overview to read from, 0 being the
+                first (largest) overview.
+
         Returns:
             numpy.ndarray: Array containing the data for the specified item and band.
         """
-        with rasterio.open(self.storage_path) as src:
-            data = src.read()
-            self.transform = src.transform  # Optional just for debugging or plotting
+        with metrics.timer("access.read"), rasterio.open(
+            self.storage_path, overview_level=overview_level
+        ) as src:
+            if window is None and bbox is not None:
+                window = aoi_window(src, bbox)
+            data = src.read(indexes=bands, window=window)
+            self.transform = (
+                src.window_transform(window) if window is not None else src.transform
+            )  # Optional just for debugging or plotting
             self.crs = src.crs  # Optional just for debugging or plotting
+        metrics.incr("access.bytes_read", data.nbytes)
         return data
+
+    def open_lazy(
+        self, chunks="auto", window=None, bbox=None, bands=None, overview_level=None
+    ):
+        """
+        Open the raster as a lazy, chunked array.
+
+        Args:
+            chunks (int, dict or str): Dask chunk sizes, e.g. ``{"x": 512, "y": 512}``.
+            window (rasterio.windows.Window, optional): Pixel window to select.
+            bbox (list, optional): Bounding box [lon_min, lat_min, lon_max, lat_max]
+                to select; ignored if ``window`` is given.
+            bands (list, optional): 1-based indexes of the bands to select.
+            overview_level (int, optional): Overview to read from.
+
+        Returns:
+            xarray.DataArray: Dask-backed array with dims (band, y, x).
+        """
+        array = rioxarray.open_rasterio(
+            self.storage_path,
+            chunks=chunks,
+            lock=False,
+            overview_level=overview_level,
+        )
+        if window is None and bbox is not None:
+            with rasterio.open(self.storage_path, overview_level=overview_level) as src:
+                window = aoi_window(src, bbox)
+        if window is not None:
+            (row_start, row_stop), (col_start, col_stop) = window.toranges()
+            array = array.isel(
+                y=slice(int(row_start), int(row_stop)),
+                x=slice(int(col_start), int(col_stop)),
+            )
+        if bands is not None:
+            array = array.sel(band=bands)
+        return array
+
+    @staticmethod
+    def query(
+        catalog_path, bbox=None, time_range=None, bands=None, max_cloud_cover=None
+    ):
+        """
+        Look up files saved by the pipeline in the index of the local catalog.
+
+        Args:
+            catalog_path (str): Path of the catalog written by
+                DataLoader.save_metadata.
+            bbox (list, optional): Bounding box [lon_min, lat_min, lon_max, lat_max]
+                that items must intersect.
+            time_range (tuple, optional): Start and end dates in format
+                (start_date, end_date), both inclusive.
+            bands (list, optional): Bands to return files of.
+            max_cloud_cover (float, optional): Maximum cloud cover of items.
+
+        Returns:
+            list: Dictionaries with ``item_id``, ``datetime``, ``cloud_cover``,
+            ``band`` and ``path`` of every matching file, ordered by datetime.
+        """
+        with CatalogIndex(catalog_path) as index:
+            return index.query(
+                bbox=bbox,
+                time_range=time_range,
+                bands=bands,
+                max_cloud_cover=max_cloud_cover,
+            )
+
+    @classmethod
+    def open_stack(
+        cls,
+        catalog_path,
+        storage_path,
+        band,
+        chunks="auto",
+        bbox=None,
+        overview_level=None,
+    ):
+        """
+        Open one band of all items in the local STAC catalog as a lazy time stack.
+
+        Args:
+            catalog_path (str): Path of the catalog written by
+                DataLoader.save_metadata.
+            storage_path (str): Path the asset files were saved to.
+            band (str): Spectral band to stack.
+            chunks (int, dict or str): Dask chunk sizes of each scene.
+            bbox (list, optional): Bounding box [lon_min, lat_min, lon_max, lat_max]
+                to select from each scene.
+            overview_level (int, optional): Overview to read from.
+
+        Returns:
+            xarray.DataArray: Dask-backed array with dims (time, band, y, x) and an
+            ``item_id`` coordinate along time.
+
+        Raises:
+            ValueError: If no files are found, or the files are not on the same grid.
+        """
+        catalog = Catalog.from_file(os.path.join(catalog_path, "catalog.json"))
+        items = sorted(catalog.get_items(recursive=True), key=lambda i: i.datetime)
+
+        arrays = []
+        for item in items:
+            path = os.path.join(storage_path, f"{item.id}_{band}.tif")
+            if not os.path.exists(path):
+                continue
+            array = cls(path).open_lazy(
+                chunks=chunks, bbox=bbox, overview_level=overview_level
+            )
+            arrays.append(
+                array.expand_dims(
+                    time=[item.datetime.replace(tzinfo=None)]
+                ).assign_coords(item_id=("time", [item.id]))
+            )
+        if not arrays:
+            raise ValueError(f"No files found for band {band} in {storage_path}")
+
+        try:
+            return xr.concat(arrays, dim="time", join="exact")
+        except ValueError as e:
+            raise ValueError(
+                f"Files of band {band} are not on a common grid and cannot be "
+                f"stacked: {e}"
+            ) from e
@@ -0,0 +1,212 @@
+# eo_data_pipeline/data_access/index.py
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+
+def _timestamp(value):
+    """Convert a datetime, or an ISO date(time) string, to seconds since epoch."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class CatalogIndex:
+    """
+    A spatial-temporal index of the items in the local metadata catalog.
+
+    The index is a SQLite database stored next to ``catalog.json``. It records the
+    id, bounding box, datetime and cloud cover of every saved item in an R-tree and
+    a datetime index, together with the local file path of every saved asset, so
+    that files covering an area and time range can be looked up without reading
+    the catalog JSON tree.
+
+    Each thread keeps one connection to the database until close is called, e.g.
+    by using the index as a context manager.
+
+    Attributes:
+        path (str): Path of the SQLite database file.
+    """
+
+    def __init__(self, catalog_path: str):
+        """
+        Initialize the CatalogIndex, creating its database if needed.
+
+        Args:
+            catalog_path (str): Path of the catalog the index belongs to.
+        """
+        os.makedirs(catalog_path, exist_ok=True)
+        self.path = os.path.join(catalog_path, "index.sqlite")
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "id INTEGER PRIMARY KEY, item_id TEXT UNIQUE, datetime REAL, "
+                "cloud_cover REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS items_datetime ON items (datetime)")
+            db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS items_bbox USING rtree("
+                "id, lon_min, lon_max, lat_min, lat_max)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS assets ("
+                "item_id TEXT, band TEXT, path TEXT, PRIMARY KEY (item_id, band))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # The connection of this thread, in a transaction committed on success
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # Closed from any thread by close, but only used by this one
+            db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._local.db = db
+            with self._lock:
+                self._connections.append(db)
+        with db:
+            yield db
+
+    def close(self):
+        """Close the connections of all threads; later calls reconnect."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for db in connections:
+            db.close()
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add_items(self, items: list):
+        """
+        Add items to the index, replacing previously indexed versions.
+
+        Args:
+            items (list): STAC items to index.
+        """
+        with self._connect() as db:
+            for item in items:
+                row = db.execute(
+                    "SELECT id FROM items WHERE item_id = ?", (item.id,)
+                ).fetchone()
+                when = _timestamp(item.datetime) if item.datetime else None
+                cloud_cover = item.properties.get("eo:cloud_cover")
+                if row is None:
+                    row_id = db.execute(
+                        "INSERT INTO items (item_id, datetime, cloud_cover) "
+                        "VALUES (?, ?, ?)",
+                        (item.id, when, cloud_cover),
+                    ).lastrowid
+                else:
+                    row_id = row[0]
+                    db.execute(
+                        "UPDATE items SET datetime = ?, cloud_cover = ? WHERE id = ?",
+                        (when, cloud_cover, row_id),
+                    )
+                    db.execute("DELETE FROM items_bbox WHERE id = ?", (row_id,))
+                if item.bbox:
+                    # 2D or 3D bbox: the maxima start half-way through the list
+                    half = len(item.bbox) // 2
+                    db.execute(
+                        "INSERT INTO items_bbox VALUES (?, ?, ?, ?, ?)",
+                        (
+                            row_id,
+                            item.bbox[0],
+                            item.bbox[half],
+                            item.bbox[1],
+                            item.bbox[half + 1],
+                        ),
+                    )
+
+    def add_assets(self, assets: list):
+        """
+        Record the local files of saved assets.
+
+        Args:
+            assets (list): (item_id, band, file_path) tuples.
+        """
+        with self._connect() as db:
+            db.executemany("INSERT OR REPLACE INTO assets VALUES (?, ?, ?)", assets)
+
+    def clear(self):
+        """Remove all items and assets from the index."""
+        with self._connect() as db:
+            db.execute("DELETE FROM items")
+            db.execute("DELETE FROM items_bbox")
+            db.execute("DELETE FROM assets")
+
+    def query(self, bbox=None, time_range=None, bands=None, max_cloud_cover=None):
+        """
+        Look up saved asset files by area, time, band and cloud cover.
+
+        Args:
+            bbox (list, optional): Bounding box [lon_min, lat_min, lon_max, lat_max]
+                that items must intersect.
+            time_range (tuple, optional): Start and end dates (or datetimes) in ISO
+                format; a date-only end includes the whole day.
+            bands (list, optional): Bands to return files of.
+            max_cloud_cover (float, optional): Maximum ``eo:cloud_cover`` of items.
+
+        Returns:
+            list: Dictionaries with ``item_id``, ``datetime``, ``cloud_cover``,
+            ``band`` and ``path`` of every matching file, ordered by datetime.
+        """
+        sql = (
+            "SELECT items.item_id, items.datetime, items.cloud_cover, "
+            "assets.band, assets.path FROM items "
+            "JOIN assets ON assets.item_id = items.item_id"
+        )
+        conditions = []
+        params = []
+        if bbox is not None:
+            sql += " JOIN items_bbox ON items_bbox.id = items.id"
+            conditions.append(
+                "items_bbox.lon_max >= ? AND items_bbox.lon_min <= ? "
+                "AND items_bbox.lat_max >= ? AND items_bbox.lat_min <= ?"
+            )
+            params += [bbox[0], bbox[2], bbox[1], bbox[3]]
+        if time_range is not None:
+            start, end = time_range
+            end_timestamp = _timestamp(end)
+            if isinstance(end, str) and len(end) == 10:  # A date is the whole day
+                end_timestamp += timedelta(days=1).total_seconds()
+            conditions.append("items.datetime >= ? AND items.datetime < ?")
+            params += [_timestamp(start), end_timestamp]
+        if bands is not None:
+            conditions.append(f"assets.band IN ({', '.join('?' * len(bands))})")
+            params += list(bands)
+        if max_cloud_cover is not None:
+            conditions.append("items.cloud_cover <= ?")
+            params.append(max_cloud_cover)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY items.datetime, items.item_id, assets.band"
+
+        with self._connect() as db:
+            rows = db.execute(sql, params).fetchall()
+        return [
+            {
+                "item_id": item_id,
+                "datetime": (
+                    datetime.fromtimestamp(when, tz=timezone.utc)
+                    if when is not None
+                    else None
+                ),
+                "cloud_cover": cloud_cover,
+                "band": band,
+                "path": path,
+            }
+            for item_id, when, cloud_cover, band, path in rows
+        ]
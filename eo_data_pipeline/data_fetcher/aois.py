@@ -0,0 +1,315 @@
+# eo_data_pipeline/data_fetcher/aois.py
+
+import json
+import os
+from collections import Counter
+from dataclasses import dataclass
+
+import shapely
+from shapely.geometry import box, mapping, shape
+
+from .validator import ParameterValidator
+
+
+@dataclass
+class AOI:
+    """
+    A named area of interest of a batch job.
+
+    Attributes:
+        name (str): Name of the AOI, used for its output directory.
+        geometry (shapely.Geometry): Polygon or box in EPSG:4326.
+    """
+
+    name: str
+    geometry: object
+
+    @property
+    def bbox(self) -> list:
+        """Bounding box [lon_min, lat_min, lon_max, lat_max] of the AOI."""
+        return [float(v) for v in self.geometry.bounds]
+
+
+def _read_features(path):
+    if path.lower().endswith((".geojson", ".json")):
+        with open(path) as f:
+            document = json.load(f)
+        if document.get("type") == "FeatureCollection":
+            return document["features"]
+        if document.get("type") == "Feature":
+            return [document]
+        return [{"type": "Feature", "properties": {}, "geometry": document}]
+    try:
+        import fiona
+        from fiona.transform import transform_geom
+    except ImportError as e:
+        raise ImportError(
+            f"Reading {os.path.basename(path)} requires the fiona package; "
+            "GeoJSON files can be read without it"
+        ) from e
+    features = []
+    with fiona.open(path) as source:
+        for feature in source:
+            geometry = feature["geometry"]
+            if source.crs:
+                # Same axis order and CRS as GeoJSON
+                geometry = transform_geom(source.crs, "EPSG:4326", geometry)
+            features.append(
+                {
+                    "properties": dict(feature["properties"]),
+                    "geometry": shape(geometry).__geo_interface__,
+                }
+            )
+    return features
+
+
+def load_aois(aois=None, aoi_file: str = None, name_property: str = "name") -> list:
+    """
+    Build the AOIs of a batch job from a list and/or a vector file.
+
+    Args:
+        aois (list, optional): Bounding boxes [lon_min, lat_min, lon_max, lat_max],
+            or mappings with a ``name`` and either a ``bbox`` or a GeoJSON
+            ``geometry``.
+        aoi_file (str, optional): GeoJSON file of polygon features; other vector
+            formats, e.g. shapefiles, require fiona.
+        name_property (str): Feature property holding the name of an AOI.
+
+    Returns:
+        list: AOI objects, named ``aoi_<n>`` where no name is given.
+
+    Raises:
+        ValueError: If an AOI is invalid, not a polygon, or names are not unique
+            or not usable as a directory name.
+    """
+    entries = []
+    for entry in aois or []:
+        if isinstance(entry, dict) or hasattr(entry, "keys"):
+            entry = dict(entry)
+            if entry.get("geometry") is not None:
+                geometry = shape(dict(entry["geometry"]))
+            else:
+                geometry = box(*_checked_bbox(list(entry["bbox"])))
+            entries.append((entry.get("name"), geometry))
+        else:
+            entries.append((None, box(*_checked_bbox(list(entry)))))
+    if aoi_file:
+        for feature in _read_features(aoi_file):
+            properties = feature.get("properties") or {}
+            entries.append((properties.get(name_property), shape(feature["geometry"])))
+
+    result = []
+    for i, (name, geometry) in enumerate(entries):
+        if geometry.geom_type not in ("Polygon", "MultiPolygon") or geometry.is_empty:
+            raise ValueError(f"AOI {name or i} is not a polygon: {geometry.geom_type}")
+        if not geometry.is_valid:
+            geometry = shapely.make_valid(geometry)
+        ParameterValidator.validate_aoi(list(geometry.bounds))
+        result.append(AOI(str(name) if name is not None else f"aoi_{i}", geometry))
+
+    names = [aoi.name for aoi in result]
+    for name in names:
+        # Names are directories below batch.output_path
+        if name in ("", ".", "..") or "/" in name or "\\" in name:
+            raise ValueError(
+                f"AOI name {name!r} is not a valid directory name; names must not "
+                "be empty, '.' or '..', or contain path separators"
+            )
+    duplicates = sorted(name for name, n in Counter(names).items() if n > 1)
+    if duplicates:
+        raise ValueError(f"AOI names must be unique, duplicated: {duplicates}")
+    return result
+
+
+def _checked_bbox(bbox):
+    ParameterValidator.validate_aoi(bbox)
+    return [float(v) for v in bbox]
+
+
+def merge_aois(
+    aois: list, merge_distance: float = 0.1, max_search_size: float = 1.0
+) -> list:
+    """
+    Merge AOIs into a small set of search bounding boxes.
+
+    Search results scale with the Sentinel-2 tiles a search box touches (about
+    1 by 1 degree each), not with its area, so AOIs close to each other are best
+    searched together. Two groups of AOIs are merged, transitively, if their
+    bounding boxes are less than ``merge_distance`` degrees apart, or if the
+    bounding box of both stays within ``max_search_size`` degrees. Items that the
+    merged box finds but no AOI intersects are dropped by assign_items.
+
+    Candidate pairs of boxes are found with an STRtree, so that large batches
+    are merged in about O(n log n) rather than by comparing all pairs.
+
+    Args:
+        aois (list): AOI objects.
+        merge_distance (float): Gap in degrees below which AOIs are always merged.
+        max_search_size (float): Width and height in degrees up to which AOIs are
+            merged regardless of the gap between them.
+
+    Returns:
+        list: Search bounding boxes [lon_min, lat_min, lon_max, lat_max].
+    """
+
+    def small(bounds):
+        return (
+            bounds[2] - bounds[0] <= max_search_size
+            and bounds[3] - bounds[1] <= max_search_size
+        )
+
+    boxes = [tuple(aoi.geometry.bounds) for aoi in aois]
+    count = None
+    # Merged groups can come close to, or fit with, others: repeat until stable
+    while boxes and count != len(boxes):
+        count = len(boxes)
+        boxes = _merge_boxes(
+            boxes,
+            merge_distance,
+            lambda a, b, union: a.distance(b) <= merge_distance,
+        )
+        boxes = _merge_boxes(boxes, max_search_size, lambda a, b, union: small(union))
+    return [[float(v) for v in bounds] for bounds in boxes]
+
+
+def _merge_boxes(boxes, gap, merge):
+    """
+    Merge boxes with a union-find over the pairs less than ``gap`` apart.
+
+    Args:
+        boxes (list): Bounds (lon_min, lat_min, lon_max, lat_max).
+        gap (float): Degrees beyond which boxes are never merged.
+        merge (callable): Called with the geometries of a pair of boxes and the
+            bounds of the union of their groups, returns whether to merge them.
+
+    Returns:
+        list: Bounds of the merged groups, in the order of their first box.
+    """
+    geometries = [box(*bounds) for bounds in boxes]
+    tree = shapely.STRtree(geometries)
+    buffered = [
+        box(bounds[0] - gap, bounds[1] - gap, bounds[2] + gap, bounds[3] + gap)
+        for bounds in boxes
+    ]
+    parent = list(range(len(boxes)))
+    merged = list(boxes)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    left, right = tree.query(buffered, predicate="intersects")
+    for i, j in zip(left.tolist(), right.tolist()):
+        if i >= j:
+            continue
+        a, b = sorted((find(i), find(j)))
+        if a == b:
+            continue
+        union = (
+            min(merged[a][0], merged[b][0]),
+            min(merged[a][1], merged[b][1]),
+            max(merged[a][2], merged[b][2]),
+            max(merged[a][3], merged[b][3]),
+        )
+        if merge(geometries[i], geometries[j], union):
+            parent[b] = a
+            merged[a] = union
+    return [merged[i] for i in range(len(boxes)) if find(i) == i]
+
+
+def assign_items(items: list, aois: list) -> dict:
+    """
+    Find the items that cover each AOI.
+
+    Args:
+        items (list): STAC items, e.g. the deduplicated results of all searches.
+        aois (list): AOI objects.
+
+    Returns:
+        dict: Items intersecting each AOI, keyed by AOI name, in item order.
+    """
+    tree = shapely.STRtree([aoi.geometry for aoi in aois])
+    assigned = {aoi.name: [] for aoi in aois}
+    for item in items:
+        footprint = shape(item.geometry) if item.geometry else box(*item.bbox)
+        for index in tree.query(footprint, predicate="intersects"):
+            assigned[aois[index].name].append(item)
+    return assigned
+
+
+def search_aois(fetch, aois: list, searches: list, select=None) -> tuple:
+    """
+    Run the merged searches of a batch and find the items each AOI needs.
+
+    Items found by several searches are kept once, and items that cover no AOI
+    (or that select drops for all of their AOIs) are not returned.
+
+    Args:
+        fetch (callable): Called with a search bounding box, returns its items.
+        aois (list): AOI objects.
+        searches (list): Bounding boxes of the searches, as returned by merge_aois.
+        select (callable, optional): Called with the items and bounding box of
+            each AOI, returns the items to keep for it, e.g. the scenes that are
+            clear over the AOI.
+
+    Returns:
+        tuple: The needed items, each once and in search order, and the items of
+        each AOI, keyed by AOI name.
+    """
+    found = {}
+    for bbox in searches:
+        for item in fetch(bbox):
+            found.setdefault(item.id, item)
+    assigned = assign_items(list(found.values()), aois)
+    if select is not None:
+        for aoi in aois:
+            assigned[aoi.name] = select(assigned[aoi.name], aoi.bbox)
+    needed = {item.id for aoi_items in assigned.values() for item in aoi_items}
+    return [item for item in found.values() if item.id in needed], assigned
+
+
+def item_bounds(assigned: dict, aois: list) -> dict:
+    """
+    Find the part of each item that is needed by any AOI.
+
+    Args:
+        assigned (dict): Items of each AOI, as returned by assign_items.
+        aois (list): AOI objects.
+
+    Returns:
+        dict: Bounding box of the union of the AOIs of each item, by item id,
+        e.g. to clip the item's assets to once for all of its AOIs.
+    """
+    geometries = {}
+    for aoi in aois:
+        for item in assigned[aoi.name]:
+            geometries.setdefault(item.id, []).append(aoi.geometry)
+    return {
+        item_id: [float(v) for v in shapely.union_all(item_geometries).bounds]
+        for item_id, item_geometries in geometries.items()
+    }
+
+
+def to_feature_collection(aois: list) -> dict:
+    """
+    Return the AOIs as a GeoJSON FeatureCollection.
+
+    Args:
+        aois (list): AOI objects.
+
+    Returns:
+        dict: FeatureCollection with the name of each AOI as a property.
+    """
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"name": aoi.name},
+                "geometry": mapping(aoi.geometry),
+            }
+            for aoi in aois
+        ],
+    }
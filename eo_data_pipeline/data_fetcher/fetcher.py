@@ -1,10 +1,69 @@
 # eo_data_pipeline/data_fetcher/fetcher.py
 
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
 import pystac_client
 from omegaconf import DictConfig
+from pystac import Item
+from pystac_client.exceptions import APIError
+
+from eo_data_pipeline.metrics import metrics
 
+from .search_cache import SearchCache
 from .validator import ParameterValidator
 
+COLLECTION = "sentinel-2-l2a"
+
+
+def split_aoi(aoi, tile_size):
+    """
+    Split a bounding box into tiles of at most ``tile_size`` degrees.
+
+    Args:
+        aoi (list): Bounding box coordinates [lon_min, lat_min, lon_max, lat_max].
+        tile_size (float): Maximum width and height of a tile in degrees.
+
+    Returns:
+        list: Bounding boxes of the tiles, row by row from the south-west corner.
+    """
+    lon_min, lat_min, lon_max, lat_max = aoi
+    tiles = []
+    lat = lat_min
+    while lat < lat_max:
+        lat_next = min(lat + tile_size, lat_max)
+        lon = lon_min
+        while lon < lon_max:
+            lon_next = min(lon + tile_size, lon_max)
+            tiles.append([lon, lat, lon_next, lat_next])
+            lon = lon_next
+        lat = lat_next
+    return tiles
+
+
+def split_time_range(time_range, days):
+    """
+    Split a time range into consecutive windows of at most ``days`` days.
+
+    Args:
+        time_range (tuple): Start and end dates in format (start_date, end_date).
+        days (int): Maximum length of a window in days.
+
+    Returns:
+        list: (start_date, end_date) tuples of non-overlapping windows; both dates
+        are inclusive, like in the original range.
+    """
+    start = datetime.strptime(time_range[0], "%Y-%m-%d")
+    end = datetime.strptime(time_range[1], "%Y-%m-%d")
+    windows = []
+    while start <= end:
+        window_end = min(start + timedelta(days=days - 1), end)
+        windows.append((start.strftime("%Y-%m-%d"), window_end.strftime("%Y-%m-%d")))
+        start = window_end + timedelta(days=1)
+    return windows
+
 
 class DataFetcher:
     """
@@ -15,6 +74,21 @@ class DataFetcher:
 
     Attributes:
         catalog_url (str): The URL of the Earth Search catalog.
+        page_size (int): Number of items requested per page of search results.
+        fields (dict, optional): Fields extension include/exclude projection that
+            limits which parts of each item the API returns.
+        partition_tile_size (float, optional): If set, large AOIs are searched as
+            tiles of at most this many degrees.
+        partition_days (int, optional): If set, long time ranges are searched as
+            windows of at most this many days.
+        max_concurrent_searches (int): Maximum number of sub-searches in flight.
+        search_retries (int): Number of retries of a failed sub-search.
+        search_cache (SearchCache, optional): Persistent cache of search results,
+            enabled by ``cache_path``.
+        incremental (bool): If True, cached searches only query items newer than
+            the previous run instead of expiring after ``cache_ttl``.
+        max_cloud_cover (float): Maximum scene-wide cloud cover in percent, from
+            ``pipeline.max_cloud_cover``.
     """
 
     def __init__(self, config: DictConfig):
@@ -25,36 +99,89 @@ class DataFetcher:
             config (DictConfig): Configuration containing the Earth Search catalog URL.
         """
         self.catalog_url = config.earth_search.url
+        self.page_size = getattr(config.earth_search, "page_size", 100)
+        fields = getattr(config.earth_search, "fields", None)
+        self.fields = (
+            {key: list(value) for key, value in fields.items()} if fields else None
+        )
+        self.partition_tile_size = getattr(
+            config.earth_search, "partition_tile_size", None
+        )
+        self.partition_days = getattr(config.earth_search, "partition_days", None)
+        self.max_concurrent_searches = getattr(
+            config.earth_search, "max_concurrent_searches", 4
+        )
+        self.search_retries = getattr(config.earth_search, "search_retries", 3)
+        cache_path = getattr(config.earth_search, "cache_path", None)
+        self.search_cache = (
+            SearchCache(cache_path, getattr(config.earth_search, "cache_ttl", 3600))
+            if cache_path
+            else None
+        )
+        self.incremental = getattr(config.earth_search, "incremental", False)
+        self.max_cloud_cover = getattr(
+            getattr(config, "pipeline", None), "max_cloud_cover", 20
+        )
 
-    def fetch_data(self, time_range, aoi, spectral_bands):
+    def _query(self):
         """
-        Fetch Sentinel-2 data from Earth Search catalog based on specified criteria.
+        Return the query extension parameters of every search.
+        """
+        # Filter for low cloud cover
+        return {"eo:cloud_cover": {"lt": self.max_cloud_cover}}
+
+    def _search(self, time_range, aoi, catalog=None, query=None, **kwargs):
+        """
+        Create a search of the Sentinel-2 L2A collection.
 
         Args:
-            time_range (tuple): Start and end dates for the search in format (start_date, end_date).
+            time_range (tuple): Start and end dates for the search.
             aoi (list): Bounding box coordinates [lon_min, lat_min, lon_max, lat_max].
-            spectral_bands (list): List of spectral bands to fetch.
+            catalog (pystac_client.Client, optional): Client to search with; a new
+                one is opened if not given.
+            query (dict, optional): Query parameters added to the default ones.
+            **kwargs: Additional parameters passed to ``Client.search``.
 
         Returns:
-            list: List of STAC items matching the search criteria and containing all specified spectral bands.
-
-        Note:
-            The method filters for items with cloud cover less than 20%. This threshold
-            could be moved to the configuration for more flexibility.
+            pystac_client.ItemSearch: The (not yet executed) search.
         """
         # Create a STAC client
-        catalog = pystac_client.Client.open(self.catalog_url)
+        if catalog is None:
+            catalog = pystac_client.Client.open(self.catalog_url)
 
         # Create a search with specified parameters
-        search = catalog.search(
-            collections=["sentinel-2-l2a"],
+        return catalog.search(
+            collections=[COLLECTION],
             datetime=f"{time_range[0]}/{time_range[1]}",
             bbox=aoi,
-            query={"eo:cloud_cover": {"lt": 20}},  # Filter for low cloud cover
+            query={**self._query(), **(query or {})},
+            **kwargs,
         )
 
-        # Execute the search and get all items
-        items = list(search.items())
+    def fetch_data(self, time_range, aoi, spectral_bands):
+        """
+        Fetch Sentinel-2 data from Earth Search catalog based on specified criteria.
+
+        Args:
+            time_range (tuple): Start and end dates for the search in format (start_date, end_date).
+            aoi (list): Bounding box coordinates [lon_min, lat_min, lon_max, lat_max].
+            spectral_bands (list): List of spectral bands to fetch.
+
+        Returns:
+            list: List of STAC items matching the search criteria and containing all specified spectral bands.
+
+        Note:
+            The search only returns items whose scene-wide cloud cover is below
+            ``pipeline.max_cloud_cover`` (20% by default). Cloud cover over the AOI
+            itself is checked after the search by SceneFilter, if
+            ``pipeline.min_valid_fraction`` is configured.
+
+            If ``partition_tile_size`` or ``partition_days`` is configured, the search
+            is run as partitioned sub-searches (see _search_partitioned). If
+            ``cache_path`` is configured, results are served from the search cache.
+        """
+        with metrics.timer("fetch.search"):
+            items = self._cached_search(time_range, aoi)
 
         # Filter items to ensure all required bands are present
         filtered_items = [
@@ -64,5 +191,186 @@ class DataFetcher:
         ]
 
         print(f"Total items based on filter criteria in config: {len(filtered_items)}")
+        metrics.incr("fetch.items", len(filtered_items))
 
         return filtered_items
+
+    def _cached_search(self, time_range, aoi):
+        """
+        Run a search through the search cache, if enabled.
+
+        Without ``incremental``, a cached result is returned as is until it is older
+        than ``cache_ttl``. With ``incremental``, the API is always queried, but only
+        for items whose ``updated`` (or ``datetime``) is past the high-water mark of
+        the previous run; these are merged into the cached result.
+
+        Returns:
+            list: All items of the search, before band filtering.
+        """
+        if self.search_cache is None:
+            return self._run_search(time_range, aoi)
+
+        key = SearchCache.make_key(
+            COLLECTION, f"{time_range[0]}/{time_range[1]}", aoi, self._query()
+        )
+        if self.incremental:
+            watermark = self.search_cache.watermark(key)
+            query = None
+            if watermark is not None:
+                field, value = watermark
+                query = {field: {"gt": value}}
+            items = self._run_search(time_range, aoi, query=query)
+            print(
+                f"Incremental search: {len(items)} new or updated items"
+                + (f" since {watermark[1]}" if watermark else "")
+            )
+            cached = self.search_cache.merge(key, [self._to_dict(i) for i in items])
+            return [Item.from_dict(d) for d in cached]
+
+        cached = self.search_cache.get(key)
+        if cached is not None:
+            print(f"Using {len(cached)} cached search results")
+            metrics.incr("fetch.cache_hits")
+            return [Item.from_dict(d) for d in cached]
+        items = self._run_search(time_range, aoi)
+        self.search_cache.put(key, [self._to_dict(item) for item in items])
+        return items
+
+    @staticmethod
+    def _to_dict(item):
+        return item.to_dict(include_self_link=False, transform_hrefs=False)
+
+    def _run_search(self, time_range, aoi, query=None):
+        """
+        Execute a search, partitioned if configured.
+
+        Returns:
+            list: All items of the search, before band filtering.
+        """
+        if self.partition_tile_size or self.partition_days:
+            return self._search_partitioned(time_range, aoi, query=query)
+
+        search = self._search(
+            time_range, aoi, query=query, limit=self.page_size, fields=self.fields
+        )
+
+        # Execute the search and get all items
+        return list(search.items())
+
+    def _search_partitioned(self, time_range, aoi, query=None):
+        """
+        Execute partitioned sub-searches concurrently and deduplicate their items.
+
+        The AOI is split into tiles of ``partition_tile_size`` degrees and the time
+        range into windows of ``partition_days`` days. Each (tile, window) pair is
+        searched separately, with at most ``max_concurrent_searches`` searches in
+        flight and up to ``search_retries`` retries with exponential backoff per
+        sub-search. Items returned by several sub-searches (e.g. scenes crossing a
+        tile border) are deduplicated by id.
+
+        Returns:
+            list: All items of the sub-searches, before band filtering.
+        """
+        tiles = (
+            split_aoi(aoi, self.partition_tile_size)
+            if self.partition_tile_size
+            else [aoi]
+        )
+        windows = (
+            split_time_range(time_range, self.partition_days)
+            if self.partition_days
+            else [tuple(time_range)]
+        )
+        partitions = [(window, tile) for window in windows for tile in tiles]
+
+        catalog = pystac_client.Client.open(self.catalog_url)
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_searches) as executor:
+            results = executor.map(
+                lambda partition: self._search_with_retry(
+                    catalog, *partition, query=query
+                ),
+                partitions,
+            )
+            items = {}
+            for partition_items in results:
+                for item in partition_items:
+                    items.setdefault(item.id, item)
+
+        print(f"Merged {len(items)} items from {len(partitions)} sub-searches")
+
+        return list(items.values())
+
+    def _search_with_retry(self, catalog, time_range, aoi, query=None):
+        """
+        Execute one sub-search, retrying failed attempts with exponential backoff.
+
+        Returns:
+            list: All items of the sub-search.
+
+        Raises:
+            APIError: If the last attempt fails.
+        """
+        for attempt in range(self.search_retries + 1):
+            try:
+                search = self._search(
+                    time_range,
+                    aoi,
+                    catalog=catalog,
+                    query=query,
+                    limit=self.page_size,
+                    fields=self.fields,
+                )
+                with metrics.timer("fetch.sub_search"), metrics.in_flight(
+                    "fetch.searches_in_flight"
+                ):
+                    return list(search.items())
+            except APIError:
+                if attempt == self.search_retries:
+                    raise
+                metrics.incr("fetch.search_retries")
+                # Jittered exponential backoff: 1s, 2s, 4s, ... (+/- 50%)
+                time.sleep(2**attempt * random.uniform(0.5, 1.5))
+
+    def iter_pages(self, time_range, aoi, spectral_bands):
+        """
+        Stream Sentinel-2 data from Earth Search catalog page by page.
+
+        Unlike fetch_data, the search is executed lazily: each page of results is
+        requested only when the previous one has been consumed, so callers can
+        start processing the first items while later pages are still pending.
+        Pages are requested with ``page_size`` items and the configured ``fields``
+        projection.
+
+        Args:
+            time_range (tuple): Start and end dates for the search in format (start_date, end_date).
+            aoi (list): Bounding box coordinates [lon_min, lat_min, lon_max, lat_max].
+            spectral_bands (list): List of spectral bands to fetch.
+
+        Yields:
+            list: STAC items of one page that contain all specified spectral bands.
+        """
+        search = self._search(time_range, aoi, limit=self.page_size, fields=self.fields)
+
+        total = 0
+        for page in search.pages():
+            filtered_items = [
+                item
+                for item in page.items
+                if all(band in item.assets for band in spectral_bands)
+            ]
+            total += len(filtered_items)
+            yield filtered_items
+
+        print(f"Total items based on filter criteria in config: {total}")
+
+    def iter_items(self, time_range, aoi, spectral_bands):
+        """
+        Stream Sentinel-2 data from Earth Search catalog item by item.
+
+        See iter_pages for the arguments.
+
+        Yields:
+            pystac.Item: STAC items that contain all specified spectral bands.
+        """
+        for page in self.iter_pages(time_range, aoi, spectral_bands):
+            yield from page
@@ -0,0 +1,196 @@
+# eo_data_pipeline/data_fetcher/search_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+
+def _parse_time(value: str) -> datetime:
+    """
+    Parse an RFC 3339 timestamp of a STAC item into an aware UTC datetime.
+
+    Naive timestamps are taken to be in UTC.
+    """
+    if value.endswith(("Z", "z")):
+        value = value[:-1] + "+00:00"
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _format_time(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class SearchCache:
+    """
+    A persistent cache of STAC search results stored in SQLite.
+
+    Results are stored as item JSON under a key derived from the search
+    parameters. Entries written with ``put`` expire after ``ttl`` seconds. For
+    incremental searches, ``merge`` upserts items into an entry and keeps a
+    high-water mark of the newest item seen, which callers use to only ask the API
+    for newer items on the next run.
+
+    Attributes:
+        path (str): Path of the SQLite database file.
+        ttl (float): Number of seconds a cached search stays valid.
+    """
+
+    def __init__(self, path: str, ttl: float = 3600):
+        """
+        Initialize the SearchCache, creating its database if needed.
+
+        Args:
+            path (str): Directory to store the cache database in.
+            ttl (float): Number of seconds a cached search stays valid.
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = os.path.join(path, "search_cache.sqlite")
+        self.ttl = ttl
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS searches ("
+                "key TEXT PRIMARY KEY, created_at REAL, "
+                "watermark_field TEXT, watermark TEXT)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "key TEXT, item_id TEXT, item TEXT, PRIMARY KEY (key, item_id))"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def make_key(collection, datetime, bbox, query) -> str:
+        """
+        Build the cache key of a search.
+
+        Args:
+            collection (str): Collection searched.
+            datetime (str): Datetime interval of the search.
+            bbox (list): Bounding box of the search.
+            query (dict): Query extension parameters of the search.
+
+        Returns:
+            str: Hex digest identifying the search.
+        """
+        identity = json.dumps(
+            [collection, datetime, [float(v) for v in bbox], query], sort_keys=True
+        )
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[list]:
+        """
+        Return the cached items of a search if present and not expired.
+
+        Args:
+            key (str): Cache key of the search.
+
+        Returns:
+            list: Item dictionaries, or None on a miss.
+        """
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT created_at FROM searches WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or time.time() - row[0] > self.ttl:
+                return None
+            return self._items(db, key)
+
+    def put(self, key: str, items: list):
+        """
+        Replace the cached items of a search.
+
+        Args:
+            key (str): Cache key of the search.
+            items (list): Item dictionaries.
+        """
+        with self._connect() as db:
+            db.execute("DELETE FROM items WHERE key = ?", (key,))
+            db.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, NULL, NULL)",
+                (key, time.time()),
+            )
+            self._insert(db, key, items)
+
+    def watermark(self, key: str):
+        """
+        Return the high-water mark of an incremental search.
+
+        Args:
+            key (str): Cache key of the search.
+
+        Returns:
+            tuple: (field, value) of the newest item seen, or None if the search
+            has not been run incrementally before.
+        """
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT watermark_field, watermark FROM searches WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None or row[1] is None:
+            return None
+        return row[0], row[1]
+
+    def merge(self, key: str, items: list) -> list:
+        """
+        Upsert items into an incremental search and advance its high-water mark.
+
+        The high-water mark is the latest ``updated`` property of all items, or
+        the latest ``datetime`` if items do not carry ``updated``. Timestamps are
+        compared as times, not strings, so differences in precision or UTC offset
+        do not matter, and the mark is stored in UTC with microseconds.
+
+        Args:
+            key (str): Cache key of the search.
+            items (list): New or changed item dictionaries.
+
+        Returns:
+            list: All item dictionaries of the search after the merge.
+        """
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT watermark_field, watermark FROM searches WHERE key = ?",
+                (key,),
+            ).fetchone()
+            field, mark = row if row else (None, None)
+            mark = _parse_time(mark) if mark is not None else None
+            self._insert(db, key, items)
+            for item in items:
+                properties = item.get("properties", {})
+                if field is None:
+                    field = "updated" if "updated" in properties else "datetime"
+                value = properties.get(field)
+                if value is None:
+                    continue
+                value = _parse_time(value)
+                if mark is None or value > mark:
+                    mark = value
+            db.execute(
+                "INSERT OR REPLACE INTO searches VALUES (?, ?, ?, ?)",
+                (key, time.time(), field, _format_time(mark) if mark else None),
+            )
+            return self._items(db, key)
+
+    @staticmethod
+    def _insert(db, key, items):
+        db.executemany(
+            "INSERT INTO items VALUES (?, ?, ?) "
+            "ON CONFLICT (key, item_id) DO UPDATE SET item = excluded.item",
+            [(key, item["id"], json.dumps(item)) for item in items],
+        )
+
+    @staticmethod
+    def _items(db, key):
+        rows = db.execute(
+            "SELECT item FROM items WHERE key = ? ORDER BY rowid", (key,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
@@ -102,3 +102,61 @@ class ParameterValidator:
         }
         if not set(spectral_bands).issubset(valid_bands):
             raise ValueError(f"Invalid spectral bands. Choose from: {valid_bands}")
+
+    @staticmethod
+    def validate_config(config):
+        """
+        Validate a pipeline configuration before anything is searched or loaded.
+
+        Checks the time range, the AOI (or the AOIs of a batch job), the spectral
+        bands and the shard settings, and builds the index calculator, compositor and COG
+        transcoder of the run if they are configured, so that their settings are
+        checked too. The modules of those stages, and their raster dependencies,
+        are only imported when the stage is configured.
+
+        Args:
+            config (Config): Pipeline configuration.
+
+        Raises:
+            ValueError: If any of the parameters is invalid.
+        """
+        ParameterValidator.validate_time_range(
+            [config.pipeline.time_steps.start, config.pipeline.time_steps.end]
+        )
+        batch = getattr(config, "batch", None)
+        if getattr(batch, "aois", None) or getattr(batch, "aoi_file", None):
+            from .aois import load_aois
+
+            load_aois(
+                batch.aois,
+                getattr(batch, "aoi_file", None),
+                name_property=getattr(batch, "name_property", "name"),
+            )
+        else:
+            ParameterValidator.validate_aoi(config.pipeline.aoi)
+        ParameterValidator.validate_spectral_bands(config.pipeline.spectral_bands)
+        shard = getattr(config, "shard", None)
+        count, index = getattr(shard, "count", 1), getattr(shard, "index", None)
+        if count < 1 or (index is not None and not 0 <= index < count):
+            raise ValueError(f"Invalid shard {index} of {count} shards")
+        if count > 1 and (
+            getattr(batch, "aois", None) or getattr(batch, "aoi_file", None)
+        ):
+            raise ValueError("Batch jobs cannot be sharded")
+
+        # Fail on invalid index, composite and COG settings before anything is
+        # downloaded
+        if getattr(getattr(config, "processing", None), "indices", None):
+            from eo_data_pipeline.data_processor.indices import (
+                SpectralIndexCalculator,
+            )
+
+            SpectralIndexCalculator(config)
+        if getattr(getattr(config, "composite", None), "enabled", False):
+            from eo_data_pipeline.data_processor.composite import Compositor
+
+            Compositor(config)
+        if getattr(getattr(config, "cog", None), "enabled", False):
+            from eo_data_pipeline.data_loader.cog import COGTranscoder
+
+            COGTranscoder(config)
@@ -0,0 +1,202 @@
+# eo_data_pipeline/data_loader/cache.py
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# ioctl request number for FICLONE (copy-on-write clone on btrfs/XFS)
+FICLONE = 0x40049409
+
+
+def link_or_copy(src: str, dst: str):
+    """
+    Materialise ``src`` at ``dst`` without duplicating data where possible.
+
+    A hard link is tried first, then a reflink (copy-on-write clone), and finally
+    a regular copy. ``dst`` is replaced atomically if it already exists.
+
+    Args:
+        src (str): Existing file.
+        dst (str): Path to create.
+    """
+    tmp_path = f"{dst}.link"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        try:
+            import fcntl
+
+            with open(src, "rb") as fsrc, open(tmp_path, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except (ImportError, OSError):
+            shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+class AssetCache:
+    """
+    A persistent, content-addressed cache of downloaded asset files.
+
+    Cached files are stored below ``<path>/objects`` under the key of the asset
+    they were downloaded from, and tracked in an SQLite index holding their size
+    and last access time. When ``max_bytes`` is set, least recently used objects
+    are evicted once the cache grows beyond it.
+
+    Attributes:
+        path (str): Root directory of the cache.
+        max_bytes (int, optional): Maximum total size of cached objects.
+        logger (logging.Logger): Logger for this class.
+    """
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None):
+        """
+        Initialize the AssetCache, creating its directory and index if needed.
+
+        Args:
+            path (str): Root directory of the cache.
+            max_bytes (int, optional): Maximum total size of cached objects.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(os.path.join(self.path, "objects"), exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(
+            os.path.join(self.path, "index.sqlite"),
+            timeout=30,
+            check_same_thread=False,
+        )
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS objects ("
+                "key TEXT PRIMARY KEY, href TEXT, size INTEGER, last_access REAL)"
+            )
+
+    @staticmethod
+    def make_key(
+        href: str,
+        checksum: Optional[str] = None,
+        size: Optional[int] = None,
+        etag: Optional[str] = None,
+    ) -> str:
+        """
+        Build the cache key of an asset from its href and version metadata.
+
+        Args:
+            href (str): URL of the asset.
+            checksum (str, optional): Value of the asset's ``file:checksum`` field.
+            size (int, optional): Value of the asset's ``file:size`` field.
+            etag (str, optional): ETag reported by the server for the asset.
+
+        Returns:
+            str: Hex digest identifying this version of the asset.
+        """
+        identity = json.dumps([href, checksum, size, etag])
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def _object_path(self, key: str) -> str:
+        return os.path.join(self.path, "objects", key[:2], key)
+
+    def materialise(self, key: str, file_path: str) -> bool:
+        """
+        Place the cached object for ``key`` at ``file_path`` if it is cached.
+
+        Args:
+            key (str): Cache key of the asset.
+            file_path (str): Local path to materialise the asset at.
+
+        Returns:
+            bool: True on a cache hit, False otherwise.
+        """
+        object_path = self._object_path(key)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size FROM objects WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return False
+            if (
+                not os.path.exists(object_path)
+                or os.path.getsize(object_path) != row[0]
+            ):
+                # Object was removed or truncated behind our back
+                with self._db:
+                    self._db.execute("DELETE FROM objects WHERE key = ?", (key,))
+                return False
+            with self._db:
+                self._db.execute(
+                    "UPDATE objects SET last_access = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+
+        link_or_copy(object_path, file_path)
+        return True
+
+    def add(self, key: str, file_path: str, href: Optional[str] = None):
+        """
+        Add a downloaded file to the cache and evict old objects if needed.
+
+        Args:
+            key (str): Cache key of the asset.
+            file_path (str): Local path of the downloaded asset.
+            href (str, optional): URL of the asset, stored for reference.
+        """
+        object_path = self._object_path(key)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        link_or_copy(file_path, object_path)
+
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?)",
+                    (key, href, os.path.getsize(object_path), time.time()),
+                )
+            self._evict()
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        total = self.size()
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute(
+            "SELECT key, size FROM objects ORDER BY last_access ASC"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            object_path = self._object_path(key)
+            if os.path.exists(object_path):
+                os.remove(object_path)
+            with self._db:
+                self._db.execute("DELETE FROM objects WHERE key = ?", (key,))
+            total -= size
+            self.logger.info(f"Evicted {key} ({size} bytes) from asset cache")
+
+    def size(self) -> int:
+        """
+        Return the total size in bytes of all cached objects.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM objects")
+            return row.fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM objects WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
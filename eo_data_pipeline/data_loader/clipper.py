@@ -0,0 +1,146 @@
+# eo_data_pipeline/data_loader/clipper.py
+
+import math
+import os
+
+import rasterio
+from rasterio.features import geometry_mask
+from rasterio.warp import transform_bounds, transform_geom
+from rasterio.windows import Window, from_bounds
+from shapely.geometry import box, mapping
+
+# GDAL settings so that remote COGs are read with as few HTTP range requests as
+# possible and without listing the remote "directory" first.
+COG_READ_OPTIONS = {
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": "YES",
+    "GDAL_HTTP_MULTIPLEX": "YES",
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif,.tiff,.TIF,.TIFF",
+}
+
+
+def aoi_window(src, aoi, clamp=True):
+    """
+    Compute the pixel window of a raster covering an AOI.
+
+    Args:
+        src (rasterio.io.DatasetReader): Open raster dataset.
+        aoi (list): Bounding box [lon_min, lat_min, lon_max, lat_max] in EPSG:4326.
+        clamp (bool): Whether to clamp the window to the raster extent.
+
+    Returns:
+        rasterio.windows.Window: Whole-pixel window, clamped to the raster extent
+        unless ``clamp`` is False.
+
+    Raises:
+        WindowError: If the AOI does not intersect the raster and ``clamp`` is set.
+    """
+    bounds = transform_bounds("EPSG:4326", src.crs, *aoi, densify_pts=21)
+    window = from_bounds(*bounds, transform=src.transform)
+    col_off = math.floor(window.col_off)
+    row_off = math.floor(window.row_off)
+    col_end = math.ceil(window.col_off + window.width)
+    row_end = math.ceil(window.row_off + window.height)
+    window = Window(col_off, row_off, col_end - col_off, row_end - row_off)
+    if not clamp:
+        return window
+    return window.intersection(Window(0, 0, src.width, src.height))
+
+
+def clip_to_aoi(href: str, aoi, file_path: str) -> int:
+    """
+    Write the part of a raster that intersects an AOI to a GeoTIFF.
+
+    For Cloud-Optimized GeoTIFFs served over HTTP, GDAL only fetches the internal
+    tiles that intersect the window, so the transfer volume scales with the size
+    of the AOI rather than the size of the scene.
+
+    Args:
+        href (str): URL or local path of the source raster.
+        aoi (list): Bounding box [lon_min, lat_min, lon_max, lat_max] in EPSG:4326.
+        file_path (str): Local path to save the clipped raster.
+
+    Returns:
+        int: Size in bytes of the written file.
+
+    Raises:
+        WindowError: If the AOI does not intersect the raster.
+        RasterioError: If the source cannot be read or the output not written.
+    """
+    tmp_path = f"{file_path}.part"
+    with rasterio.Env(**COG_READ_OPTIONS):
+        with rasterio.open(href) as src:
+            window = aoi_window(src, aoi)
+            data = src.read(window=window)
+            profile = src.profile.copy()
+
+        profile = _clip_profile(profile, window, data.shape)
+        with rasterio.open(tmp_path, "w", **profile) as dst:
+            dst.write(data)
+
+    os.replace(tmp_path, file_path)
+    return os.path.getsize(file_path)
+
+
+def clip_to_geometry(path: str, geometry, file_path: str) -> int:
+    """
+    Write the part of a raster inside a polygon to a GeoTIFF.
+
+    The raster is cut to the bounding box of the polygon, and pixels outside the
+    polygon are set to nodata (0 for integer rasters without a nodata value).
+
+    Args:
+        path (str): Path of the source raster.
+        geometry (shapely.Geometry): Polygon in EPSG:4326.
+        file_path (str): Local path to save the clipped raster.
+
+    Returns:
+        int: Size in bytes of the written file.
+
+    Raises:
+        WindowError: If the polygon does not intersect the raster.
+    """
+    with rasterio.open(path) as src:
+        window = aoi_window(src, list(geometry.bounds))
+        data = src.read(window=window)
+        profile = src.profile.copy()
+
+    profile = _clip_profile(profile, window, data.shape)
+    if profile.get("nodata") is None:
+        profile["nodata"] = float("nan") if data.dtype.kind == "f" else 0
+    if not geometry.equals(box(*geometry.bounds)):
+        shapes = [transform_geom("EPSG:4326", profile["crs"], mapping(geometry))]
+        outside = geometry_mask(
+            shapes,
+            out_shape=data.shape[1:],
+            transform=profile["transform"],
+            all_touched=True,
+        )
+        data[:, outside] = profile["nodata"]
+
+    tmp_path = f"{file_path}.part"
+    with rasterio.open(tmp_path, "w", **profile) as dst:
+        dst.write(data)
+    os.replace(tmp_path, file_path)
+    return os.path.getsize(file_path)
+
+
+def _clip_profile(profile, window, shape):
+    """Profile of a compressed GeoTIFF holding ``window`` of a raster."""
+    profile = dict(profile)
+    profile.update(
+        driver="GTiff",
+        width=shape[2],
+        height=shape[1],
+        transform=rasterio.windows.transform(window, profile["transform"]),
+        compress="deflate",
+    )
+    # Small clips can be smaller than a single block
+    if profile.get("tiled") and (
+        shape[2] < profile.get("blockxsize", 0)
+        or shape[1] < profile.get("blockysize", 0)
+    ):
+        profile.update(tiled=False)
+        profile.pop("blockxsize", None)
+        profile.pop("blockysize", None)
+    return profile
@@ -0,0 +1,160 @@
+# eo_data_pipeline/data_loader/cog.py
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import rasterio
+import rasterio.shutil
+from omegaconf import DictConfig
+
+from eo_data_pipeline.metrics import metrics
+
+CODECS = ("DEFLATE", "ZSTD", "LZW", "LERC", "LERC_DEFLATE", "LERC_ZSTD")
+
+
+def is_cog(path: str, codec: str) -> bool:
+    """
+    Check whether a file is already a COG compressed with the given codec.
+
+    Args:
+        path (str): Path of the raster.
+        codec (str): Compression codec, e.g. "DEFLATE".
+
+    Returns:
+        bool: True if the file does not need to be transcoded.
+    """
+    with rasterio.open(path) as src:
+        structure = src.tags(ns="IMAGE_STRUCTURE")
+    return (
+        structure.get("LAYOUT") == "COG"
+        and structure.get("COMPRESSION", "").upper() == codec
+    )
+
+
+def transcode_to_cog(path: str, options: dict) -> bool:
+    """
+    Rewrite a raster in place as a Cloud-Optimized GeoTIFF.
+
+    The file is written to a ``.part`` file next to it with the GDAL COG driver,
+    which tiles it internally and adds overviews, and then atomically renamed over
+    the original. Files that already are COGs with the same codec are left alone.
+
+    Args:
+        path (str): Path of the raster, any format GDAL reads (GeoTIFF, JP2, ...).
+        options (dict): Creation options of the COG driver, e.g.
+            ``{"COMPRESS": "ZSTD", "PREDICTOR": "YES", "BLOCKSIZE": 512}``.
+
+    Returns:
+        bool: True if the file was transcoded, False if it already was a COG.
+    """
+    if is_cog(path, options["COMPRESS"]):
+        return False
+    part_path = f"{path}.part"
+    rasterio.shutil.copy(path, part_path, driver="COG", **options)
+    os.replace(part_path, path)
+    return True
+
+
+class COGTranscoder:
+    """
+    A class for re-encoding saved asset files as Cloud-Optimized GeoTIFFs.
+
+    Assets are stored as published, which for the ``*-jp2`` bands means JPEG2000
+    files that are slow to decode, and for other sources may mean striped GeoTIFFs
+    without overviews. Transcoding them to internally tiled COGs with overviews
+    makes the windowed and overview reads of DataAccessLayer read only the tiles
+    they need. Files keep their ``<item_id>_<band>.tif`` names, and are transcoded
+    on a pool of worker processes since encoding is CPU-bound.
+
+    Attributes:
+        storage_path (str): Path of the asset files.
+        codec (str): Compression codec: DEFLATE, ZSTD, LZW or one of the LERC
+            variants.
+        options (dict): Creation options of the COG driver.
+        categorical_bands (set): Bands whose overviews use nearest resampling.
+        max_workers (int): Number of worker processes.
+        logger (logging.Logger): Logger for this class.
+    """
+
+    def __init__(self, config: DictConfig):
+        """
+        Initialize the COGTranscoder with the given configuration.
+
+        Args:
+            config (DictConfig): Configuration containing storage and cog settings.
+
+        Raises:
+            ValueError: If the codec is unknown.
+        """
+        cog = getattr(config, "cog", None)
+        self.storage_path = config.storage.path
+        self.codec = str(getattr(cog, "codec", "DEFLATE")).upper()
+        if self.codec not in CODECS:
+            raise ValueError(
+                f"Invalid COG codec: {self.codec}. Choose from: {', '.join(CODECS)}"
+            )
+
+        self.options = {
+            "COMPRESS": self.codec,
+            "BLOCKSIZE": getattr(cog, "block_size", 512),
+            "OVERVIEWS": "AUTO",
+            "OVERVIEW_RESAMPLING": getattr(cog, "overview_resampling", "average"),
+            "BIGTIFF": "IF_SAFER",
+        }
+        level = getattr(cog, "level", None)
+        if level is not None:
+            self.options["LEVEL"] = level
+        if self.codec.startswith("LERC"):
+            # 0 is lossless; larger values trade precision for size
+            self.options["MAX_Z_ERROR"] = getattr(cog, "max_z_error", 0)
+        else:
+            predictor = getattr(cog, "predictor", None)
+            # "YES" picks horizontal differencing for integers, floating point
+            # prediction for floats
+            self.options["PREDICTOR"] = "YES" if predictor is None else predictor
+
+        self.categorical_bands = {
+            getattr(getattr(config, "pipeline", None), "scl_band", "scl")
+        }
+        self.max_workers = getattr(cog, "max_workers", None) or os.cpu_count()
+        self.logger = logging.getLogger(__name__)
+
+    def transcode(self, items, spectral_bands) -> list:
+        """
+        Transcode the saved files of the given items and bands to COGs.
+
+        Args:
+            items (list): List of STAC items whose files should be transcoded.
+            spectral_bands (list): List of spectral bands to transcode.
+
+        Returns:
+            list: Paths of the files that were transcoded.
+        """
+        paths, options = [], []
+        for item in items:
+            for band in spectral_bands:
+                path = os.path.join(self.storage_path, f"{item.id}_{band}.tif")
+                # Files transcoded before are skipped without starting workers
+                if not os.path.exists(path) or is_cog(path, self.codec):
+                    continue
+                band_options = dict(self.options)
+                if band in self.categorical_bands:
+                    band_options["OVERVIEW_RESAMPLING"] = "nearest"
+                paths.append(path)
+                options.append(band_options)
+        if not paths:
+            self.logger.info("No files to transcode")
+            return []
+
+        with metrics.timer("load.transcode"), ProcessPoolExecutor(
+            max_workers=min(self.max_workers, len(paths)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            results = list(executor.map(transcode_to_cog, paths, options))
+
+        transcoded = [path for path, done in zip(paths, results) if done]
+        metrics.incr("load.transcoded", len(transcoded))
+        self.logger.info(f"Transcoded {len(transcoded)} files to {self.codec} COGs")
+        return transcoded
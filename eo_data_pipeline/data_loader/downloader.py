@@ -0,0 +1,157 @@
+# eo_data_pipeline/data_loader/downloader.py
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from eo_data_pipeline.metrics import metrics
+
+
+class DownloadError(Exception):
+    """Raised when an asset could not be downloaded."""
+
+
+@dataclass
+class DownloadResult:
+    """
+    Outcome of downloading a single asset.
+
+    Attributes:
+        url (str): URL the asset was requested from.
+        file_path (str): Local path the asset was written to.
+        status (str): One of "downloaded", "cached", "clipped" or "failed".
+        bytes_transferred (int): Number of bytes received over the network. For
+            clipped assets this is the size of the written file.
+        error (str, optional): Error message if the download failed.
+        seconds (float): Time spent loading the asset.
+    """
+
+    url: str
+    file_path: str
+    status: str
+    bytes_transferred: int = 0
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status != "failed"
+
+
+class AssetDownloader:
+    """
+    A class for streaming asset files over pooled keep-alive HTTP connections.
+
+    Each download is streamed to a ``.part`` file next to the target path and
+    atomically renamed once complete. If a ``.part`` file is found from an earlier
+    interrupted attempt, the transfer is resumed with an HTTP Range request.
+
+    A single AssetDownloader is safe to share between threads; the underlying
+    connection pool holds up to ``max_connections`` connections per host.
+
+    Attributes:
+        session (requests.Session): Session holding the connection pool.
+        timeout (float): Connect and read timeout in seconds.
+        chunk_size (int): Number of bytes read from the socket at a time.
+        logger (logging.Logger): Logger for this class.
+    """
+
+    def __init__(
+        self, max_connections: int = 4, timeout: float = 60, chunk_size: int = 1 << 20
+    ):
+        """
+        Initialize the AssetDownloader.
+
+        Args:
+            max_connections (int): Size of the per-host connection pool.
+            timeout (float): Connect and read timeout in seconds.
+            chunk_size (int): Number of bytes read from the socket at a time.
+        """
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=max_connections, pool_maxsize=max_connections
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.logger = logging.getLogger(__name__)
+
+    def download(self, url: str, file_path: str) -> int:
+        """
+        Download an asset, resuming a previous partial download if present.
+
+        Args:
+            url (str): URL of the asset to download.
+            file_path (str): Local path to save the downloaded asset.
+
+        Returns:
+            int: Number of bytes transferred over the network.
+
+        Raises:
+            DownloadError: If the request fails or the transfer is interrupted. The
+                partial file is kept so that the next attempt can resume.
+        """
+        part_path = f"{file_path}.part"
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        transferred = 0
+
+        try:
+            with self.session.get(
+                url, headers=headers, stream=True, timeout=self.timeout
+            ) as response:
+                if response.status_code == 416:
+                    # The partial file does not match the remote object, start over
+                    os.remove(part_path)
+                    return self.download(url, file_path)
+                response.raise_for_status()
+
+                if offset and response.status_code == 206:
+                    self.logger.info(f"Resuming download of {url} at byte {offset}")
+                    metrics.incr("load.resumed")
+                    mode = "ab"
+                else:
+                    mode = "wb"
+
+                with open(part_path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        f.write(chunk)
+                        transferred += len(chunk)
+        except (requests.RequestException, OSError) as e:
+            raise DownloadError(f"Failed to download asset from {url}: {e}") from e
+
+        os.replace(part_path, file_path)
+        return transferred
+
+    def head(self, url: str) -> dict:
+        """
+        Fetch the response headers of an asset without downloading it.
+
+        Args:
+            url (str): URL of the asset.
+
+        Returns:
+            dict: Response headers, e.g. ``ETag`` and ``Content-Length``.
+
+        Raises:
+            DownloadError: If the request fails.
+        """
+        try:
+            response = self.session.head(
+                url, timeout=self.timeout, allow_redirects=True
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise DownloadError(f"Failed to fetch headers of {url}: {e}") from e
+        return dict(response.headers)
+
+    def close(self):
+        """
+        Close all pooled connections.
+        """
+        self.session.close()
@@ -0,0 +1,100 @@
+# eo_data_pipeline/data_loader/fanout.py
+
+import json
+import logging
+import os
+
+from omegaconf import DictConfig
+from rasterio.errors import WindowError
+
+from eo_data_pipeline.data_fetcher.aois import to_feature_collection
+from eo_data_pipeline.metrics import metrics
+
+from .clipper import clip_to_geometry
+
+
+class AOIFanOut:
+    """
+    A class for cutting the shared files of a batch job into per-AOI outputs.
+
+    In a batch job every asset is downloaded once into ``storage.path``, however
+    many AOIs it covers. AOIFanOut then writes, for every AOI, the part of each
+    of its band files inside the AOI polygon to ``<output_path>/<aoi name>/``,
+    together with ``aoi.geojson`` and the STAC items of the AOI in
+    ``items.json``, so each AOI can be used like the output of a single-AOI run.
+
+    Attributes:
+        storage_path (str): Path of the shared band files.
+        output_path (str): Directory holding one directory per AOI.
+        logger (logging.Logger): Logger for this class.
+    """
+
+    def __init__(self, config: DictConfig):
+        """
+        Initialize the AOIFanOut with the given configuration.
+
+        Args:
+            config (DictConfig): Configuration containing storage and batch
+                settings.
+        """
+        self.storage_path = config.storage.path
+        self.output_path = getattr(
+            getattr(config, "batch", None), "output_path", "./data/aois/"
+        )
+        self.logger = logging.getLogger(__name__)
+
+    def aoi_path(self, aoi) -> str:
+        """Return the output directory of an AOI."""
+        return os.path.join(self.output_path, aoi.name)
+
+    def fan_out(self, aoi, items, bands) -> list:
+        """
+        Write the clips of one AOI.
+
+        Clips already written are skipped, so that an interrupted batch can be
+        run again.
+
+        Args:
+            aoi (AOI): The AOI.
+            items (list): STAC items intersecting the AOI.
+            bands (list): Bands (or indices) to clip.
+
+        Returns:
+            list: Paths of the clipped files.
+        """
+        aoi_path = self.aoi_path(aoi)
+        os.makedirs(aoi_path, exist_ok=True)
+        with open(os.path.join(aoi_path, "aoi.geojson"), "w") as f:
+            json.dump(to_feature_collection([aoi]), f)
+        with open(os.path.join(aoi_path, "items.json"), "w") as f:
+            json.dump(
+                {
+                    "type": "FeatureCollection",
+                    "features": [
+                        item.to_dict(include_self_link=False, transform_hrefs=False)
+                        for item in items
+                    ],
+                },
+                f,
+            )
+
+        clipped = []
+        for item in items:
+            for band in bands:
+                name = f"{item.id}_{band}.tif"
+                path = os.path.join(self.storage_path, name)
+                file_path = os.path.join(aoi_path, name)
+                if os.path.exists(file_path):
+                    clipped.append(file_path)
+                    continue
+                if not os.path.exists(path):
+                    continue
+                try:
+                    with metrics.timer("batch.clip"):
+                        clip_to_geometry(path, aoi.geometry, file_path)
+                except WindowError:
+                    # The footprint touches the AOI, the valid pixels do not
+                    continue
+                clipped.append(file_path)
+        self.logger.info(f"Clipped {len(clipped)} files for AOI {aoi.name}")
+        return clipped
@@ -0,0 +1,180 @@
+# eo_data_pipeline/data_loader/geoparquet.py
+
+import json
+import os
+import uuid
+
+from shapely.geometry import shape
+
+# Properties stored as their own typed columns; all other properties are kept
+# together as a JSON string in the "properties" column.
+PROPERTY_COLUMNS = {
+    "eo:cloud_cover": "float64",
+    "s2:nodata_pixel_percentage": "float64",
+    "platform": "string",
+    "mgrs:utm_zone": "int64",
+    "mgrs:latitude_band": "string",
+    "mgrs:grid_square": "string",
+    "updated": "string",
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError as e:
+        raise ImportError("GeoParquet export requires the pyarrow package") from e
+    return pa, ds
+
+
+def _schema(pa):
+    geo = {
+        "version": "1.1.0",
+        "primary_column": "geometry",
+        "columns": {
+            # No "crs" key: STAC geometries are in OGC:CRS84, which GeoParquet
+            # implies when the key is absent (an explicit null means undefined)
+            "geometry": {
+                "encoding": "WKB",
+                "geometry_types": [],
+                "covering": {
+                    "bbox": {
+                        "xmin": ["bbox", "xmin"],
+                        "ymin": ["bbox", "ymin"],
+                        "xmax": ["bbox", "xmax"],
+                        "ymax": ["bbox", "ymax"],
+                    }
+                },
+            }
+        },
+    }
+    fields = [
+        ("id", pa.string()),
+        ("collection", pa.string()),
+        ("datetime", pa.timestamp("us", tz="UTC")),
+        ("geometry", pa.binary()),
+        (
+            "bbox",
+            pa.struct(
+                [(name, pa.float64()) for name in ("xmin", "ymin", "xmax", "ymax")]
+            ),
+        ),
+    ]
+    fields += [
+        (name, pa.type_for_alias(kind)) for name, kind in PROPERTY_COLUMNS.items()
+    ]
+    fields += [
+        ("mgrs_tile", pa.string()),
+        ("assets", pa.map_(pa.string(), pa.string())),
+        ("properties", pa.string()),
+        ("year", pa.int16()),
+        ("month", pa.int8()),
+    ]
+    return pa.schema(fields, metadata={"geo": json.dumps(geo)})
+
+
+def _row(item):
+    properties = dict(item.properties)
+    properties.pop("datetime", None)
+    when = item.datetime
+    bbox = None
+    if item.bbox:
+        # 2D or 3D bbox: the maxima start half-way through the list
+        half = len(item.bbox) // 2
+        corners = item.bbox[:2] + item.bbox[half : half + 2]
+        bbox = dict(zip(("xmin", "ymin", "xmax", "ymax"), corners))
+    row = {
+        "id": item.id,
+        "collection": item.collection_id,
+        "datetime": when,
+        "geometry": shape(item.geometry).wkb if item.geometry else None,
+        "bbox": bbox,
+    }
+    for name in PROPERTY_COLUMNS:
+        row[name] = properties.pop(name, None)
+    zone, band, square = (
+        row["mgrs:utm_zone"],
+        row["mgrs:latitude_band"],
+        row["mgrs:grid_square"],
+    )
+    row["mgrs_tile"] = None
+    if zone and band and square:
+        row["mgrs_tile"] = f"{int(zone):02d}{band}{square}"  # e.g. 33TVM
+    row["assets"] = [(key, asset.href) for key, asset in item.assets.items()]
+    row["properties"] = json.dumps(properties, default=str)
+    row["year"] = when.year if when else None
+    row["month"] = when.month if when else None
+    return row
+
+
+def write_geoparquet(items: list, path: str) -> int:
+    """
+    Append STAC items to a GeoParquet table partitioned by year and month.
+
+    The table follows the stac-geoparquet layout: one row per item with a WKB
+    ``geometry`` column and a ``bbox`` covering column, common properties (cloud
+    cover, MGRS tile, ...) as typed columns, asset hrefs as a map column and all
+    other properties as JSON. Rows are written to hive partitions
+    ``year=YYYY/month=M``; every call adds new files, so items already in the
+    table (by id) are skipped.
+
+    Args:
+        items (list): STAC items to write.
+        path (str): Root directory of the table.
+
+    Returns:
+        int: Number of items written.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    pa, ds = _pyarrow()
+    schema = _schema(pa)
+    existing = set()
+    if os.path.isdir(path):
+        existing = set(read_geoparquet(path, columns=["id"]).column("id").to_pylist())
+
+    rows = []
+    for item in items:
+        if item.id not in existing:
+            existing.add(item.id)
+            rows.append(_row(item))
+    if not rows:
+        return 0
+
+    ds.write_dataset(
+        pa.Table.from_pylist(rows, schema=schema),
+        path,
+        format="parquet",
+        partitioning=ds.partitioning(
+            pa.schema([("year", pa.int16()), ("month", pa.int8())]), flavor="hive"
+        ),
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return len(rows)
+
+
+def read_geoparquet(path: str, filter=None, columns=None):
+    """
+    Read a GeoParquet table written by write_geoparquet.
+
+    Args:
+        path (str): Root directory of the table.
+        filter (pyarrow.compute.Expression, optional): Row filter, e.g.
+            ``pc.field("eo:cloud_cover") < 10``; filters on ``year`` and ``month``
+            only read the matching partitions.
+        columns (list, optional): Columns to read.
+
+    Returns:
+        pyarrow.Table: The selected rows and columns.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    pa, ds = _pyarrow()
+    dataset = ds.dataset(
+        path, schema=_schema(pa), format="parquet", partitioning="hive"
+    )
+    return dataset.to_table(columns=columns, filter=filter)
@@ -1,11 +1,25 @@
 # eo_data_pipeline/data_loader/loader.py
 
+import json
 import logging
 import os
-import urllib.request
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 from omegaconf import DictConfig
 from pystac import Catalog, Item
+from pystac.utils import str_to_datetime
+from rasterio.errors import RasterioError, WindowError
+
+from eo_data_pipeline.data_access.index import CatalogIndex
+from eo_data_pipeline.metrics import metrics
+
+from .cache import AssetCache
+from .clipper import clip_to_aoi
+from .downloader import AssetDownloader, DownloadError, DownloadResult
+from .geoparquet import write_geoparquet
+from .transfer import TransferEngine
 
 
 class DataLoader:
@@ -18,6 +32,22 @@ class DataLoader:
     Attributes:
         storage_path (str): Path to store downloaded asset files.
         catalog_path (str): Path to store the PySTAC catalog.
+        max_concurrent_downloads (int): Maximum number of assets downloaded at once.
+        load_mode (str): "full" to download whole assets, or "clip" to only fetch
+            and save the part of each asset that intersects the AOI.
+        catalog_mode (str): "upsert" to add new and changed items to an existing
+            catalog, or "overwrite" to replace it on every save.
+        use_index (bool): Whether saved items and files are recorded in the
+            CatalogIndex next to the catalog.
+        geoparquet_path (str, optional): If set, saved items are also appended to
+            a GeoParquet table at this path.
+        downloader (AssetDownloader or TransferEngine): Download engine shared by
+            all transfers; the adaptive TransferEngine if ``transfer.enabled``.
+        cache (AssetCache, optional): Local asset cache, if configured.
+        download_results (list): DownloadResult of every asset handled by the
+            most recent call to load_data.
+        cache_hits (int): Assets served from the cache in the last load_data call.
+        cache_misses (int): Assets not found in the cache in the last load_data call.
         logger (logging.Logger): Logger for this class.
     """
 
@@ -30,74 +60,388 @@ class DataLoader:
         """
         self.storage_path = config.storage.path
         self.catalog_path = config.storage.catalog_path
+        self.max_concurrent_downloads = getattr(
+            config.storage, "max_concurrent_downloads", 4
+        )
+        self.load_mode = getattr(config.storage, "load_mode", "full")
+        self.catalog_mode = getattr(config.storage, "catalog_mode", "upsert")
+        self.use_index = getattr(config.storage, "index", True)
+        self._index = None
+        self.geoparquet_path = getattr(config.storage, "geoparquet_path", None)
+        transfer = getattr(config, "transfer", None)
+        if getattr(transfer, "enabled", False):
+            self.downloader = TransferEngine(
+                max_per_host=getattr(transfer, "max_per_host", 16),
+                initial_per_host=getattr(transfer, "initial_per_host", 4),
+                min_per_host=getattr(transfer, "min_per_host", 1),
+                rate=getattr(transfer, "rate", None),
+                burst=getattr(transfer, "burst", None),
+                max_retries=getattr(transfer, "max_retries", 5),
+                backoff_base=getattr(transfer, "backoff_base", 0.5),
+                backoff_max=getattr(transfer, "backoff_max", 30.0),
+                latency_target=getattr(transfer, "latency_target", None),
+                timeout=getattr(transfer, "timeout", 60),
+            )
+            # Every transfer is handed to the engine at once; it limits how many
+            # of them run
+            self.max_concurrent_downloads = max(
+                self.max_concurrent_downloads, self.downloader.max_per_host
+            )
+        else:
+            self.downloader = AssetDownloader(
+                max_connections=self.max_concurrent_downloads
+            )
+        self.cache = None
+        cache_path = getattr(config.storage, "cache_path", None)
+        if cache_path:
+            max_size_gb = getattr(config.storage, "cache_max_size_gb", None)
+            max_bytes = int(max_size_gb * 1024**3) if max_size_gb else None
+            self.cache = AssetCache(cache_path, max_bytes=max_bytes)
+        self.download_results = []
+        self.cache_hits = 0
+        self.cache_misses = 0
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def index(self):
+        """
+        CatalogIndex of the catalog, opened on first use; None if disabled.
+        """
+        if self.use_index and self._index is None:
+            self._index = CatalogIndex(self.catalog_path)
+        return self._index
+
     def save_metadata(self, items: list):
         """
         Save metadata of STAC items to a PySTAC catalog.
 
+        In "upsert" catalog mode, an existing catalog at ``catalog_path`` is
+        updated in place: only items that are new, or whose ``updated`` timestamp
+        changed, are written, and the root catalog is rewritten only if items were
+        added. In "overwrite" mode, a new catalog of the given items replaces the
+        existing one. If ``geoparquet_path`` is set, items not yet in the
+        GeoParquet table there are appended to it.
+
         Args:
             items (list): List of STAC items to save as metadata.
+
+        Returns:
+            int: Number of item files written.
         """
+        with metrics.timer("catalog.save"):
+            written = self._save_metadata(items)
+        metrics.incr("catalog.items_written", written)
+        return written
+
+    def _save_metadata(self, items):
         # Ensure Catalog path exists
         if not os.path.exists(self.catalog_path):
             os.makedirs(self.catalog_path)
             self.logger.info(f"Created catalog path: {self.catalog_path}")
 
-        # Create and save PySTAC catalog
-        catalog = Catalog(
-            id="my-catalog", description="PySTAC catalog for saving Metadata"
-        )
+        if self.geoparquet_path:
+            appended = write_geoparquet(items, self.geoparquet_path)
+            self.logger.info(f"Items appended to GeoParquet table: {appended}")
+
+        catalog_file = os.path.join(self.catalog_path, "catalog.json")
+        if self.catalog_mode == "overwrite" or not os.path.exists(catalog_file):
+            # Create and save PySTAC catalog
+            catalog = Catalog(
+                id="my-catalog", description="PySTAC catalog for saving Metadata"
+            )
+            for item in items:
+                catalog.add_item(item)
+            catalog.normalize_hrefs(self.catalog_path)
+            catalog.save(catalog_type="SELF_CONTAINED")
+            if self.index is not None:
+                self.index.clear()
+                self.index.add_items(items)
+            return len(items)
+
+        catalog = Catalog.from_file(catalog_file)
+        known_ids = {
+            os.path.splitext(os.path.basename(link.get_absolute_href()))[0]
+            for link in catalog.get_item_links()
+        }
+
+        written = []
+        added = 0
         for item in items:
-            catalog.add_item(item)
-        catalog.normalize_hrefs(self.catalog_path)
-        catalog.save(catalog_type="SELF_CONTAINED")
+            item_file = os.path.join(self.catalog_path, item.id, f"{item.id}.json")
+            if item.id in known_ids:
+                if not self._item_changed(item, item_file):
+                    continue
+                item.set_root(catalog)
+                item.set_parent(catalog)
+            else:
+                catalog.add_item(item)
+                known_ids.add(item.id)
+                added += 1
+            item.set_self_href(item_file)
+            item.save_object(include_self_link=False)
+            written.append(item)
+
+        if added:
+            catalog.save_object(include_self_link=False)
+        if self.index is not None:
+            self.index.add_items(written)
+        self.logger.info(
+            f"Catalog items written: {len(written)} ({added} new), "
+            f"unchanged: {len(items) - len(written)}"
+        )
+        return len(written)
+
+    @staticmethod
+    def _item_changed(item, item_file) -> bool:
+        """
+        Check whether an item differs from the version saved at ``item_file``.
+
+        Items are compared by their ``updated`` property, falling back to
+        ``datetime`` for items without one.
+        """
+        try:
+            with open(item_file) as f:
+                saved = json.load(f)["properties"]
+        except (OSError, ValueError, KeyError):
+            return True
+        if "updated" in item.properties or "updated" in saved:
+            return item.properties.get("updated") != saved.get("updated")
+        if item.datetime is None or saved.get("datetime") is None:
+            return True
+        return item.datetime != str_to_datetime(saved["datetime"])
 
-    def load_data(self, items, spectral_bands):
+    def load_data(self, items, spectral_bands, aoi=None):
         """
         Load data by downloading assets for specified STAC items and spectral bands.
 
+        Assets are downloaded concurrently, with at most ``max_concurrent_downloads``
+        transfers in flight. If an asset cache is configured, it is consulted
+        first and unchanged assets are linked into the storage path instead of
+        being downloaded again. The outcome of every asset is recorded in
+        ``download_results``; assets that failed to download are not part of the
+        returned list.
+
+        In "clip" load mode, only the window of each asset that intersects
+        ``aoi`` is read (using HTTP range requests for COGs) and saved as a small
+        GeoTIFF. The asset cache is not used in this mode.
+
         Args:
             items (list): List of STAC items to load data from.
             spectral_bands (list): List of spectral bands to load.
+            aoi (list, optional): Bounding box [lon_min, lat_min, lon_max, lat_max]
+                to clip assets to in "clip" load mode.
 
         Returns:
             list: List of file paths to the saved items.
         """
-        saved_files = []
+        downloads = self.plan_downloads(items, spectral_bands)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_downloads) as executor:
+            results = list(
+                executor.map(
+                    lambda download: self.load_asset(download[2], download[3], aoi=aoi),
+                    downloads,
+                )
+            )
+
+        return self.record_downloads(downloads, results)
+
+    def plan_downloads(self, items, spectral_bands):
+        """
+        List the assets to load for specified STAC items and spectral bands.
 
+        Args:
+            items (list): List of STAC items to load data from.
+            spectral_bands (list): List of spectral bands to load.
+
+        Returns:
+            list: (item_id, band, asset, file_path) tuples, one per asset.
+        """
         # Ensure storage path exists
         if not os.path.exists(self.storage_path):
-            os.makedirs(self.storage_path)
+            os.makedirs(self.storage_path, exist_ok=True)
             self.logger.info(f"Created storage path: {self.storage_path}")
 
+        downloads = []
         for item in items:
             for band in spectral_bands:
                 asset = item.assets.get(band)
                 if asset:
                     file_path = os.path.join(self.storage_path, f"{item.id}_{band}.tif")
-                    self.logger.info(
-                        f"Downloading asset from {asset.href} to {file_path}"
+                    downloads.append((item.id, band, asset, file_path))
+        return downloads
+
+    def record_downloads(self, downloads, results):
+        """
+        Record the outcome of loading planned assets.
+
+        Results are stored in ``download_results``, saved files are added to the
+        catalog index and totals are logged.
+
+        Args:
+            downloads (list): Assets as returned by plan_downloads.
+            results (list): DownloadResult of each asset, in the same order.
+
+        Returns:
+            list: List of file paths to the saved items.
+        """
+        self.download_results = list(results)
+        for result in self.download_results:
+            metrics.observe("load.asset", result.seconds)
+            metrics.incr(f"load.assets.{result.status}")
+            metrics.incr("load.bytes", result.bytes_transferred)
+
+        if self.index is not None:
+            self.index.add_assets(
+                [
+                    (item_id, band, result.file_path)
+                    for (item_id, band, _, _), result in zip(
+                        downloads, self.download_results
                     )
-                    self.download_asset(asset.href, file_path)
-                    saved_files.append(file_path)
-                    self.logger.info(f"Saved file: {file_path}")
+                    if result.ok
+                ]
+            )
 
-        self.logger.info(f"Total files saved: {len(saved_files)}")
+        saved_files = [
+            result.file_path for result in self.download_results if result.ok
+        ]
+        failed = len(self.download_results) - len(saved_files)
+        self.logger.info(f"Total files saved: {len(saved_files)}, failed: {failed}")
+
+        if self.cache is not None:
+            statuses = [result.status for result in self.download_results]
+            self.cache_hits = statuses.count("cached")
+            self.cache_misses = len(statuses) - self.cache_hits
+            self.logger.info(
+                f"Asset cache hits: {self.cache_hits}, misses: {self.cache_misses}"
+            )
         return saved_files
 
-    def download_asset(self, url, file_path):
+    def load_asset(self, asset, file_path, aoi=None) -> DownloadResult:
         """
-        Download an asset from a given URL to a specified file path.
+        Download a single asset, or take it from the cache, and record its outcome.
 
         Args:
-            url (str): URL of the asset to download.
+            asset (pystac.Asset): Asset to download.
             file_path (str): Local path to save the downloaded asset.
+            aoi (list, optional): Bounding box to clip the asset to in "clip" mode.
+
+        Returns:
+            DownloadResult: Status of the download.
         """
+        start = time.perf_counter()
+        with metrics.in_flight("load.in_flight"):
+            result = self._load_asset(asset, file_path, aoi)
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def _load_asset(self, asset, file_path, aoi):
+        url = asset.href
+        if self.load_mode == "clip" and aoi is not None:
+            self.logger.info(f"Clipping asset from {url} to {file_path}")
+            try:
+                size = self.clip_asset(url, aoi, file_path)
+            except (DownloadError, WindowError) as e:
+                self.logger.error(
+                    f"Failed to clip asset from {url} to {file_path}: {e}"
+                )
+                return DownloadResult(url, file_path, "failed", error=str(e))
+            self.logger.info(f"Saved file: {file_path}")
+            return DownloadResult(url, file_path, "clipped", size)
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._cache_key(asset)
+            if cache_key is not None and self.cache.materialise(cache_key, file_path):
+                self.logger.info(f"Using cached copy of {url} for {file_path}")
+                return DownloadResult(url, file_path, "cached")
+
+        self.logger.info(f"Downloading asset from {url} to {file_path}")
         try:
-            urllib.request.urlretrieve(url, file_path)
-        except Exception as e:
+            transferred = self.download_asset(url, file_path)
+        except DownloadError as e:
             self.logger.error(
                 f"Failed to download asset from {url} to {file_path}: {e}"
             )
+            return DownloadResult(url, file_path, "failed", error=str(e))
+
+        if cache_key is not None:
+            self.cache.add(cache_key, file_path, href=url)
+        self.logger.info(f"Saved file: {file_path}")
+        return DownloadResult(url, file_path, "downloaded", transferred or 0)
+
+    def clip_asset(self, url, aoi, file_path):
+        """
+        Save the part of an asset that intersects an AOI to a specified file path.
+
+        Args:
+            url (str): URL or local path of the asset.
+            aoi (list): Bounding box [lon_min, lat_min, lon_max, lat_max].
+            file_path (str): Local path to save the clipped asset.
+
+        Returns:
+            int: Size in bytes of the saved file.
+
+        Raises:
+            DownloadError: If the asset could not be read or written.
+            WindowError: If the AOI does not intersect the asset.
+        """
+        try:
+            return clip_to_aoi(url, aoi, file_path)
+        except WindowError:
+            raise
+        except RasterioError as e:
+            raise DownloadError(f"Failed to read asset from {url}: {e}") from e
+
+    def _cache_key(self, asset) -> Optional[str]:
+        """
+        Build the cache key of an asset.
+
+        The ``file:checksum`` and ``file:size`` fields of the asset are used when
+        present. Otherwise the ETag reported by the server identifies the version
+        of the asset. Without any of them a cached copy could not be told apart
+        from a changed remote object, so the asset is not cached.
+
+        Args:
+            asset (pystac.Asset): Asset to build the key for.
+
+        Returns:
+            str: Cache key of the asset, or None if it has no version metadata.
+        """
+        checksum = asset.extra_fields.get("file:checksum")
+        size = asset.extra_fields.get("file:size")
+        etag = None
+        if checksum is None and size is None:
+            try:
+                etag = self.downloader.head(asset.href).get("ETag")
+            except DownloadError as e:
+                self.logger.warning(f"Could not fetch ETag of {asset.href}: {e}")
+            if etag is None:
+                return None
+        return AssetCache.make_key(asset.href, checksum=checksum, size=size, etag=etag)
+
+    def download_asset(self, url, file_path):
+        """
+        Download an asset from a given URL to a specified file path.
+
+        Args:
+            url (str): URL of the asset to download.
+            file_path (str): Local path to save the downloaded asset.
+
+        Returns:
+            int: Number of bytes transferred over the network.
+
+        Raises:
+            DownloadError: If the asset could not be downloaded.
+        """
+        with metrics.timer("load.download"):
+            return self.downloader.download(url, file_path)
+
+    def close(self):
+        """
+        Close the connections of the downloader and of the catalog index.
+        """
+        self.downloader.close()
+        if self._index is not None:
+            self._index.close()
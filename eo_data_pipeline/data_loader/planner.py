@@ -0,0 +1,245 @@
+# eo_data_pipeline/data_loader/planner.py
+
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from omegaconf import DictConfig
+from shapely.geometry import box, shape
+
+from eo_data_pipeline.metrics import metrics
+
+from .cache import AssetCache
+from .downloader import AssetDownloader, DownloadError
+from .loader import DataLoader
+
+# Statuses of a planned asset
+DOWNLOAD = "download"
+ON_DISK = "on_disk"
+CACHED = "cached"
+
+
+@dataclass
+class AssetEstimate:
+    """
+    Estimated cost of loading a single asset.
+
+    Attributes:
+        item_id (str): Id of the item.
+        band (str): Band of the asset.
+        href (str): URL of the asset.
+        file_path (str): Local path the asset would be written to.
+        status (str): "download", or "on_disk" or "cached" if it would not be
+            transferred.
+        size (int, optional): Size of the asset in bytes, if known.
+        source (str, optional): Where the size came from: "file:size", "head" or
+            "local".
+        fraction (float): Part of the asset expected to be read, below 1 for
+            clipped assets.
+    """
+
+    item_id: str
+    band: str
+    href: str
+    file_path: str
+    status: str = DOWNLOAD
+    size: Optional[int] = None
+    source: Optional[str] = None
+    fraction: float = 1.0
+
+
+class DownloadPlanner:
+    """
+    A class for estimating the bytes and time a load would take, without loading.
+
+    The size of each asset is taken from its ``file:size`` field, or else from
+    the ``Content-Length`` of a HEAD request, sent in parallel for all such
+    assets. Assets whose file already exists in ``storage.path``, or that are in
+    the asset cache, are reported as savings. Assets of unknown size are
+    counted with the mean size of the known assets of their band.
+
+    Attributes:
+        loader (DataLoader): Loader whose paths, cache and downloader are used.
+        bandwidth_mbps (float): Bandwidth in Mbit/s to project durations with.
+        head_requests (bool): Whether to send HEAD requests for unknown sizes.
+        max_concurrent_requests (int): Number of HEAD requests in flight.
+        logger (logging.Logger): Logger for this class.
+    """
+
+    def __init__(self, config: DictConfig):
+        """
+        Initialize the DownloadPlanner with the given configuration.
+
+        Args:
+            config (DictConfig): Configuration containing storage and plan
+                settings.
+        """
+        plan = getattr(config, "plan", None)
+        self.loader = DataLoader(config)
+        self.bandwidth_mbps = getattr(plan, "bandwidth_mbps", 100.0)
+        self.head_requests = getattr(plan, "head_requests", True)
+        self.max_concurrent_requests = getattr(plan, "max_concurrent_requests", 16)
+        if isinstance(self.loader.downloader, AssetDownloader):
+            # A pooled connection for each HEAD request in flight
+            self.loader.downloader.close()
+            self.loader.downloader = AssetDownloader(
+                max_connections=self.max_concurrent_requests
+            )
+        self.logger = logging.getLogger(__name__)
+
+    def plan(self, items, spectral_bands, aoi=None) -> list:
+        """
+        Estimate the size and status of every asset a load would handle.
+
+        Args:
+            items (list): STAC items to load.
+            spectral_bands (list): Bands to load.
+            aoi (list or dict, optional): Bounding box, or bounding boxes by item
+                id, the assets are clipped to in "clip" load mode.
+
+        Returns:
+            list: AssetEstimate of each asset, in load order.
+        """
+        footprints = {item.id: _footprint(item) for item in items}
+        downloads = [
+            (item.id, band, item.assets[band])
+            for item in items
+            for band in spectral_bands
+            if item.assets.get(band)
+        ]
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_requests) as pool:
+            estimates = list(
+                pool.map(lambda download: self._estimate(*download), downloads)
+            )
+        if self.loader.load_mode == "clip" and aoi is not None:
+            for estimate in estimates:
+                item_aoi = aoi.get(estimate.item_id) if isinstance(aoi, dict) else aoi
+                estimate.fraction = _clip_fraction(
+                    footprints[estimate.item_id], item_aoi
+                )
+        return estimates
+
+    def _estimate(self, item_id, band, asset) -> AssetEstimate:
+        estimate = AssetEstimate(
+            item_id,
+            band,
+            asset.href,
+            os.path.join(self.loader.storage_path, f"{item_id}_{band}.tif"),
+        )
+        checksum = asset.extra_fields.get("file:checksum")
+        size = asset.extra_fields.get("file:size")
+        etag = None
+        if size is not None:
+            estimate.size, estimate.source = int(size), "file:size"
+        elif not asset.href.startswith(("http://", "https://")):
+            if os.path.exists(asset.href):
+                estimate.size, estimate.source = os.path.getsize(asset.href), "local"
+        elif self.head_requests:
+            try:
+                headers = {
+                    key.lower(): value
+                    for key, value in self.loader.downloader.head(asset.href).items()
+                }
+            except DownloadError as e:
+                self.logger.warning(f"Could not fetch size of {asset.href}: {e}")
+            else:
+                etag = headers.get("etag")
+                if headers.get("content-length") is not None:
+                    estimate.size = int(headers["content-length"])
+                    estimate.source = "head"
+
+        # Clipped files are smaller than their assets, so any of them counts
+        if os.path.exists(estimate.file_path) and (
+            self.loader.load_mode == "clip"
+            or estimate.size is None
+            or os.path.getsize(estimate.file_path) == estimate.size
+        ):
+            estimate.status = ON_DISK
+        elif (
+            self.loader.cache is not None
+            and self.loader.load_mode != "clip"
+            and (checksum is not None or size is not None or etag is not None)
+        ):
+            # Same key as DataLoader uses; the ETag only counts without file fields
+            key = AssetCache.make_key(
+                asset.href,
+                checksum=checksum,
+                size=size,
+                etag=etag if checksum is None and size is None else None,
+            )
+            if key in self.loader.cache:
+                estimate.status = CACHED
+        return estimate
+
+    def summarize(self, estimates: list) -> dict:
+        """
+        Total the estimates of a plan.
+
+        Args:
+            estimates (list): AssetEstimate of each asset, as returned by plan.
+
+        Returns:
+            dict: Number of items and assets, estimated bytes in total, by band
+            and by status, the number of assets of unknown size, and the
+            projected duration of the transfers at ``bandwidth_mbps``.
+        """
+        known = defaultdict(list)
+        for estimate in estimates:
+            if estimate.size is not None:
+                known[estimate.band].append(estimate.size)
+        mean_size = {band: sum(sizes) / len(sizes) for band, sizes in known.items()}
+
+        by_band = defaultdict(int)
+        by_status = dict.fromkeys((DOWNLOAD, ON_DISK, CACHED), 0)
+        assets_by_status = dict.fromkeys((DOWNLOAD, ON_DISK, CACHED), 0)
+        unknown = 0
+        for estimate in estimates:
+            size = estimate.size
+            if size is None:
+                unknown += 1
+                size = mean_size.get(estimate.band, 0)
+            size = int(size * estimate.fraction)
+            by_band[estimate.band] += size
+            by_status[estimate.status] += size
+            assets_by_status[estimate.status] += 1
+
+        download_bytes = by_status[DOWNLOAD]
+        seconds = download_bytes * 8 / (self.bandwidth_mbps * 1e6)
+        metrics.incr("plan.download_bytes", download_bytes)
+        return {
+            "items": len({estimate.item_id for estimate in estimates}),
+            "assets": len(estimates),
+            "bytes": sum(by_band.values()),
+            "bytes_by_band": dict(by_band),
+            "download_bytes": download_bytes,
+            "on_disk_bytes": by_status[ON_DISK],
+            "cached_bytes": by_status[CACHED],
+            "assets_by_status": assets_by_status,
+            "unknown_sizes": unknown,
+            "bandwidth_mbps": self.bandwidth_mbps,
+            "estimated_seconds": round(seconds, 1),
+        }
+
+    def close(self):
+        """
+        Close the connections of the HEAD requests and of the catalog index.
+        """
+        self.loader.close()
+
+
+def _footprint(item):
+    if item.geometry:
+        return shape(item.geometry)
+    if item.bbox:
+        return box(*item.bbox)
+    return None
+
+
+def _clip_fraction(footprint, aoi) -> float:
+    # Part of the footprint inside the AOI, i.e. the part of the asset a clip reads
+    if footprint is None or aoi is None or footprint.area == 0:
+        return 1.0
+    return footprint.intersection(box(*aoi)).area / footprint.area
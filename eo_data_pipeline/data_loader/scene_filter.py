@@ -0,0 +1,134 @@
+# eo_data_pipeline/data_loader/scene_filter.py
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import rasterio
+from omegaconf import DictConfig
+from rasterio.errors import RasterioError
+
+from eo_data_pipeline.metrics import metrics
+
+from .clipper import COG_READ_OPTIONS, aoi_window
+
+# Sentinel-2 scene classification (SCL) classes counted as clear observations:
+# vegetation, bare soil, water and snow. Nodata, saturated, dark, cloud shadow,
+# unclassified, cloud and cirrus pixels are not.
+VALID_SCL_CLASSES = [4, 5, 6, 11]
+
+# Item property the computed fraction is stored in
+VALID_FRACTION_PROPERTY = "eo_data_pipeline:aoi_valid_fraction"
+
+
+def valid_fraction(href: str, aoi, valid_classes, overview_level=None) -> float:
+    """
+    Compute the fraction of an AOI covered by clear pixels of an SCL raster.
+
+    Only the window of the raster covering the AOI is read, which for COGs served
+    over HTTP means only the intersecting internal tiles are fetched. Parts of the
+    AOI outside the raster count as not clear.
+
+    Args:
+        href (str): URL or local path of the SCL raster.
+        aoi (list): Bounding box [lon_min, lat_min, lon_max, lat_max] in EPSG:4326.
+        valid_classes (list): SCL classes counted as clear.
+        overview_level (int, optional): Overview to read instead of the full
+            resolution raster, to transfer even less data.
+
+    Returns:
+        float: Fraction of clear pixels, between 0 and 1.
+    """
+    with rasterio.Env(**COG_READ_OPTIONS):
+        with rasterio.open(href, overview_level=overview_level) as src:
+            window = aoi_window(src, aoi, clamp=False)
+            scl = src.read(1, window=window, boundless=True, fill_value=0)
+    if scl.size == 0:
+        return 0.0
+    return float(np.isin(scl, valid_classes).mean())
+
+
+class SceneFilter:
+    """
+    A class for dropping scenes that are cloudy over the AOI before they are loaded.
+
+    For every item, only the scene classification band is read over the AOI and
+    the fraction of clear pixels is computed. Items below ``min_valid_fraction``
+    are dropped, so none of their other bands are downloaded. The fraction of
+    the kept items is stored in their properties under ``VALID_FRACTION_PROPERTY``.
+
+    Items without an SCL asset, or whose SCL asset cannot be read, are kept.
+
+    Attributes:
+        min_valid_fraction (float): Minimum fraction of clear pixels over the AOI.
+        valid_classes (list): SCL classes counted as clear.
+        scl_band (str): Asset key of the scene classification band.
+        overview_level (int, optional): Overview of the SCL band to read.
+        max_workers (int): Number of SCL windows read concurrently.
+        logger (logging.Logger): Logger for this class.
+    """
+
+    def __init__(self, config: DictConfig):
+        """
+        Initialize the SceneFilter with the given configuration.
+
+        Args:
+            config (DictConfig): Configuration containing the pipeline settings.
+        """
+        pipeline = config.pipeline
+        self.min_valid_fraction = getattr(pipeline, "min_valid_fraction", None) or 0.0
+        self.valid_classes = list(
+            getattr(pipeline, "valid_scl_classes", None) or VALID_SCL_CLASSES
+        )
+        self.scl_band = getattr(pipeline, "scl_band", "scl")
+        self.overview_level = getattr(pipeline, "scl_overview_level", None)
+        self.max_workers = getattr(config.storage, "max_concurrent_downloads", 4)
+        self.logger = logging.getLogger(__name__)
+
+    def filter(self, items: list, aoi) -> list:
+        """
+        Drop items whose clear-pixel fraction over the AOI is too low.
+
+        Args:
+            items (list): List of STAC items to filter.
+            aoi (list): Bounding box [lon_min, lat_min, lon_max, lat_max].
+
+        Returns:
+            list: The items to keep, in their original order.
+        """
+        with metrics.timer("filter.scl"):
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                fractions = list(
+                    executor.map(lambda item: self._valid_fraction(item, aoi), items)
+                )
+
+        kept = []
+        for item, fraction in zip(items, fractions):
+            if fraction is None:
+                kept.append(item)
+            elif fraction >= self.min_valid_fraction:
+                item.properties[VALID_FRACTION_PROPERTY] = round(fraction, 4)
+                kept.append(item)
+            else:
+                self.logger.info(
+                    f"Skipping {item.id}: {fraction:.1%} of the AOI is clear"
+                )
+        metrics.incr("filter.scenes_checked", len(items))
+        metrics.incr("filter.scenes_rejected", len(items) - len(kept))
+        self.logger.info(f"Scenes kept after SCL filter: {len(kept)} of {len(items)}")
+        return kept
+
+    def _valid_fraction(self, item, aoi):
+        asset = item.assets.get(self.scl_band)
+        if asset is None:
+            self.logger.warning(f"{item.id} has no {self.scl_band} asset, keeping it")
+            return None
+        try:
+            return valid_fraction(
+                asset.href, aoi, self.valid_classes, self.overview_level
+            )
+        except RasterioError as e:
+            self.logger.warning(
+                f"Could not read {self.scl_band} of {item.id}, keeping it: {e}"
+            )
+            return None
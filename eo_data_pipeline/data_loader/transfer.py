@@ -0,0 +1,514 @@
+# eo_data_pipeline/data_loader/transfer.py
+
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from eo_data_pipeline.metrics import metrics
+
+from .downloader import DownloadError
+
+# httpx logs every request at INFO level, which floods the pipeline logs
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Responses of an overloaded server; they shrink the concurrency limit of the host
+THROTTLE_STATUSES = (429, 503)
+
+# Responses worth retrying after a backoff
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng=random) -> float:
+    """
+    Return the delay before a retry, with exponential backoff and full jitter.
+
+    The delay is drawn uniformly from ``[0, min(cap, base * 2 ** attempt)]``, so
+    that clients throttled at the same time do not retry in lockstep.
+
+    Args:
+        attempt (int): Number of the failed attempt, starting at 0.
+        base (float): Upper bound of the first delay in seconds.
+        cap (float): Largest upper bound in seconds.
+        rng (random.Random): Source of randomness.
+
+    Returns:
+        float: Delay in seconds.
+    """
+    return rng.uniform(0, min(cap, base * 2**attempt))
+
+
+def retry_after(headers) -> Optional[float]:
+    """
+    Parse the ``Retry-After`` header of a response.
+
+    Args:
+        headers (Mapping): Response headers.
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid.
+    """
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class TokenBucket:
+    """
+    A token bucket limiting the rate at which requests are started.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        capacity (float): Largest number of tokens, i.e. the allowed burst.
+        tokens (float): Tokens currently available.
+    """
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait for a token and take it; waiters are served in order."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AdaptiveConcurrency:
+    """
+    An AIMD limit on the number of requests in flight to one host.
+
+    Every response received while the limit is fully used raises the limit by
+    ``1 / limit``, i.e. by about one per round of requests (additive increase).
+    A throttling response (429, 503), a failed request, or a time to first byte
+    above the latency threshold multiplies the limit by ``decrease``
+    (multiplicative decrease). Only requests started after the last decrease can
+    decrease the limit again, so a burst of throttled responses to requests sent
+    under the old limit counts once.
+
+    The latency threshold is ``latency_target`` if given, otherwise
+    ``latency_tolerance`` times the lowest time to first byte seen so far. A host
+    that asks for a pause with ``Retry-After`` gets no new requests until then.
+
+    Attributes:
+        limit (float): Current limit; ``int(limit)`` requests may be in flight.
+        minimum (int): Lowest limit.
+        maximum (int): Highest limit.
+        decrease (float): Factor the limit is multiplied by when decreasing.
+        latency_target (float, optional): Time to first byte, in seconds, above
+            which the limit is decreased.
+        latency_tolerance (float): Multiple of the lowest time to first byte
+            above which the limit is decreased if there is no latency_target.
+        in_flight (int): Requests currently in flight.
+        min_latency (float, optional): Lowest time to first byte seen so far.
+        decreases (int): Number of times the limit was decreased.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 16,
+        decrease: float = 0.5,
+        latency_target: float = None,
+        latency_tolerance: float = 4.0,
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.min_latency = None
+        self.decreases = 0
+        self._last_decrease = float("-inf")
+        self._resume_at = 0.0
+        self._changed = asyncio.Condition()
+
+    async def acquire(self) -> float:
+        """
+        Wait until a request may be started and count it as in flight.
+
+        Returns:
+            float: Start time of the request, to pass to on_response.
+        """
+        delay = self._resume_at - time.monotonic()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self._resume_at - time.monotonic()
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def release(self):
+        """Count a request as finished."""
+        async with self._changed:
+            self.in_flight -= 1
+            self._changed.notify_all()
+
+    def on_response(self, started: float, latency: float, throttled: bool = False):
+        """
+        Adjust the limit to the outcome of a request.
+
+        Args:
+            started (float): Start time returned by acquire.
+            latency (float): Time to first byte in seconds.
+            throttled (bool): Whether the server answered 429 or 503.
+        """
+        if not throttled and (self.min_latency is None or latency < self.min_latency):
+            self.min_latency = latency
+        if throttled or latency > self.latency_threshold:
+            self.on_failure(started)
+        elif self.in_flight >= int(self.limit):
+            # Only grow while the limit, not the caller, bounds the concurrency
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_failure(self, started: float):
+        """
+        Decrease the limit after a throttled or failed request.
+
+        Args:
+            started (float): Start time returned by acquire.
+        """
+        if started <= self._last_decrease:
+            return
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self._last_decrease = time.monotonic()
+        self.decreases += 1
+        metrics.incr("transfer.decreases")
+
+    def pause(self, seconds: float):
+        """
+        Hold back new requests to the host for some time.
+
+        Args:
+            seconds (float): Duration of the pause, e.g. from ``Retry-After``.
+        """
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    @property
+    def latency_threshold(self) -> float:
+        """Time to first byte above which the limit is decreased."""
+        if self.latency_target is not None:
+            return self.latency_target
+        if self.min_latency is None:
+            return float("inf")
+        # Floor the baseline so that scheduling noise on fast links is tolerated
+        return self.latency_tolerance * max(self.min_latency, 0.01)
+
+
+class _Retry(Exception):
+    """A request failed in a way worth retrying."""
+
+    def __init__(self, message, delay=None):
+        super().__init__(message)
+        self.delay = delay
+
+
+class TransferEngine:
+    """
+    An asyncio download engine adapting its request rate to each host.
+
+    Downloads share one event loop, running on a background thread, and one
+    HTTP connection pool. Requests to each host are limited by an
+    AdaptiveConcurrency limit, which grows while responses are fast and shrinks
+    on 429/503 responses, failures and rising latency, and optionally by a
+    TokenBucket on the request rate. Failed requests are retried with jittered
+    exponential backoff, or after the ``Retry-After`` delay the server asks for,
+    and resume from the bytes already received with HTTP Range requests.
+
+    TransferEngine has the interface of AssetDownloader, so it can replace it in
+    DataLoader; ``download`` may be called from any number of threads, and the
+    engine decides how many of the transfers run at once.
+
+    Attributes:
+        max_per_host (int): Highest concurrency limit of a host.
+        initial_per_host (int): Concurrency limit a host starts with.
+        min_per_host (int): Lowest concurrency limit of a host.
+        rate (float, optional): Requests started per second and host.
+        burst (float, optional): Burst size of the request rate.
+        max_retries (int): Retries of a download before giving up.
+        backoff_base (float): Upper bound of the first backoff delay in seconds.
+        backoff_max (float): Largest backoff delay in seconds.
+        latency_target (float, optional): Time to first byte above which the
+            concurrency limit is decreased; by default relative to the lowest
+            time to first byte seen.
+        timeout (float): Connect and read timeout in seconds.
+        chunk_size (int): Number of bytes written to disk at a time.
+        hosts (dict): AdaptiveConcurrency limit of every host seen.
+        logger (logging.Logger): Logger for this class.
+    """
+
+    def __init__(
+        self,
+        max_per_host: int = 16,
+        initial_per_host: int = 4,
+        min_per_host: int = 1,
+        rate: float = None,
+        burst: float = None,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        latency_target: float = None,
+        timeout: float = 60,
+        chunk_size: int = 1 << 20,
+    ):
+        """
+        Initialize the TransferEngine; the event loop starts on first use.
+
+        Args:
+            max_per_host (int): Highest concurrency limit of a host.
+            initial_per_host (int): Concurrency limit a host starts with.
+            min_per_host (int): Lowest concurrency limit of a host.
+            rate (float, optional): Requests started per second and host.
+            burst (float, optional): Burst size of the request rate; defaults to
+                one second of requests.
+            max_retries (int): Retries of a download before giving up.
+            backoff_base (float): Upper bound of the first backoff delay.
+            backoff_max (float): Largest backoff delay.
+            latency_target (float, optional): Time to first byte above which the
+                concurrency limit is decreased.
+            timeout (float): Connect and read timeout in seconds.
+            chunk_size (int): Number of bytes written to disk at a time.
+        """
+        self.max_per_host = max_per_host
+        self.initial_per_host = initial_per_host
+        self.min_per_host = min_per_host
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.latency_target = latency_target
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.hosts = {}
+        self._buckets = {}
+        self._client = None
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def _run(self, coroutine):
+        with self._lock:
+            if self._loop is None:
+                # Limits hold asyncio primitives bound to the loop they were used on
+                self.hosts, self._buckets = {}, {}
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="transfer-engine", daemon=True
+                )
+                self._thread.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def _host(self, url):
+        # Called on the event loop thread only
+        host = urlsplit(url).netloc
+        if host not in self.hosts:
+            self.hosts[host] = AdaptiveConcurrency(
+                initial=self.initial_per_host,
+                minimum=self.min_per_host,
+                maximum=self.max_per_host,
+                latency_target=self.latency_target,
+            )
+            self._buckets[host] = (
+                TokenBucket(self.rate, self.burst) if self.rate else None
+            )
+        return self.hosts[host], self._buckets[host]
+
+    def _get_client(self):
+        if self._client is None:
+            # Concurrency is bounded per host by the adaptive limits instead
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=None, max_keepalive_connections=64),
+                follow_redirects=True,
+            )
+        return self._client
+
+    def download(self, url: str, file_path: str) -> int:
+        """
+        Download an asset, resuming a previous partial download if present.
+
+        Args:
+            url (str): URL of the asset to download.
+            file_path (str): Local path to save the downloaded asset.
+
+        Returns:
+            int: Number of bytes transferred over the network.
+
+        Raises:
+            DownloadError: If the asset could not be downloaded within the retries.
+                The partial file is kept so that the next attempt can resume.
+        """
+        return self._run(self.download_async(url, file_path))
+
+    async def download_async(self, url: str, file_path: str) -> int:
+        """
+        Download an asset on the event loop of the caller; see download.
+        """
+        part_path = f"{file_path}.part"
+        transferred = 0
+        for attempt in range(self.max_retries + 1):
+            try:
+                transferred += await self._attempt(url, part_path)
+                break
+            except _Retry as e:
+                if attempt == self.max_retries:
+                    raise DownloadError(
+                        f"Failed to download asset from {url} after "
+                        f"{attempt + 1} attempts: {e}"
+                    ) from e
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                if e.delay is not None:
+                    delay = max(delay, min(e.delay, self.backoff_max))
+                metrics.incr("transfer.retries")
+                self.logger.debug(f"Retrying {url} in {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+        os.replace(part_path, file_path)
+        return transferred
+
+    async def _attempt(self, url, part_path):
+        """Make one request for the missing bytes of an asset."""
+        concurrency, bucket = self._host(url)
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        transferred = 0
+
+        if bucket is not None:
+            await bucket.acquire()
+        started = await concurrency.acquire()
+        try:
+            async with self._get_client().stream(
+                "GET", url, headers=headers
+            ) as response:
+                status = response.status_code
+                throttled = status in THROTTLE_STATUSES
+                concurrency.on_response(
+                    started, time.monotonic() - started, throttled=throttled
+                )
+                if throttled:
+                    metrics.incr("transfer.throttled")
+                if status == 416:
+                    # The partial file does not match the remote object, start over
+                    os.remove(part_path)
+                    raise _Retry("Partial download does not match", delay=0)
+                if status in RETRY_STATUSES:
+                    delay = retry_after(response.headers)
+                    if delay is not None:
+                        concurrency.pause(min(delay, self.backoff_max))
+                    raise _Retry(f"HTTP {status}", delay=delay)
+                if status >= 400:
+                    raise DownloadError(
+                        f"Failed to download asset from {url}: HTTP {status}"
+                    )
+
+                if offset and status == 206:
+                    self.logger.info(f"Resuming download of {url} at byte {offset}")
+                    metrics.incr("load.resumed")
+                    mode = "ab"
+                else:
+                    mode = "wb"
+                with open(part_path, mode) as f:
+                    async for chunk in response.aiter_bytes(self.chunk_size):
+                        f.write(chunk)
+                        transferred += len(chunk)
+        except httpx.HTTPError as e:
+            # Timeouts and dropped connections are a sign of congestion as well
+            concurrency.on_failure(started)
+            raise _Retry(str(e) or type(e).__name__) from e
+        except OSError as e:
+            raise DownloadError(f"Failed to download asset from {url}: {e}") from e
+        finally:
+            await concurrency.release()
+        return transferred
+
+    def head(self, url: str) -> dict:
+        """
+        Fetch the response headers of an asset without downloading it.
+
+        Args:
+            url (str): URL of the asset.
+
+        Returns:
+            dict: Response headers, e.g. ``ETag`` and ``Content-Length``.
+
+        Raises:
+            DownloadError: If the request fails.
+        """
+
+        async def _head():
+            concurrency, _ = self._host(url)
+            started = await concurrency.acquire()
+            try:
+                response = await self._get_client().head(url)
+                concurrency.on_response(
+                    started,
+                    time.monotonic() - started,
+                    throttled=response.status_code in THROTTLE_STATUSES,
+                )
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                raise DownloadError(f"Failed to fetch headers of {url}: {e}") from e
+            finally:
+                await concurrency.release()
+            return dict(response.headers)
+
+        return self._run(_head())
+
+    def limits(self) -> dict:
+        """
+        Return the current concurrency limit of every host.
+
+        Returns:
+            dict: Limit keyed by host.
+        """
+        return {host: int(state.limit) for host, state in self.hosts.items()}
+
+    def close(self):
+        """
+        Close all pooled connections and stop the event loop.
+        """
+        with self._lock:
+            if self._loop is None:
+                return
+            if self._client is not None:
+                asyncio.run_coroutine_threadsafe(
+                    self._client.aclose(), self._loop
+                ).result()
+                self._client = None
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
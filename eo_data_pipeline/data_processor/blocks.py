@@ -0,0 +1,37 @@
+# eo_data_pipeline/data_processor/blocks.py
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def write_blocks(dst, compute, windows, max_workers: int):
+    """
+    Compute blocks of a raster in parallel and write them as they complete.
+
+    At most ``2 * max_workers`` blocks are in flight, so memory use is bounded by
+    the block size rather than the size of the raster. Blocks are written by the
+    calling thread, since a dataset must not be written from several threads.
+
+    Args:
+        dst (rasterio.io.DatasetWriter): Raster opened for writing.
+        compute (callable): Function of a window returning the array of the block,
+            of shape (count, height, width), or None to leave the block unwritten.
+        windows (iterable): Windows of the blocks to compute.
+        max_workers (int): Number of blocks computed at once.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+        windows = iter(windows)
+        while True:
+            while len(pending) < 2 * max_workers:
+                window = next(windows, None)
+                if window is None:
+                    break
+                pending[executor.submit(compute, window)] = window
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                window = pending.pop(future)
+                data = future.result()
+                if data is not None:
+                    dst.write(data, window=window)
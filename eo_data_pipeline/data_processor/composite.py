@@ -0,0 +1,358 @@
+# eo_data_pipeline/data_processor/composite.py
+
+import logging
+import math
+import os
+from collections import OrderedDict
+
+import numpy as np
+import rasterio
+from omegaconf import DictConfig
+from rasterio.enums import Resampling
+from rasterio.windows import Window
+
+from eo_data_pipeline.data_loader.scene_filter import VALID_SCL_CLASSES
+from eo_data_pipeline.metrics import metrics
+
+from .blocks import write_blocks
+from .datacube import grid_id
+from .indices import (
+    SPECTRAL_INDICES,
+    evaluate,
+    expression_bands,
+    open_on_grid,
+    parse_expression,
+)
+
+METHODS = ("median", "mean", "best")
+PERIODS = ("week", "month", "year")
+
+
+def time_bin(when, period: str) -> str:
+    """
+    Return the label of the time bin a datetime falls into.
+
+    Args:
+        when (datetime.datetime): Acquisition time.
+        period (str): "week", "month" or "year".
+
+    Returns:
+        str: Label such as ``2023-W02``, ``2023-01`` or ``2023``.
+    """
+    if period == "week":
+        year, week, _ = when.isocalendar()
+        return f"{year}-W{week:02d}"
+    if period == "month":
+        return f"{when.year}-{when.month:02d}"
+    return str(when.year)
+
+
+def _nanmedian(stack):
+    """
+    Median along the first axis ignoring NaN, NaN where all values are NaN.
+
+    Unlike ``np.nanmedian`` this does not warn about all-NaN pixels, which are
+    expected wherever no scene is clear.
+    """
+    count = np.sum(~np.isnan(stack), axis=0)
+    ordered = np.sort(stack, axis=0)  # NaN sorts last
+    n = np.maximum(count, 1)[None]
+    lower = np.take_along_axis(ordered, (n - 1) // 2, axis=0)[0]
+    upper = np.take_along_axis(ordered, n // 2, axis=0)[0]
+    return np.where(count > 0, (lower + upper) / 2, np.nan).astype("float32")
+
+
+class Compositor:
+    """
+    A class for building cloud-free temporal composites from the saved band files.
+
+    Scenes are grouped by raster grid (see ``grid_id``) and by time bin, and every
+    group is reduced to one multi-band GeoTIFF
+    ``<period label>_<grid id>_<method>.tif`` with one layer per band. Pixels are
+    masked with the scene classification band, keeping only ``valid_scl_classes``,
+    and with the nodata value of the band files. Reductions:
+
+    * "mean": mean of the valid observations.
+    * "median": median of the valid observations.
+    * "best": the valid observation with the highest ``score`` (by default NDVI),
+      taken from the same scene for all bands.
+
+    Groups are processed block by block, with blocks computed in parallel. "mean"
+    and "best" stream over the scenes of a block keeping only running results, so
+    memory use does not grow with the number of scenes. "median" needs all
+    observations of a pixel at once; its blocks are shrunk so that the stack of
+    scenes fits in ``max_block_mb``.
+
+    Attributes:
+        storage_path (str): Path the band files are read from.
+        output_path (str): Directory the composites are written to.
+        period (str): Time bin of the composites: "week", "month" or "year".
+        method (str): Reduction: "median", "mean" or "best".
+        bands (list, optional): Bands to composite; defaults to the bands passed to
+            ``build``.
+        mask_band (str, optional): Band holding the scene classification (SCL);
+            None to only mask nodata.
+        valid_classes (list): SCL classes of pixels kept in the composite.
+        score (ast.Expression): Expression ranking observations for "best".
+        block_size (int): Width and height of the blocks composites are built in.
+        max_block_mb (float): Memory budget of a block of the median.
+        max_workers (int): Number of blocks computed in parallel.
+        logger (logging.Logger): Logger for this class.
+    """
+
+    def __init__(self, config: DictConfig):
+        """
+        Initialize the Compositor with the given configuration.
+
+        Args:
+            config (DictConfig): Configuration containing storage, pipeline and
+                composite settings.
+
+        Raises:
+            ValueError: If the method or period is unknown, or the mask band or a
+                band of the score of "best" is not loaded.
+        """
+        composite = getattr(config, "composite", None)
+        self.storage_path = config.storage.path
+        self.output_path = getattr(composite, "output_path", "./data/composites/")
+        self.period = getattr(composite, "period", "month")
+        self.method = getattr(composite, "method", "median")
+        bands = getattr(composite, "bands", None)
+        self.bands = list(bands) if bands else None
+        self.mask_band = getattr(composite, "mask_band", "scl")
+        self.valid_classes = list(
+            getattr(config.pipeline, "valid_scl_classes", None) or VALID_SCL_CLASSES
+        )
+        score = getattr(composite, "score", None) or "ndvi"
+        self.score = parse_expression(SPECTRAL_INDICES.get(score, score))
+        self.block_size = getattr(composite, "block_size", 512)
+        self.max_block_mb = getattr(composite, "max_block_mb", 256)
+        self.max_workers = getattr(composite, "max_workers", None) or os.cpu_count()
+        self.logger = logging.getLogger(__name__)
+
+        if self.method not in METHODS:
+            raise ValueError(
+                f"Invalid composite method: {self.method}. "
+                f"Choose from: {', '.join(METHODS)}"
+            )
+        if self.period not in PERIODS:
+            raise ValueError(
+                f"Invalid composite period: {self.period}. "
+                f"Choose from: {', '.join(PERIODS)}"
+            )
+
+        spectral_bands = set(config.pipeline.spectral_bands)
+        if self.mask_band and self.mask_band not in spectral_bands:
+            raise ValueError(
+                f"Composite mask band {self.mask_band} is not in "
+                "pipeline.spectral_bands; add it, or set composite.mask_band to "
+                "null to only mask nodata"
+            )
+        if self.method == "best":
+            indices = getattr(getattr(config, "processing", None), "indices", None)
+            loaded = spectral_bands | set(indices or {})
+            missing = [b for b in expression_bands(self.score) if b not in loaded]
+            if missing:
+                raise ValueError(
+                    f"Composite score reads bands {missing} that are not in "
+                    "pipeline.spectral_bands"
+                )
+
+    def build(self, items, spectral_bands) -> list:
+        """
+        Build the composites of the given items.
+
+        Args:
+            items (list): List of STAC items whose band files should be composited.
+            spectral_bands (list): Bands to composite unless ``bands`` is configured;
+                the mask band is never composited.
+
+        Returns:
+            list: Paths of the composites written.
+        """
+        bands = [b for b in (self.bands or spectral_bands) if b != self.mask_band]
+        os.makedirs(self.output_path, exist_ok=True)
+
+        # Group scenes by (time bin, grid); each scene maps band -> file path
+        groups = OrderedDict()
+        for item in sorted(items, key=lambda item: item.datetime):
+            paths = {}
+            for band in bands:
+                path = os.path.join(self.storage_path, f"{item.id}_{band}.tif")
+                if os.path.exists(path):
+                    paths[band] = path
+            for band, path in paths.items():
+                with rasterio.open(path) as src:
+                    key = (
+                        time_bin(item.datetime, self.period),
+                        grid_id(
+                            src.crs, src.transform, src.width, src.height, src.dtypes[0]
+                        ),
+                    )
+                groups.setdefault(key, OrderedDict()).setdefault(item.id, {})[
+                    band
+                ] = path
+
+        composite_paths = []
+        for (label, grid), scenes in groups.items():
+            file_path = os.path.join(
+                self.output_path, f"{label}_{grid}_{self.method}.tif"
+            )
+            with metrics.timer("process.composite"):
+                self.composite(list(scenes.items()), file_path)
+            self.logger.info(
+                f"Composited {len(scenes)} scenes of {label} into {file_path}"
+            )
+            composite_paths.append(file_path)
+        return composite_paths
+
+    def composite(self, scenes, file_path: str):
+        """
+        Reduce scenes on the same grid to one composite GeoTIFF.
+
+        Args:
+            scenes (list): (item id, {band: file path}) tuples.
+            file_path (str): Path of the composite to write.
+        """
+        bands = list(OrderedDict.fromkeys(b for _, paths in scenes for b in paths))
+        first_path = next(iter(scenes[0][1].values()))
+        with rasterio.open(first_path) as src:
+            profile = src.profile
+
+        block_size = self.block_size
+        if self.method == "median":
+            # The median holds every scene of a block of one band at once
+            per_pixel = len(scenes) * np.dtype("float32").itemsize
+            budget = self.max_block_mb * 1024**2
+            block_size = min(block_size, int(math.sqrt(budget / per_pixel)))
+        block_size = max(16, block_size // 16 * 16)
+
+        profile.update(
+            driver="GTiff",
+            dtype="float32",
+            count=len(bands),
+            nodata=np.nan,
+            tiled=True,
+            blockxsize=block_size,
+            blockysize=block_size,
+            compress="deflate",
+            predictor=3,
+            BIGTIFF="IF_SAFER",
+        )
+        windows = [
+            Window(
+                col,
+                row,
+                min(block_size, profile["width"] - col),
+                min(block_size, profile["height"] - row),
+            )
+            for row in range(0, profile["height"], block_size)
+            for col in range(0, profile["width"], block_size)
+        ]
+
+        part_path = f"{file_path}.part"
+        with rasterio.open(part_path, "w", **profile) as dst:
+            for i, band in enumerate(bands, start=1):
+                dst.set_band_description(i, band)
+            dst.update_tags(
+                method=self.method,
+                scenes=",".join(item_id for item_id, _ in scenes),
+            )
+            write_blocks(
+                dst,
+                lambda window: self._composite_block(scenes, bands, first_path, window),
+                windows,
+                self.max_workers,
+            )
+        os.replace(part_path, file_path)
+
+    def _composite_block(self, scenes, bands, grid_path, window):
+        """
+        Compute the composite of one block of all bands.
+
+        Returns:
+            numpy.ndarray: float32 array of shape (bands, height, width).
+        """
+        shape = (len(bands), window.height, window.width)
+        with rasterio.open(grid_path) as grid:
+            if self.method == "median":
+                result = np.full(shape, np.nan, "float32")
+                masks = [
+                    self._read_mask(grid, item_id, window) for item_id, _ in scenes
+                ]
+                for b, band in enumerate(bands):
+                    stack = np.full((len(scenes),) + shape[1:], np.nan, "float32")
+                    for t, (_, paths) in enumerate(scenes):
+                        if band in paths:
+                            stack[t] = self._read(grid, paths[band], window, masks[t])
+                    result[b] = _nanmedian(stack)
+                return result
+
+            if self.method == "mean":
+                total = np.zeros(shape, "float64")
+                count = np.zeros(shape, "uint32")
+                for item_id, paths in scenes:
+                    mask = self._read_mask(grid, item_id, window)
+                    for b, band in enumerate(bands):
+                        if band in paths:
+                            data = self._read(grid, paths[band], window, mask)
+                            valid = ~np.isnan(data)
+                            total[b][valid] += data[valid]
+                            count[b] += valid
+                with np.errstate(all="ignore"):
+                    return np.where(count > 0, total / count, np.nan).astype("float32")
+
+            result = np.full(shape, np.nan, "float32")
+            best = np.full(shape[1:], -np.inf, "float32")
+            for item_id, paths in scenes:
+                mask = self._read_mask(grid, item_id, window)
+                data = {
+                    band: self._read(grid, path, window, mask)
+                    for band, path in paths.items()
+                }
+                score = self._read_score(grid, item_id, data, window, mask)
+                if score is None:
+                    continue
+                better = score > best  # False where the score is NaN
+                best[better] = score[better]
+                for b, band in enumerate(bands):
+                    if band in data:
+                        result[b][better] = data[band][better]
+            return result
+
+    def _read(self, grid, path, window, mask=None):
+        """Read a band window on the grid as float32, with invalid pixels as NaN."""
+        with open_on_grid(path, grid) as src:
+            data = src.read(1, window=window, masked=True).astype("float32")
+        data = data.filled(np.nan)
+        if mask is not None:
+            data[~mask] = np.nan
+        return data
+
+    def _read_mask(self, grid, item_id, window):
+        """Read the clear-pixel mask of a scene, or None if it has no mask band."""
+        if not self.mask_band:
+            return None
+        path = os.path.join(self.storage_path, f"{item_id}_{self.mask_band}.tif")
+        if not os.path.exists(path):
+            return None
+        with open_on_grid(path, grid, Resampling.nearest) as src:
+            scl = src.read(1, window=window)
+        return np.isin(scl, self.valid_classes)
+
+    def _read_score(self, grid, item_id, data, window, mask):
+        """
+        Evaluate the score expression of a scene, or return None if bands are
+        missing. Bands already read into ``data`` are not read again.
+        """
+        values = {}
+        for band in expression_bands(self.score):
+            if band in data:
+                values[band] = data[band]
+                continue
+            path = os.path.join(self.storage_path, f"{item_id}_{band}.tif")
+            if not os.path.exists(path):
+                return None
+            values[band] = self._read(grid, path, window, mask)
+        with np.errstate(all="ignore"):
+            return np.asarray(evaluate(self.score, values), "float32")
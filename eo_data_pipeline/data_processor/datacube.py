@@ -0,0 +1,362 @@
+# eo_data_pipeline/data_processor/datacube.py
+
+import logging
+import os
+from collections import OrderedDict
+from contextlib import ExitStack
+from datetime import timezone
+
+import netCDF4
+import numpy as np
+import rasterio
+from omegaconf import DictConfig
+from rasterio.windows import Window
+
+TIME_UNITS = "seconds since 1970-01-01 00:00:00"
+DEFAULT_CHUNKS = {"time": 16, "y": 256, "x": 256}
+
+
+def grid_id(crs, transform, width, height, dtype) -> str:
+    """
+    Build a file-name friendly identifier of a raster grid.
+
+    Args:
+        crs (rasterio.crs.CRS): Coordinate reference system of the grid.
+        transform (affine.Affine): Geotransform of the grid.
+        width (int): Number of columns.
+        height (int): Number of rows.
+        dtype (str): Data type of the raster.
+
+    Returns:
+        str: Identifier such as ``32633_10m_399960_5100000_10980x10980_uint16``.
+    """
+    epsg = crs.to_epsg() if crs else None
+    crs_id = str(epsg) if epsg else "custom"
+    return (
+        f"{crs_id}_{abs(transform.a):g}m_{transform.c:.0f}_{transform.f:.0f}"
+        f"_{width}x{height}_{dtype}"
+    )
+
+
+class DatacubeBuilder:
+    """
+    A class for assembling per-band GeoTIFFs into time x band x y x x datacubes.
+
+    Files saved by DataLoader.load_data are grouped by their raster grid (CRS,
+    transform, shape and data type), since bands at different resolutions or items
+    from different UTM tiles cannot share one array. One cube is written per grid.
+
+    Scenes are written a time chunk at a time, so each compressed chunk is written
+    once. Within a time chunk, NetCDF cubes are written one band and one strip of
+    chunk rows at a time, and Zarr cubes one dask chunk at a time, so memory use
+    is bounded by one time chunk x the bands x a window, regardless of the number
+    of scenes. Cubes can be appended to: items already present in a cube are
+    skipped, new items are appended along the time dimension.
+
+    Attributes:
+        storage_path (str): Path the per-band asset files are read from.
+        output_path (str): Directory the datacubes are written to.
+        format (str): "netcdf" or "zarr".
+        chunks (dict): Chunk sizes for the time, y and x dimensions.
+        compression_level (int): zlib compression level of NetCDF cubes.
+        logger (logging.Logger): Logger for this class.
+    """
+
+    def __init__(
+        self, config: DictConfig, storage_path: str = None, output_path: str = None
+    ):
+        """
+        Initialize the DatacubeBuilder with the given configuration.
+
+        Args:
+            config (DictConfig): Configuration containing storage and processing
+                settings.
+            storage_path (str, optional): Path to read the asset files from instead
+                of ``storage.path``, e.g. the output of Reprojector.align.
+            output_path (str, optional): Directory to write the datacubes to instead
+                of ``processing.output_path``, e.g. the directory of an AOI.
+        """
+        processing = getattr(config, "processing", None)
+        self.storage_path = storage_path or config.storage.path
+        self.output_path = output_path or getattr(
+            processing, "output_path", "./data/cube/"
+        )
+        self.format = getattr(processing, "format", "netcdf")
+        self.chunks = dict(getattr(processing, "chunks", None) or DEFAULT_CHUNKS)
+        self.compression_level = getattr(processing, "compression_level", 4)
+        self.logger = logging.getLogger(__name__)
+
+        if self.format not in ("netcdf", "zarr"):
+            raise ValueError(
+                f"Invalid datacube format: {self.format}. Choose from: netcdf, zarr"
+            )
+
+    def build(self, items, spectral_bands, saved_files=None):
+        """
+        Write the asset files of the given items into datacubes.
+
+        Args:
+            items (list): List of STAC items whose files should be added.
+            spectral_bands (list): List of spectral bands, in cube order.
+            saved_files (list, optional): Restrict the cube to these file paths,
+                e.g. the files returned by DataLoader.load_data.
+
+        Returns:
+            list: Paths of the datacubes that were created or appended to.
+        """
+        saved = None if saved_files is None else set(saved_files)
+        os.makedirs(self.output_path, exist_ok=True)
+
+        # Group (item, band, path) by raster grid
+        groups = OrderedDict()
+        for item in sorted(items, key=lambda item: item.datetime):
+            for band in spectral_bands:
+                path = os.path.join(self.storage_path, f"{item.id}_{band}.tif")
+                if not os.path.exists(path) or (
+                    saved is not None and path not in saved
+                ):
+                    continue
+                with rasterio.open(path) as src:
+                    key = grid_id(
+                        src.crs, src.transform, src.width, src.height, src.dtypes[0]
+                    )
+                    layers = (
+                        [band]
+                        if src.count == 1
+                        else [f"{band}_{i}" for i in range(1, src.count + 1)]
+                    )
+                group = groups.setdefault(key, {"bands": [], "scenes": OrderedDict()})
+                for layer in layers:
+                    if layer not in group["bands"]:
+                        group["bands"].append(layer)
+                group["scenes"].setdefault(item.id, (item, []))[1].append(
+                    (layers, path)
+                )
+
+        cube_paths = []
+        for key, group in groups.items():
+            extension = "nc" if self.format == "netcdf" else "zarr"
+            cube_path = os.path.join(self.output_path, f"{key}.{extension}")
+            scenes = list(group["scenes"].values())
+            if self.format == "netcdf":
+                added = self._write_netcdf(cube_path, group["bands"], scenes)
+            else:
+                added = self._write_zarr(cube_path, group["bands"], scenes)
+            self.logger.info(f"Added {added} scenes to datacube {cube_path}")
+            cube_paths.append(cube_path)
+
+        return cube_paths
+
+    def _write_netcdf(self, cube_path, bands, scenes):
+        """
+        Append scenes to a NetCDF cube, creating it if needed.
+
+        Returns:
+            int: Number of scenes added.
+        """
+        first_path = scenes[0][1][0][1]
+        with rasterio.open(first_path) as src:
+            profile = src.profile
+
+        mode = "a" if os.path.exists(cube_path) else "w"
+        with netCDF4.Dataset(cube_path, mode) as ds:
+            if mode == "w":
+                self._create_netcdf(ds, bands, profile)
+            else:
+                existing = list(ds.variables["band"][:])
+                if not set(bands).issubset(existing):
+                    raise ValueError(
+                        f"Datacube {cube_path} has bands {existing}, cannot add {bands}"
+                    )
+                bands = existing
+
+            item_ids = set(ds.variables["item_id"][:])
+            new_scenes = [
+                (item, files) for item, files in scenes if item.id not in item_ids
+            ]
+            start = len(ds.dimensions["time"])
+            for index, (item, _) in enumerate(new_scenes, start=start):
+                timestamp = item.datetime.replace(
+                    tzinfo=item.datetime.tzinfo or timezone.utc
+                )
+                ds.variables["time"][index] = timestamp.timestamp()
+                ds.variables["item_id"][index] = item.id
+
+            # Write whole time chunks at once: each compressed chunk is then
+            # written once, instead of being re-read and re-compressed for every
+            # scene it contains.
+            chunk_time = ds.variables["data"].chunking()[0]
+            offset = 0
+            while offset < len(new_scenes):
+                index = start + offset
+                count = min(chunk_time - index % chunk_time, len(new_scenes) - offset)
+                self._write_netcdf_batch(
+                    ds.variables["data"],
+                    index,
+                    bands,
+                    new_scenes[offset : offset + count],
+                )
+                offset += count
+        return len(new_scenes)
+
+    @staticmethod
+    def _write_netcdf_batch(data, index, bands, scenes):
+        """
+        Write consecutive scenes to the data variable, one strip of chunks at a time.
+        """
+        _, _, height, width = data.shape
+        chunk_y = data.chunking()[2]
+        with ExitStack() as stack:
+            sources = {}  # band -> [(dataset, layer index) or None per scene]
+            for t, (_, files) in enumerate(scenes):
+                for layers, path in files:
+                    src = stack.enter_context(rasterio.open(path))
+                    for i, layer in enumerate(layers, start=1):
+                        sources.setdefault(layer, [None] * len(scenes))[t] = (src, i)
+
+            for layer, layer_sources in sources.items():
+                b = bands.index(layer)
+                for row in range(0, height, chunk_y):
+                    window = Window(0, row, width, min(chunk_y, height - row))
+                    strip = np.ma.masked_all(
+                        (len(scenes), window.height, width), dtype=data.dtype
+                    )
+                    for t, source in enumerate(layer_sources):
+                        if source is not None:
+                            src, i = source
+                            strip[t] = src.read(i, window=window)
+                    data[
+                        index : index + len(scenes), b, row : row + window.height, :
+                    ] = strip
+
+    def _create_netcdf(self, ds, bands, profile):
+        """
+        Create dimensions, coordinates and the data variable of a new NetCDF cube.
+        """
+        width, height = profile["width"], profile["height"]
+        transform = profile["transform"]
+
+        ds.createDimension("time", None)
+        ds.createDimension("band", len(bands))
+        ds.createDimension("y", height)
+        ds.createDimension("x", width)
+
+        time = ds.createVariable("time", "f8", ("time",))
+        time.units = TIME_UNITS
+        time.calendar = "standard"
+        time.standard_name = "time"
+        ds.createVariable("item_id", str, ("time",))
+        band = ds.createVariable("band", str, ("band",))
+        for i, name in enumerate(bands):
+            band[i] = name
+
+        x = ds.createVariable("x", "f8", ("x",))
+        x.standard_name = "projection_x_coordinate"
+        x[:] = transform.c + transform.a * (np.arange(width) + 0.5)
+        y = ds.createVariable("y", "f8", ("y",))
+        y.standard_name = "projection_y_coordinate"
+        y[:] = transform.f + transform.e * (np.arange(height) + 0.5)
+
+        # CF grid mapping understood by rioxarray and GDAL
+        spatial_ref = ds.createVariable("spatial_ref", "i4")
+        if profile["crs"]:
+            spatial_ref.crs_wkt = profile["crs"].to_wkt()
+            spatial_ref.spatial_ref = profile["crs"].to_wkt()
+        spatial_ref.GeoTransform = " ".join(str(v) for v in transform.to_gdal())
+
+        chunksizes = (
+            self.chunks.get("time", DEFAULT_CHUNKS["time"]),
+            1,
+            min(self.chunks.get("y", DEFAULT_CHUNKS["y"]), height),
+            min(self.chunks.get("x", DEFAULT_CHUNKS["x"]), width),
+        )
+        data = ds.createVariable(
+            "data",
+            profile["dtype"],
+            ("time", "band", "y", "x"),
+            zlib=True,
+            complevel=self.compression_level,
+            shuffle=True,
+            chunksizes=chunksizes,
+            fill_value=profile.get("nodata"),
+        )
+        data.grid_mapping = "spatial_ref"
+
+    def _write_zarr(self, cube_path, bands, scenes):
+        """
+        Append scenes to a Zarr cube, creating it if needed.
+
+        Scenes are opened lazily and appended a time chunk at a time, so each
+        Zarr chunk is written once and only one time chunk of each window is
+        held in memory per band.
+
+        Returns:
+            int: Number of scenes added.
+        """
+        import xarray as xr
+
+        item_ids = set()
+        start = 0
+        chunk_time = self.chunks.get("time", DEFAULT_CHUNKS["time"])
+        if os.path.exists(cube_path):
+            with xr.open_zarr(cube_path) as existing:
+                item_ids = set(existing["item_id"].values)
+                bands = list(existing["band"].values)
+                start = existing.sizes["time"]
+                chunk_time = existing["data"].encoding["chunks"][0]
+
+        chunks = {
+            "y": self.chunks.get("y", DEFAULT_CHUNKS["y"]),
+            "x": self.chunks.get("x", DEFAULT_CHUNKS["x"]),
+        }
+        new_scenes = [
+            (item, files) for item, files in scenes if item.id not in item_ids
+        ]
+        offset = 0
+        while offset < len(new_scenes):
+            index = start + offset
+            count = min(chunk_time - index % chunk_time, len(new_scenes) - offset)
+            batch = [
+                self._open_zarr_scene(item, files, bands, chunks)
+                for item, files in new_scenes[offset : offset + count]
+            ]
+            nodata = batch[0]["data"].rio.nodata
+            # One dask chunk per Zarr chunk along time
+            dataset = xr.concat(batch, dim="time").chunk({"time": count})
+
+            if os.path.exists(cube_path):
+                dataset.drop_vars(["band", "x", "y", "spatial_ref"]).to_zarr(
+                    cube_path, append_dim="time"
+                )
+            else:
+                dataset["data"].encoding.update(
+                    {
+                        "_FillValue": nodata,
+                        "chunks": (chunk_time, 1, chunks["y"], chunks["x"]),
+                    }
+                )
+                dataset.to_zarr(cube_path, mode="w")
+            offset += count
+        return len(new_scenes)
+
+    @staticmethod
+    def _open_zarr_scene(item, files, bands, chunks):
+        """
+        Open the files of a scene lazily as a one-step dataset of the cube.
+        """
+        import pandas as pd
+        import rioxarray
+        import xarray as xr
+
+        layers = []
+        for names, path in files:
+            array = rioxarray.open_rasterio(path, chunks=chunks, lock=False)
+            layers.append(array.assign_coords(band=names))
+        scene = xr.concat(layers, dim="band").reindex(band=bands)
+        # Scaling attributes of the GeoTIFFs would clash with the encoding
+        scene.attrs = {}
+        timestamp = pd.Timestamp(item.datetime).tz_localize(None)
+        scene = scene.expand_dims(time=[timestamp])
+        return scene.to_dataset(name="data").assign(
+            item_id=("time", np.array([item.id], dtype=object))
+        )
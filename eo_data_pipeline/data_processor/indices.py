@@ -0,0 +1,334 @@
+# eo_data_pipeline/data_processor/indices.py
+
+import ast
+import logging
+import os
+import threading
+from contextlib import ExitStack, contextmanager
+
+import numpy as np
+import rasterio
+import rioxarray
+import xarray as xr
+from omegaconf import DictConfig
+from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+
+from eo_data_pipeline.metrics import metrics
+
+# Expressions of common indices over Earth Search band names; used when an index
+# is configured without an expression.
+SPECTRAL_INDICES = {
+    "ndvi": "(nir - red) / (nir + red)",
+    "ndwi": "(green - nir) / (green + nir)",
+    "ndmi": "(nir - swir16) / (nir + swir16)",
+    "nbr": "(nir - swir22) / (nir + swir22)",
+    "ndbi": "(swir16 - nir) / (swir16 + nir)",
+    "evi": "2.5 * (nir - red) / (nir + 6 * red - 7.5 * blue + 1)",
+    "savi": "1.5 * (nir - red) / (nir + red + 0.5)",
+}
+
+# Functions that may be called in expressions
+FUNCTIONS = {
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "log": np.log,
+    "exp": np.exp,
+    "minimum": np.minimum,
+    "maximum": np.maximum,
+    "clip": np.clip,
+    "where": xr.where,
+}
+
+_OPERATORS = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a / b,
+    ast.Pow: lambda a, b: a**b,
+    ast.Gt: lambda a, b: a > b,
+    ast.GtE: lambda a, b: a >= b,
+    ast.Lt: lambda a, b: a < b,
+    ast.LtE: lambda a, b: a <= b,
+}
+
+
+def parse_expression(expression: str) -> ast.Expression:
+    """
+    Parse a band-math expression such as ``(nir - red) / (nir + red)``.
+
+    Expressions may use band names, numbers, the operators + - * / ** and
+    comparisons, and the functions in ``FUNCTIONS``.
+
+    Args:
+        expression (str): The expression.
+
+    Returns:
+        ast.Expression: The parsed expression.
+
+    Raises:
+        ValueError: If the expression is invalid or uses anything else.
+    """
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {expression}") from e
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            if (
+                not isinstance(node.func, ast.Name)
+                or node.func.id not in FUNCTIONS
+                or node.keywords
+            ):
+                raise ValueError(f"Unsupported function call in: {expression}")
+        elif isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float)):
+                raise ValueError(f"Unsupported constant in: {expression}")
+        elif isinstance(node, ast.Compare):
+            if len(node.ops) != 1:
+                raise ValueError(f"Chained comparisons are not supported: {expression}")
+        elif not isinstance(
+            node,
+            (
+                ast.Expression,
+                ast.BinOp,
+                ast.UnaryOp,
+                ast.Name,
+                ast.Load,
+                ast.USub,
+                ast.UAdd,
+                *_OPERATORS,
+            ),
+        ):
+            raise ValueError(
+                f"Unsupported syntax {type(node).__name__} in: {expression}"
+            )
+    return tree
+
+
+def expression_bands(tree: ast.Expression) -> list:
+    """
+    Return the band names an expression reads, in order of first use.
+
+    Args:
+        tree (ast.Expression): Expression returned by parse_expression.
+
+    Returns:
+        list: Band names.
+    """
+    bands = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id not in FUNCTIONS:
+            if node.id not in bands:
+                bands.append(node.id)
+    return bands
+
+
+def evaluate(tree: ast.Expression, bands: dict):
+    """
+    Evaluate a parsed expression.
+
+    The bands can be numpy arrays, or dask-backed xarray DataArrays, in which case
+    the result is lazy as well.
+
+    Args:
+        tree (ast.Expression): Expression returned by parse_expression.
+        bands (dict): Arrays keyed by band name.
+
+    Returns:
+        The result of the expression.
+    """
+
+    def _eval(node):
+        if isinstance(node, ast.Expression):
+            return _eval(node.body)
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Name):
+            return bands[node.id]
+        if isinstance(node, ast.UnaryOp):
+            value = _eval(node.operand)
+            return -value if isinstance(node.op, ast.USub) else value
+        if isinstance(node, ast.BinOp):
+            return _OPERATORS[type(node.op)](_eval(node.left), _eval(node.right))
+        if isinstance(node, ast.Compare):
+            return _OPERATORS[type(node.ops[0])](
+                _eval(node.left), _eval(node.comparators[0])
+            )
+        return FUNCTIONS[node.func.id](*(_eval(arg) for arg in node.args))
+
+    return _eval(tree)
+
+
+@contextmanager
+def open_on_grid(path: str, grid=None, resampling=Resampling.bilinear):
+    """
+    Open a raster, resampled on the fly to the grid of another raster if needed.
+
+    Args:
+        path (str): Path of the raster to open.
+        grid (rasterio.io.DatasetReader, optional): Raster whose CRS, transform and
+            shape the result should have.
+        resampling (rasterio.enums.Resampling): Resampling method used if the grids
+            differ, e.g. ``Resampling.nearest`` for class maps.
+
+    Yields:
+        rasterio.io.DatasetReader or rasterio.vrt.WarpedVRT: The raster on the grid.
+    """
+    with rasterio.open(path) as src:
+        if grid is None or (src.crs, src.transform, src.shape) == (
+            grid.crs,
+            grid.transform,
+            grid.shape,
+        ):
+            yield src
+            return
+        with WarpedVRT(
+            src,
+            crs=grid.crs,
+            transform=grid.transform,
+            width=grid.width,
+            height=grid.height,
+            resampling=resampling,
+        ) as vrt:
+            yield vrt
+
+
+class SpectralIndexCalculator:
+    """
+    A class for computing band-math indices such as NDVI from the saved band files.
+
+    Each configured index is evaluated per scene over chunked, dask-backed arrays
+    of the band files written by DataLoader.load_data, so scenes larger than memory
+    are processed block by block, with blocks computed in parallel on all cores.
+    Reflectances are scaled with the scale and offset of the band files and nodata
+    pixels become NaN.
+
+    Bands at a different resolution than the first band of an expression (e.g.
+    ``swir16`` in NDMI) are resampled to its grid on the fly. Results are written
+    as float32 GeoTIFFs ``<item_id>_<index>.tif`` next to the band files, so that
+    DatacubeBuilder can add them to the cubes like any other band.
+
+    Attributes:
+        storage_path (str): Path the band files are read from and indices written to.
+        indices (dict): Parsed expression of every index, keyed by index name.
+        block_size (int): Width and height of the blocks indices are computed in.
+        compression_level (int): zlib compression level of the written files.
+        logger (logging.Logger): Logger for this class.
+    """
+
+    def __init__(self, config: DictConfig):
+        """
+        Initialize the SpectralIndexCalculator with the given configuration.
+
+        Args:
+            config (DictConfig): Configuration containing storage and processing
+                settings.
+
+        Raises:
+            ValueError: If an expression is invalid, an index without expression is
+                unknown, or an expression reads a band that is not loaded.
+        """
+        processing = getattr(config, "processing", None)
+        self.storage_path = config.storage.path
+        self.block_size = getattr(processing, "index_block_size", 1024)
+        self.compression_level = getattr(processing, "compression_level", 4)
+        self.logger = logging.getLogger(__name__)
+
+        self.indices = {}
+        for name, expression in (getattr(processing, "indices", None) or {}).items():
+            if not expression:
+                if name not in SPECTRAL_INDICES:
+                    raise ValueError(
+                        f"No expression given for unknown index {name}. "
+                        f"Known indices: {', '.join(SPECTRAL_INDICES)}"
+                    )
+                expression = SPECTRAL_INDICES[name]
+            self.indices[name] = parse_expression(expression)
+
+        spectral_bands = set(config.pipeline.spectral_bands)
+        for name, tree in self.indices.items():
+            missing = [b for b in expression_bands(tree) if b not in spectral_bands]
+            if missing:
+                raise ValueError(
+                    f"Index {name} reads bands {missing} that are not in "
+                    "pipeline.spectral_bands"
+                )
+
+    def compute(self, items) -> list:
+        """
+        Compute all configured indices for the given items.
+
+        Indices already computed for an item are skipped.
+
+        Args:
+            items (list): List of STAC items to compute indices for.
+
+        Returns:
+            list: Paths of the index files of the items.
+        """
+        saved_files = []
+        for item in items:
+            for name, tree in self.indices.items():
+                file_path = os.path.join(self.storage_path, f"{item.id}_{name}.tif")
+                if os.path.exists(file_path):
+                    saved_files.append(file_path)
+                    continue
+                band_paths = {
+                    band: os.path.join(self.storage_path, f"{item.id}_{band}.tif")
+                    for band in expression_bands(tree)
+                }
+                missing = [
+                    b for b, path in band_paths.items() if not os.path.exists(path)
+                ]
+                if missing:
+                    self.logger.warning(
+                        f"Skipping {name} of {item.id}: bands {missing} not loaded"
+                    )
+                    continue
+                with metrics.timer("process.index"):
+                    self.compute_index(tree, band_paths, file_path)
+                self.logger.info(f"Computed {name} of {item.id}: {file_path}")
+                saved_files.append(file_path)
+        return saved_files
+
+    def compute_index(self, tree, band_paths: dict, file_path: str):
+        """
+        Evaluate an expression over band files and write the result to a GeoTIFF.
+
+        Args:
+            tree (ast.Expression): Expression returned by parse_expression.
+            band_paths (dict): Band file paths keyed by band name; the grid of the
+                first band is the grid of the result.
+            file_path (str): Path of the GeoTIFF to write.
+        """
+        chunks = {"band": 1, "y": self.block_size, "x": self.block_size}
+        with ExitStack() as stack:
+            grid = None
+            bands = {}
+            for band, path in band_paths.items():
+                src = stack.enter_context(open_on_grid(path, grid))
+                grid = grid or src
+                bands[band] = rioxarray.open_rasterio(
+                    src, chunks=chunks, lock=False, mask_and_scale=True
+                ).astype("float32")
+
+            result = evaluate(tree, bands).astype("float32")
+            result = result.rio.write_nodata(np.nan, encoded=False)
+            result.attrs = {}
+
+            block_size = max(16, min(512, self.block_size) // 16 * 16)
+            part_path = f"{file_path}.part"
+            result.rio.to_raster(
+                part_path,
+                driver="GTiff",
+                tiled=True,
+                blockxsize=block_size,
+                blockysize=block_size,
+                compress="deflate",
+                zlevel=self.compression_level,
+                predictor=3,
+                BIGTIFF="IF_SAFER",
+                lock=threading.Lock(),
+            )
+        os.replace(part_path, file_path)
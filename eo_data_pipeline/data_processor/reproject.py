@@ -0,0 +1,374 @@
+# eo_data_pipeline/data_processor/reproject.py
+
+import logging
+import math
+import os
+import threading
+
+import numpy as np
+import rasterio
+from omegaconf import DictConfig
+from rasterio.crs import CRS
+from rasterio.enums import Resampling
+from rasterio.transform import from_origin
+from rasterio.warp import reproject, transform, transform_bounds
+from rasterio.windows import Window, from_bounds
+
+from eo_data_pipeline.metrics import metrics
+
+from .blocks import write_blocks
+
+# Bands holding classes rather than measurements, always resampled with nearest
+CATEGORICAL_BANDS = ("scl",)
+
+# Source pixels added around the footprint of a block, for resampling kernels
+KERNEL_PADDING = 3
+
+# Points per block edge transformed to find the footprint of a block
+EDGE_POINTS = 21
+
+
+def _is_nodata(data, nodata):
+    if isinstance(nodata, float) and math.isnan(nodata):
+        return np.isnan(data)
+    return data == nodata
+
+
+class TargetGrid:
+    """
+    A raster grid that files are warped onto.
+
+    Attributes:
+        crs (rasterio.crs.CRS): Coordinate reference system of the grid.
+        transform (affine.Affine): Geotransform of the grid.
+        width (int): Number of columns.
+        height (int): Number of rows.
+    """
+
+    def __init__(self, crs, transform, width: int, height: int):
+        self.crs = CRS.from_user_input(crs)
+        self.transform = transform
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def from_bounds(cls, crs, resolution: float, bounds=None, aoi=None):
+        """
+        Create a grid covering bounds, snapped to multiples of the resolution.
+
+        Args:
+            crs (str): CRS of the grid, e.g. "EPSG:32633".
+            resolution (float): Pixel size in units of the CRS.
+            bounds (list, optional): [left, bottom, right, top] in the grid CRS.
+            aoi (list, optional): Bounding box [lon_min, lat_min, lon_max, lat_max]
+                in EPSG:4326, used if ``bounds`` is not given.
+
+        Returns:
+            TargetGrid: The grid.
+        """
+        crs = CRS.from_user_input(crs)
+        if bounds is None:
+            bounds = transform_bounds("EPSG:4326", crs, *aoi, densify_pts=21)
+        left, bottom, right, top = bounds
+        left = math.floor(left / resolution) * resolution
+        top = math.ceil(top / resolution) * resolution
+        width = math.ceil((right - left) / resolution)
+        height = math.ceil((top - bottom) / resolution)
+        return cls(crs, from_origin(left, top, resolution, resolution), width, height)
+
+    @property
+    def key(self) -> tuple:
+        """Hashable identity of the grid."""
+        return (self.crs.to_string(), tuple(self.transform), self.width, self.height)
+
+    def windows(self, block_size: int) -> list:
+        """
+        Split the grid into blocks.
+
+        Args:
+            block_size (int): Width and height of a block.
+
+        Returns:
+            list: Windows of the blocks, row by row.
+        """
+        return [
+            Window(
+                col,
+                row,
+                min(block_size, self.width - col),
+                min(block_size, self.height - row),
+            )
+            for row in range(0, self.height, block_size)
+            for col in range(0, self.width, block_size)
+        ]
+
+
+class WarpPlanCache:
+    """
+    A cache of warp plans keyed by (source grid, target grid, block size).
+
+    A warp plan lists, for every block of the target grid, the window of the source
+    raster it is warped from; blocks the source does not cover are left out. All
+    scenes of an MGRS tile share a source grid, so the plan, which needs
+    coordinate transforms of every block footprint, is computed once per tile.
+
+    Attributes:
+        hits (int): Number of plans served from the cache.
+        misses (int): Number of plans computed.
+    """
+
+    def __init__(self):
+        self._plans = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, src, grid: TargetGrid, block_size: int) -> list:
+        """
+        Return the warp plan of a source raster onto a grid.
+
+        Args:
+            src (rasterio.io.DatasetReader): Open source raster.
+            grid (TargetGrid): Target grid.
+            block_size (int): Block size of the target grid.
+
+        Returns:
+            list: (target window, source window) tuples.
+        """
+        key = (
+            src.crs.to_string(),
+            tuple(src.transform),
+            src.width,
+            src.height,
+            grid.key,
+            block_size,
+        )
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self.hits += 1
+                metrics.incr("reproject.plan_hits")
+                return plan
+        plan = self._plan(src, grid, block_size)
+        with self._lock:
+            self._plans[key] = plan
+            self.misses += 1
+        metrics.incr("reproject.plan_misses")
+        return plan
+
+    @staticmethod
+    def _plan(src, grid, block_size):
+        windows = grid.windows(block_size)
+        # Points along the edges of every block, transformed in a single call
+        steps = np.linspace(0, 1, EDGE_POINTS)
+        corners = np.array(
+            [rasterio.windows.bounds(window, grid.transform) for window in windows]
+        )
+        left, bottom, right, top = (corners[:, i : i + 1] for i in range(4))
+        xs = np.hstack(
+            [
+                left + (right - left) * steps,
+                left + (right - left) * steps,
+                np.repeat(left, EDGE_POINTS, axis=1),
+                np.repeat(right, EDGE_POINTS, axis=1),
+            ]
+        )
+        ys = np.hstack(
+            [
+                np.repeat(bottom, EDGE_POINTS, axis=1),
+                np.repeat(top, EDGE_POINTS, axis=1),
+                bottom + (top - bottom) * steps,
+                bottom + (top - bottom) * steps,
+            ]
+        )
+        src_xs, src_ys = transform(
+            grid.crs, src.crs, xs.ravel().tolist(), ys.ravel().tolist()
+        )
+        src_xs = np.array(src_xs).reshape(xs.shape)
+        src_ys = np.array(src_ys).reshape(ys.shape)
+
+        extent = Window(0, 0, src.width, src.height)
+        plan = []
+        for window, block_xs, block_ys in zip(windows, src_xs, src_ys):
+            if not (np.isfinite(block_xs).all() and np.isfinite(block_ys).all()):
+                continue  # Block outside the valid area of the source CRS
+            src_window = from_bounds(
+                block_xs.min(),
+                block_ys.min(),
+                block_xs.max(),
+                block_ys.max(),
+                transform=src.transform,
+            )
+            col_off = math.floor(src_window.col_off) - KERNEL_PADDING
+            row_off = math.floor(src_window.row_off) - KERNEL_PADDING
+            col_end = math.ceil(src_window.col_off + src_window.width) + KERNEL_PADDING
+            row_end = math.ceil(src_window.row_off + src_window.height) + KERNEL_PADDING
+            if col_end <= 0 or row_end <= 0:
+                continue
+            if col_off >= src.width or row_off >= src.height:
+                continue
+            src_window = Window(
+                col_off, row_off, col_end - col_off, row_end - row_off
+            ).intersection(extent)
+            plan.append((window, src_window))
+        return plan
+
+
+class Reprojector:
+    """
+    A class for warping the saved band files onto one common grid.
+
+    Bands at 10, 20 and 60 m and items from different UTM zones are warped onto
+    the grid given by ``grid.crs``, ``grid.resolution`` and ``grid.bounds`` (by
+    default the AOI), so that all files can be stacked into one datacube. Files are
+    warped block by block in parallel, reading only the source window each block
+    needs, and the block-to-window mapping is reused across files through a
+    WarpPlanCache. Blocks outside a scene are not written, leaving them as nodata
+    without taking up space.
+
+    Warped files keep the name ``<item_id>_<band>.tif`` and are written to
+    ``grid.output_path``.
+
+    Attributes:
+        storage_path (str): Path the band files are read from.
+        output_path (str): Directory the warped files are written to.
+        grid (TargetGrid): Grid all files are warped onto.
+        resampling (rasterio.enums.Resampling): Resampling of measurement bands.
+        block_size (int): Width and height of the blocks files are warped in.
+        max_workers (int): Number of blocks warped in parallel.
+        plans (WarpPlanCache): Cache of warp plans.
+        logger (logging.Logger): Logger for this class.
+    """
+
+    def __init__(self, config: DictConfig):
+        """
+        Initialize the Reprojector with the given configuration.
+
+        Args:
+            config (DictConfig): Configuration containing storage, pipeline and grid
+                settings; ``grid.crs`` must be set.
+
+        Raises:
+            ValueError: If the resampling method is unknown.
+        """
+        grid = config.grid
+        self.storage_path = config.storage.path
+        self.output_path = getattr(grid, "output_path", "./data/aligned/")
+        bounds = getattr(grid, "bounds", None)
+        self.grid = TargetGrid.from_bounds(
+            grid.crs,
+            getattr(grid, "resolution", 10),
+            bounds=list(bounds) if bounds else None,
+            aoi=list(config.pipeline.aoi),
+        )
+        resampling = getattr(grid, "resampling", "bilinear")
+        try:
+            self.resampling = Resampling[resampling]
+        except KeyError:
+            raise ValueError(f"Invalid resampling method: {resampling}")
+        # Tiled GeoTIFF blocks are multiples of 16 pixels
+        self.block_size = max(16, getattr(grid, "block_size", 512) // 16 * 16)
+        self.max_workers = getattr(grid, "max_workers", None) or os.cpu_count()
+        self.plans = WarpPlanCache()
+        self.logger = logging.getLogger(__name__)
+
+    def align(self, items, bands) -> list:
+        """
+        Warp the files of the given items and bands onto the target grid.
+
+        Files already warped are skipped.
+
+        Args:
+            items (list): List of STAC items whose files should be warped.
+            bands (list): Bands (or indices) to warp.
+
+        Returns:
+            list: Paths of the warped files.
+        """
+        os.makedirs(self.output_path, exist_ok=True)
+        saved_files = []
+        for item in items:
+            for band in bands:
+                name = f"{item.id}_{band}.tif"
+                path = os.path.join(self.storage_path, name)
+                file_path = os.path.join(self.output_path, name)
+                if os.path.exists(file_path):
+                    saved_files.append(file_path)
+                    continue
+                if not os.path.exists(path):
+                    continue
+                resampling = (
+                    Resampling.nearest if band in CATEGORICAL_BANDS else self.resampling
+                )
+                with metrics.timer("process.reproject"):
+                    self.warp(path, file_path, resampling)
+                saved_files.append(file_path)
+        self.logger.info(
+            f"Warped {len(saved_files)} files onto the target grid "
+            f"({self.plans.misses} warp plans computed, {self.plans.hits} reused)"
+        )
+        return saved_files
+
+    def warp(self, path: str, file_path: str, resampling=Resampling.bilinear):
+        """
+        Warp one raster onto the target grid.
+
+        Args:
+            path (str): Path of the source raster.
+            file_path (str): Path of the warped GeoTIFF to write.
+            resampling (rasterio.enums.Resampling): Resampling method.
+        """
+        with rasterio.open(path) as src:
+            profile = src.profile
+            plan = self.plans.get(src, self.grid, self.block_size)
+        nodata = profile.get("nodata")
+        if nodata is None:
+            nodata = np.nan if np.dtype(profile["dtype"]).kind == "f" else 0
+
+        profile.update(
+            driver="GTiff",
+            crs=self.grid.crs,
+            transform=self.grid.transform,
+            width=self.grid.width,
+            height=self.grid.height,
+            nodata=nodata,
+            tiled=True,
+            blockxsize=self.block_size,
+            blockysize=self.block_size,
+            compress="deflate",
+            sparse_ok=True,
+            BIGTIFF="IF_SAFER",
+        )
+        src_windows = dict(plan)
+
+        def warp_block(window):
+            src_window = src_windows[window]
+            with rasterio.open(path) as src:
+                source = src.read(window=src_window)
+                src_transform = src.window_transform(src_window)
+                src_crs = src.crs
+            destination = np.full(
+                (source.shape[0], window.height, window.width),
+                nodata,
+                dtype=source.dtype,
+            )
+            reproject(
+                source,
+                destination,
+                src_transform=src_transform,
+                src_crs=src_crs,
+                src_nodata=nodata,
+                dst_transform=rasterio.windows.transform(window, self.grid.transform),
+                dst_crs=self.grid.crs,
+                dst_nodata=nodata,
+                resampling=resampling,
+                num_threads=1,
+            )
+            if _is_nodata(destination, nodata).all():
+                return None
+            return destination
+
+        part_path = f"{file_path}.part"
+        with rasterio.open(part_path, "w", **profile) as dst:
+            write_blocks(dst, warp_block, src_windows, self.max_workers)
+        os.replace(part_path, file_path)
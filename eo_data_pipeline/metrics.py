@@ -0,0 +1,234 @@
+# eo_data_pipeline/metrics.py
+
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class Metrics:
+    """
+    A registry of timers, counters and gauges describing a pipeline run.
+
+    Timers record the number, total, minimum and maximum of observed durations,
+    counters accumulate values such as bytes transferred or cache hits, and gauges
+    track the current and peak value of levels such as the number of downloads in
+    flight. The registry can be exported as a JSON run summary or in the
+    Prometheus text format, and timers can additionally be emitted as
+    OpenTelemetry spans.
+
+    When disabled, all recording methods return immediately, so instrumented code
+    pays only for a method call.
+
+    Attributes:
+        enabled (bool): Whether metrics are recorded.
+        opentelemetry (bool): Whether timers are also emitted as spans.
+    """
+
+    def __init__(self, enabled: bool = False, opentelemetry: bool = False):
+        """
+        Initialize an empty Metrics registry.
+
+        Args:
+            enabled (bool): Whether metrics are recorded.
+            opentelemetry (bool): Whether timers are also emitted as OpenTelemetry
+                spans; requires the opentelemetry-api package.
+        """
+        self._lock = threading.Lock()
+        self._tracer = None
+        self.configure(enabled, opentelemetry)
+
+    def configure(self, enabled: bool = False, opentelemetry: bool = False):
+        """
+        Enable or disable recording, and clear all recorded metrics.
+
+        Args:
+            enabled (bool): Whether metrics are recorded.
+            opentelemetry (bool): Whether timers are also emitted as spans.
+
+        Raises:
+            ImportError: If spans are requested but opentelemetry is not installed.
+        """
+        self.enabled = enabled
+        self.opentelemetry = enabled and opentelemetry
+        if self.opentelemetry and self._tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError as e:
+                raise ImportError(
+                    "OpenTelemetry spans require the opentelemetry-api package"
+                ) from e
+            self._tracer = trace.get_tracer("eo_data_pipeline")
+        self.reset()
+
+    def reset(self):
+        """Clear all recorded metrics."""
+        with self._lock:
+            self.timers = {}
+            self.counters = {}
+            self.gauges = {}
+
+    def observe(self, name: str, seconds: float):
+        """
+        Record a duration.
+
+        Args:
+            name (str): Name of the timer, e.g. "load.asset".
+            seconds (float): Observed duration in seconds.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = {
+                    "count": 1,
+                    "total_s": seconds,
+                    "min_s": seconds,
+                    "max_s": seconds,
+                }
+            else:
+                timer["count"] += 1
+                timer["total_s"] += seconds
+                timer["min_s"] = min(timer["min_s"], seconds)
+                timer["max_s"] = max(timer["max_s"], seconds)
+
+    def timer(self, name: str):
+        """
+        Time a block of code.
+
+        Args:
+            name (str): Name of the timer.
+
+        Returns:
+            Context manager recording the duration of the block.
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._timer(name)
+
+    @contextmanager
+    def _timer(self, name):
+        span = (
+            self._tracer.start_as_current_span(name)
+            if self.opentelemetry
+            else nullcontext()
+        )
+        start = time.perf_counter()
+        try:
+            with span:
+                yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def incr(self, name: str, value: float = 1):
+        """
+        Add a value to a counter.
+
+        Args:
+            name (str): Name of the counter, e.g. "load.bytes".
+            value (float): Value to add.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, delta: float):
+        """
+        Change a gauge by ``delta`` and keep track of its peak value.
+
+        Args:
+            name (str): Name of the gauge, e.g. "load.in_flight".
+            delta (float): Change of the level.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            gauge = self.gauges.setdefault(name, {"value": 0, "max": 0})
+            gauge["value"] += delta
+            gauge["max"] = max(gauge["max"], gauge["value"])
+
+    def in_flight(self, name: str):
+        """
+        Count a block of code as in flight on a gauge while it runs.
+
+        Args:
+            name (str): Name of the gauge.
+
+        Returns:
+            Context manager raising the gauge for the duration of the block.
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._in_flight(name)
+
+    @contextmanager
+    def _in_flight(self, name):
+        self.gauge(name, 1)
+        try:
+            yield
+        finally:
+            self.gauge(name, -1)
+
+    def summary(self) -> dict:
+        """
+        Return all recorded metrics.
+
+        Returns:
+            dict: ``timers``, ``counters`` and ``gauges`` keyed by metric name.
+        """
+        with self._lock:
+            return {
+                "timers": {name: dict(timer) for name, timer in self.timers.items()},
+                "counters": dict(self.counters),
+                "gauges": {name: dict(gauge) for name, gauge in self.gauges.items()},
+            }
+
+    def to_json(self, path: str):
+        """
+        Write the run summary to a JSON file.
+
+        Args:
+            path (str): Path of the file.
+        """
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        Render all recorded metrics in the Prometheus text exposition format.
+
+        Metric names are prefixed with ``eo_pipeline_``; dots and other characters
+        not allowed by Prometheus are replaced by underscores.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        summary = self.summary()
+        lines = []
+        for name, timer in summary["timers"].items():
+            metric = _prometheus_name(name) + "_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            lines.append(f"{metric}_count {timer['count']}")
+            lines.append(f"{metric}_sum {timer['total_s']}")
+        for name, value in summary["counters"].items():
+            metric = _prometheus_name(name) + "_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, gauge in summary["gauges"].items():
+            metric = _prometheus_name(name)
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {gauge['value']}")
+            lines.append(f"# TYPE {metric}_max gauge")
+            lines.append(f"{metric}_max {gauge['max']}")
+        return "\n".join(lines) + "\n"
+
+
+def _prometheus_name(name):
+    return "eo_pipeline_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+# Registry shared by all modules of the pipeline; disabled until configured
+metrics = Metrics()
@@ -0,0 +1,128 @@
+# eo_data_pipeline/pipeline/engine.py
+
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Set to "local" to run the flows without the Prefect engine. It is read when the
+# stages are decorated, i.e. before eo_data_pipeline.pipeline.flow is imported.
+ENGINE_VARIABLE = "EO_PIPELINE_ENGINE"
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def use_prefect() -> bool:
+    """Return whether the stages run as Prefect tasks and flows."""
+    return os.environ.get(ENGINE_VARIABLE, "prefect") != "local"
+
+
+def _submit_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Like Prefect's default task runner, submitted tasks run in threads
+            _pool = ThreadPoolExecutor(thread_name_prefix="eo-task")
+        return _pool
+
+
+class LocalTask:
+    """
+    A pipeline stage run in-process, in place of a Prefect task.
+
+    Calling the task runs the function, retrying it up to ``retries`` times;
+    ``submit`` runs it in a thread and returns a concurrent.futures.Future, whose
+    ``result()`` matches that of a Prefect future.
+
+    Attributes:
+        fn (callable): The decorated function.
+        name (str): Name of the task, used in log messages.
+        retries (int): Number of retries after a failed call.
+        retry_delay_seconds (float): Delay before each retry.
+    """
+
+    def __init__(self, fn, name=None, retries=0, retry_delay_seconds=0):
+        """
+        Initialize the LocalTask.
+
+        Args:
+            fn (callable): The function to run.
+            name (str, optional): Name of the task, defaults to the function name.
+            retries (int): Number of retries after a failed call.
+            retry_delay_seconds (float): Delay before each retry.
+        """
+        self.fn = fn
+        self.name = name or fn.__name__
+        self.retries = retries or 0
+        self.retry_delay_seconds = retry_delay_seconds or 0
+        functools.update_wrapper(self, fn)
+
+    def __call__(self, *args, **kwargs):
+        for attempt in range(self.retries + 1):
+            try:
+                return self.fn(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                logger.warning(
+                    f"Task {self.name} failed ({e}), retry {attempt + 1} of "
+                    f"{self.retries}"
+                )
+                time.sleep(self.retry_delay_seconds)
+
+    def submit(self, *args, **kwargs):
+        """Run the task in a thread, returning a future of its result."""
+        return _submit_pool().submit(self, *args, **kwargs)
+
+
+def task(**kwargs):
+    """
+    Decorate a pipeline stage as a Prefect task, or as a LocalTask.
+
+    Args:
+        **kwargs: Arguments of ``prefect.task``; only ``name``, ``retries`` and
+            ``retry_delay_seconds`` are used by LocalTask.
+    """
+    if use_prefect():
+        from prefect import task as prefect_task
+
+        return prefect_task(**kwargs)
+
+    def decorator(fn):
+        return LocalTask(
+            fn,
+            name=kwargs.get("name"),
+            retries=kwargs.get("retries", 0),
+            retry_delay_seconds=kwargs.get("retry_delay_seconds", 0),
+        )
+
+    return decorator
+
+
+def flow(**kwargs):
+    """
+    Decorate a pipeline as a Prefect flow, or leave it a plain function.
+
+    Args:
+        **kwargs: Arguments of ``prefect.flow``.
+    """
+    if use_prefect():
+        from prefect import flow as prefect_flow
+
+        return prefect_flow(**kwargs)
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return fn(*args, **kwargs)
+
+        # Same access to the undecorated function as a Prefect flow
+        wrapper.fn = fn
+        return wrapper
+
+    return decorator
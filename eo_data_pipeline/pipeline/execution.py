@@ -0,0 +1,215 @@
+# eo_data_pipeline/pipeline/execution.py
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from pystac import Asset
+
+from eo_data_pipeline.config.config_schema import Config
+from eo_data_pipeline.data_loader.downloader import AssetDownloader
+from eo_data_pipeline.data_loader.loader import DataLoader
+from eo_data_pipeline.data_loader.transfer import TransferEngine
+
+BACKENDS = ("thread", "process", "dask")
+
+# DataLoader of a worker process, shared by all assets the worker loads
+_worker_loader = None
+
+
+def _init_worker(config):
+    global _worker_loader
+    _worker_loader = DataLoader(config)
+
+
+def _load_asset(asset, file_path, aoi, config=None):
+    """Load one asset with the DataLoader of the current worker process."""
+    if _worker_loader is None:
+        _init_worker(config)
+    return _worker_loader.load_asset(Asset.from_dict(asset), file_path, aoi=aoi)
+
+
+def _worker_ready(_):
+    return _worker_loader is not None
+
+
+class AssetExecutor:
+    """
+    A class for loading assets on a configurable pool of workers.
+
+    Work is distributed at (item, band) granularity, so that all bands of all
+    items are loaded concurrently. Each worker keeps one DataLoader, and with it
+    one HTTP session, for its whole lifetime:
+
+    * "thread": a thread pool in the current process sharing a single loader.
+    * "process": a pool of worker processes, each initialised once with the
+      configuration.
+    * "dask": dask delayed tasks run with the configured dask scheduler, e.g.
+      "processes", "threads", or the address of a distributed scheduler, which
+      is connected to once, on the first load.
+
+    Planning and recording of downloads (catalog index, cache statistics) always
+    happens in the current process. With ``transfer.enabled``, the threads of the
+    "thread" backend share one TransferEngine, whose per-host limits then apply to
+    the whole run; worker processes each adapt their own limits.
+
+    Attributes:
+        config (Config): Configuration the workers are initialised with.
+        backend (str): Execution backend, one of "thread", "process" or "dask".
+        max_workers (int): Maximum number of assets loaded at once.
+        dask_scheduler (str): Scheduler used by the "dask" backend.
+        loader (DataLoader): Loader of the current process.
+        logger (logging.Logger): Logger for this class.
+    """
+
+    def __init__(self, config: Config):
+        """
+        Initialize the AssetExecutor with the given configuration.
+
+        Args:
+            config (Config): Configuration with an optional ``execution`` section.
+
+        Raises:
+            ValueError: If the execution backend is unknown.
+        """
+        execution = getattr(config, "execution", None)
+        self.config = config
+        self.backend = getattr(execution, "backend", "thread")
+        self.max_workers = getattr(execution, "max_workers", None) or getattr(
+            config.storage, "max_concurrent_downloads", 4
+        )
+        self.dask_scheduler = getattr(execution, "dask_scheduler", "processes")
+        if self.backend not in BACKENDS:
+            raise ValueError(
+                f"Invalid execution backend: {self.backend}. "
+                f"Choose from: {', '.join(BACKENDS)}"
+            )
+        self.loader = DataLoader(config)
+        if isinstance(self.loader.downloader, TransferEngine):
+            if self.backend == "thread":
+                # The engine adapts the number of transfers per host; enough
+                # threads are needed to fill its limits
+                self.max_workers = max(
+                    self.max_workers, self.loader.downloader.max_per_host
+                )
+        elif self.backend == "thread":
+            # One connection per worker thread in the shared session
+            self.loader.downloader = AssetDownloader(max_connections=self.max_workers)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                return self._pool
+            if self.backend == "thread":
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            elif self.backend == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.config,),
+                )
+            elif "://" in self.dask_scheduler:
+                # One client to the distributed scheduler for all loads of the run
+                from distributed import Client
+
+                self._pool = Client(self.dask_scheduler)
+            return self._pool
+
+    def start(self):
+        """
+        Start the worker pool ahead of the first load.
+
+        Worker processes are otherwise started on demand, which adds their start-up
+        time to the first assets they load.
+        """
+        pool = self._get_pool()
+        if self.backend == "process":
+            list(pool.map(_worker_ready, range(self.max_workers)))
+
+    def load(self, items, spectral_bands, aoi=None, manifest=None):
+        """
+        Load the assets of specified STAC items and spectral bands.
+
+        See DataLoader.load_data for the handling of each asset.
+
+        Args:
+            items (list): List of STAC items to load data from.
+            spectral_bands (list): List of spectral bands to load.
+            aoi (list or dict, optional): Bounding box [lon_min, lat_min, lon_max,
+                lat_max] to clip assets to in "clip" load mode, or bounding boxes
+                keyed by item id.
+            manifest (RunManifest, optional): Manifest of the run; assets it
+                records as loaded are skipped, and the outcome of the others is
+                recorded in it.
+
+        Returns:
+            list: List of file paths to the saved items.
+        """
+        downloads = self.loader.plan_downloads(items, spectral_bands)
+        completed = []
+        if manifest is not None:
+            downloads, completed = manifest.completed(downloads)
+        self.logger.info(
+            f"Loading {len(downloads)} assets with the {self.backend} backend "
+            f"({self.max_workers} workers)"
+        )
+
+        aois = [
+            aoi.get(item_id) if isinstance(aoi, dict) else aoi
+            for item_id, _, _, _ in downloads
+        ]
+        if self.backend == "thread":
+            results = self._get_pool().map(
+                lambda download, aoi: self.loader.load_asset(
+                    download[2], download[3], aoi=aoi
+                ),
+                downloads,
+                aois,
+            )
+        elif self.backend == "process":
+            # Assets are sent as dictionaries, without the item and catalog they
+            # link to
+            results = self._get_pool().map(
+                _load_asset,
+                [download[2].to_dict() for download in downloads],
+                [download[3] for download in downloads],
+                aois,
+            )
+        else:
+            import dask
+
+            scheduler = self._get_pool() or self.dask_scheduler
+            config = dask.delayed(self.config, traverse=False)
+            tasks = [
+                dask.delayed(_load_asset)(asset.to_dict(), file_path, aoi, config)
+                for (_, _, asset, file_path), aoi in zip(downloads, aois)
+            ]
+            results = dask.compute(
+                *tasks, scheduler=scheduler, num_workers=self.max_workers
+            )
+
+        results = list(results)
+        if manifest is not None:
+            manifest.record(downloads, results)
+        return completed + self.loader.record_downloads(downloads, results)
+
+    def close(self):
+        """Shut down the worker pool and close the connections of the loader."""
+        if self._pool is not None:
+            if self.backend == "dask":
+                self._pool.close()
+            else:
+                self._pool.shutdown()
+            self._pool = None
+        self.loader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,70 +1,421 @@
 import logging
-
-from prefect import flow, task
+import os
+import time
 
 from eo_data_pipeline.config.config_schema import Config
+from eo_data_pipeline.data_fetcher.aois import (
+    item_bounds,
+    load_aois,
+    merge_aois,
+    search_aois,
+)
 from eo_data_pipeline.data_fetcher.fetcher import DataFetcher
 from eo_data_pipeline.data_fetcher.validator import ParameterValidator
+from eo_data_pipeline.data_loader.cog import COGTranscoder
+from eo_data_pipeline.data_loader.fanout import AOIFanOut
 from eo_data_pipeline.data_loader.loader import DataLoader
+from eo_data_pipeline.data_loader.planner import DownloadPlanner
+from eo_data_pipeline.data_loader.scene_filter import SceneFilter
+from eo_data_pipeline.data_processor.composite import Compositor
+from eo_data_pipeline.data_processor.datacube import DatacubeBuilder
+from eo_data_pipeline.data_processor.indices import SpectralIndexCalculator
+from eo_data_pipeline.data_processor.reproject import Reprojector
+from eo_data_pipeline.metrics import metrics
+from eo_data_pipeline.pipeline.engine import flow, task
+from eo_data_pipeline.pipeline.execution import AssetExecutor
+from eo_data_pipeline.pipeline.manifest import RunManifest, open_manifest
+from eo_data_pipeline.pipeline.sharding import is_sharded, shard_config, shard_items
 
 
 @task(name="Validate Inputs", log_prints=True)
 def validate_inputs(config: Config):
-    ParameterValidator.validate_time_range(
-        [config.pipeline.time_steps.start, config.pipeline.time_steps.end]
-    )
-    ParameterValidator.validate_aoi(config.pipeline.aoi)
-    ParameterValidator.validate_spectral_bands(config.pipeline.spectral_bands)
+    ParameterValidator.validate_config(config)
 
 
 @task(name="Fetch Data", log_prints=True)
-def fetch_data(config: Config):
+def fetch_data(config: Config, aoi=None):
     fetcher = DataFetcher(config)
-    items = fetcher.fetch_data(
-        [config.pipeline.time_steps.start, config.pipeline.time_steps.end],
-        config.pipeline.aoi,
-        config.pipeline.spectral_bands,
-    )
+    with metrics.timer("stage.fetch_data"):
+        items = fetcher.fetch_data(
+            [config.pipeline.time_steps.start, config.pipeline.time_steps.end],
+            config.pipeline.aoi if aoi is None else aoi,
+            config.pipeline.spectral_bands,
+        )
 
     logging.info(f"Fetched {len(items)} items")
+    if is_sharded(config):
+        items = shard_items(config, items)
+        logging.info(f"{len(items)} items in shard {config.shard.index}")
     return items
 
 
+@task(name="Filter Scenes", log_prints=True)
+def filter_scenes(config: Config, items, aoi=None):
+    # Drop scenes that are cloudy over the AOI before any of their bands are loaded
+    if getattr(config.pipeline, "min_valid_fraction", None) is None:
+        return items
+    return SceneFilter(config).filter(
+        items, config.pipeline.aoi if aoi is None else aoi
+    )
+
+
 @task(name="save Metadata", log_prints=True)
 def save_metadata(config: Config, items):
     print("Saving metadta")
     loader = DataLoader(config)
-    loader.save_metadata(items=items)
+    with metrics.timer("stage.save_metadata"):
+        try:
+            loader.save_metadata(items=items)
+        finally:
+            loader.close()
     return items
 
 
+@task(name="Plan Downloads", log_prints=True)
+def plan_downloads(config: Config, items, aoi=None):
+    # Estimate the bytes and duration of loading the items, without loading them
+    planner = DownloadPlanner(config)
+    with metrics.timer("stage.plan_downloads"):
+        try:
+            estimates = planner.plan(
+                items,
+                config.pipeline.spectral_bands,
+                aoi=config.pipeline.aoi if aoi is None else aoi,
+            )
+        finally:
+            planner.close()
+    plan = planner.summarize(estimates)
+    logging.info(f"Download plan: {plan}")
+    return plan
+
+
 @task(name="Load and Process Data", log_prints=True, retries=3)
-def load_data(config: Config, item):
-    loader = DataLoader(config)
-    return loader.load_data([item], config.pipeline.spectral_bands)
+def load_data(config: Config, items, executor: AssetExecutor, manifest=None, aoi=None):
+    # All (item, band) assets are spread over the workers of the executor; assets
+    # completed by an earlier attempt or run are skipped
+    with metrics.timer("stage.load_data"):
+        return executor.load(
+            items,
+            config.pipeline.spectral_bands,
+            aoi=config.pipeline.aoi if aoi is None else aoi,
+            manifest=manifest,
+        )
 
 
-@task
-def process_data(config: Config, saved_files: list):
-    # Process the data into netcdf for faster read during downstream applications
-    # TO-DO for later
-    pass
+@task(name="Transcode to COG", log_prints=True)
+def transcode_data(config: Config, items):
+    # Re-encode the downloaded files in place as COGs for fast windowed reads
+    transcoder = COGTranscoder(config)
+    with metrics.timer("stage.transcode_data"):
+        return transcoder.transcode(items, config.pipeline.spectral_bands)
+
+
+@task(name="Compute Indices", log_prints=True)
+def compute_indices(config: Config, items):
+    # Band-math indices are written next to the band files they are computed from
+    calculator = SpectralIndexCalculator(config)
+    with metrics.timer("stage.compute_indices"):
+        return calculator.compute(items)
+
+
+@task(name="Align Data", log_prints=True)
+def align_data(config: Config, items):
+    # Warp all bands and items onto the configured grid, so they share one datacube
+    bands = list(config.pipeline.spectral_bands) + list(
+        getattr(config.processing, "indices", None) or {}
+    )
+    reprojector = Reprojector(config)
+    with metrics.timer("stage.align_data"):
+        return reprojector.align(items, bands)
+
+
+@task(name="Process Data", log_prints=True)
+def process_data(config: Config, items, saved_files: list, storage_path=None):
+    # Process the data into datacubes for faster read during downstream applications
+    files = [path for item_files in saved_files for path in item_files]
+    bands = list(config.pipeline.spectral_bands) + list(
+        getattr(config.processing, "indices", None) or {}
+    )
+    builder = DatacubeBuilder(config, storage_path=storage_path)
+    with metrics.timer("stage.process_data"):
+        return builder.build(items, bands, saved_files=files)
+
+
+@task(name="Build Composites", log_prints=True)
+def build_composites(config: Config, items):
+    # Cloud-free composites per time bin, from the band and index files
+    bands = list(config.pipeline.spectral_bands) + list(
+        getattr(config.processing, "indices", None) or {}
+    )
+    compositor = Compositor(config)
+    with metrics.timer("stage.build_composites"):
+        return compositor.build(items, bands)
+
+
+def export_metrics(config: Config):
+    # Write the run summary and Prometheus metrics, if configured
+    metrics_config = getattr(config, "metrics", None)
+    output_path = getattr(metrics_config, "output_path", None)
+    if output_path:
+        metrics.to_json(output_path)
+        logging.info(f"Run metrics written to {output_path}")
+    prometheus_path = getattr(metrics_config, "prometheus_path", None)
+    if prometheus_path:
+        with open(prometheus_path, "w") as f:
+            f.write(metrics.to_prometheus())
+
+
+@task(name="Fan Out AOI", log_prints=True)
+def fan_out_aoi(config: Config, aoi, items):
+    # Clip the shared files of the batch to one AOI, and build its datacube
+    bands = list(config.pipeline.spectral_bands) + list(
+        getattr(config.processing, "indices", None) or {}
+    )
+    fan_out = AOIFanOut(config)
+    with metrics.timer("stage.fan_out"):
+        clipped = fan_out.fan_out(aoi, items, bands)
+        cubes = []
+        if getattr(config.batch, "datacubes", True) and clipped:
+            builder = DatacubeBuilder(
+                config,
+                storage_path=fan_out.aoi_path(aoi),
+                output_path=os.path.join(fan_out.aoi_path(aoi), "cube"),
+            )
+            cubes = builder.build(items, bands, saved_files=clipped)
+    return {"files": clipped, "datacubes": cubes}
+
+
+def batch_enabled(config: Config) -> bool:
+    batch = getattr(config, "batch", None)
+    return bool(getattr(batch, "aois", None) or getattr(batch, "aoi_file", None))
+
+
+def configure_metrics(config: Config):
+    metrics_config = getattr(config, "metrics", None)
+    metrics.configure(
+        enabled=getattr(metrics_config, "enabled", False),
+        opentelemetry=getattr(metrics_config, "opentelemetry", False),
+    )
+
+
+def start_manifest(config: Config):
+    # Returns the manifest of the run and whether a recorded run is continued
+    manifest = open_manifest(config)
+    resumed = manifest.start(
+        RunManifest.make_key(config),
+        resume=getattr(getattr(config, "run", None), "resume", False),
+    )
+    return manifest, resumed
+
+
+def download_items(config: Config, manifest: RunManifest, resumed: bool):
+    # Search, save the metadata of and load the items of a run; returns the items
+    # and the lists of files loaded per batch of items
+    # A resumed run reuses the search result of the interrupted one
+    items = manifest.items() if resumed else None
+
+    with AssetExecutor(config) as executor:
+        if items is not None:
+            logging.info(f"Resuming with {len(items)} items of the interrupted run")
+            if not manifest.stage_done("save_metadata"):
+                items = save_metadata(config, items)
+                manifest.mark_stage("save_metadata")
+            saved_files = [load_data(config, items, executor, manifest)]
+        elif config.earth_search.streaming:
+            # Submit downloads page by page while later pages are still being fetched
+            fetcher = DataFetcher(config)
+            items, saved_files = [], []
+            for page in fetcher.iter_pages(
+                [config.pipeline.time_steps.start, config.pipeline.time_steps.end],
+                config.pipeline.aoi,
+                config.pipeline.spectral_bands,
+            ):
+                page = filter_scenes(config, shard_items(config, page))
+                manifest.add_items(page)
+                items.extend(page)
+                saved_files.append(load_data.submit(config, page, executor, manifest))
+            manifest.add_items([], complete=True)
+            logging.info(f"Fetched {len(items)} items")
+            items = save_metadata(config, items)
+            manifest.mark_stage("save_metadata")
+            saved_files = [future.result() for future in saved_files]
+        else:
+            items = fetch_data(config)
+            items = filter_scenes(config, items)
+            manifest.add_items(items, complete=True)
+            items = save_metadata(config, items)
+            manifest.mark_stage("save_metadata")
+            saved_files = [load_data(config, items, executor, manifest)]
+    if getattr(getattr(config, "cog", None), "enabled", False):
+        # Record the new size and checksum of the files rewritten in place
+        manifest.verify_files(transcode_data(config, items))
+    manifest.mark_stage("load_data")
+    return items, saved_files
+
+
+def process_items(config: Config, items, saved_files: list, manifest: RunManifest):
+    # Compute indices, then build the datacubes and composites of loaded items
+    if getattr(config.processing, "indices", None):
+        saved_files = saved_files + [compute_indices(config, items)]
+    if getattr(getattr(config, "grid", None), "crs", None):
+        aligned_files = align_data(config, items)
+        cubes = process_data(
+            config, items, [aligned_files], storage_path=config.grid.output_path
+        )
+    else:
+        cubes = process_data(config, items, saved_files)
+    manifest.mark_processed([item.id for item in items])
+    manifest.mark_stage("process_data")
+    if getattr(getattr(config, "composite", None), "enabled", False):
+        build_composites(config, items)
+    return saved_files, cubes
 
 
 @flow(name="Earth Observation Pipeline")
 def eo_pipeline(config: Config):
     logging.info("Starting the EO pipeline...")
+    configure_metrics(config)
     validate_inputs(config)
-    items = fetch_data(config)
-    items = save_metadata(config, items)
+    if is_sharded(config):
+        # This worker only writes to the partition of its shard
+        config = shard_config(config)
+    start = time.perf_counter()
+
+    if getattr(getattr(config, "plan", None), "dry_run", False):
+        # Scenes are not filtered, as that reads their masks; the plan is an
+        # upper bound when min_valid_fraction is set
+        plan = plan_downloads(config, fetch_data(config))
+        export_metrics(config)
+        return plan
+
+    manifest, resumed = start_manifest(config)
+    items, saved_files = download_items(config, manifest, resumed)
+    saved_files, cubes = process_items(config, items, saved_files, manifest)
+    logging.info(f"Assets by state: {manifest.states()}")
+    metrics.observe("pipeline.run", time.perf_counter() - start)
+    export_metrics(config)
 
-    # Run load_data concurrently for each item
-    saved_files = load_data.map(config=config, item=items)
+    logging.info(f"Pipeline finished, saved files: {saved_files}, datacubes: {cubes}")
+    return saved_files
+
+
+@flow(name="Earth Observation Download")
+def eo_download_pipeline(config: Config):
+    logging.info("Starting the EO download...")
+    configure_metrics(config)
+    validate_inputs(config)
+    if is_sharded(config):
+        # This worker only writes to the partition of its shard
+        config = shard_config(config)
+    start = time.perf_counter()
 
-    logging.info(f"Pipeline finished, saved files: {saved_files}")
+    manifest, resumed = start_manifest(config)
+    items, saved_files = download_items(config, manifest, resumed)
+    logging.info(f"Assets by state: {manifest.states()}")
+    metrics.observe("pipeline.run", time.perf_counter() - start)
+    export_metrics(config)
+
+    logging.info(f"Download finished, saved files: {saved_files}")
     return saved_files
 
 
+@flow(name="Earth Observation Processing")
+def eo_process_pipeline(config: Config):
+    logging.info("Starting the EO processing...")
+    configure_metrics(config)
+    validate_inputs(config)
+    if is_sharded(config):
+        # This worker only writes to the partition of its shard
+        config = shard_config(config)
+    start = time.perf_counter()
+
+    # Processes the files of an earlier download with the same search parameters
+    manifest = open_manifest(config)
+    items = None
+    if manifest.key() == RunManifest.make_key(config):
+        items = manifest.items()
+    if items is None or not manifest.stage_done("load_data"):
+        raise RuntimeError(
+            "No completed download with the same parameters in "
+            f"{manifest.path}, run the download first"
+        )
+    saved_files, cubes = process_items(
+        config, items, [manifest.saved_files()], manifest
+    )
+    logging.info(f"Assets by state: {manifest.states()}")
+    metrics.observe("pipeline.run", time.perf_counter() - start)
+    export_metrics(config)
+
+    logging.info(f"Processing finished, datacubes: {cubes}")
+    return cubes
+
+
+@flow(name="Earth Observation Batch Pipeline")
+def eo_batch_pipeline(config: Config):
+    logging.info("Starting the EO batch pipeline...")
+    configure_metrics(config)
+    validate_inputs(config)
+    start = time.perf_counter()
+    dry_run = getattr(getattr(config, "plan", None), "dry_run", False)
+
+    batch = config.batch
+    aois = load_aois(
+        batch.aois,
+        getattr(batch, "aoi_file", None),
+        name_property=getattr(batch, "name_property", "name"),
+    )
+    searches = merge_aois(
+        aois,
+        merge_distance=getattr(batch, "merge_distance", 0.1),
+        max_search_size=getattr(batch, "max_search_size", 1.0),
+    )
+    logging.info(f"Searching {len(aois)} AOIs with {len(searches)} searches")
+    metrics.incr("batch.aois", len(aois))
+    metrics.incr("batch.searches", len(searches))
+
+    # Items found by several searches are loaded once, if some AOI still needs them
+    items, assigned = search_aois(
+        lambda bbox: fetch_data(config, aoi=bbox),
+        aois,
+        searches,
+        select=(
+            None
+            if dry_run
+            else lambda aoi_items, bbox: filter_scenes(config, aoi_items, aoi=bbox)
+        ),
+    )
+    logging.info(f"{len(items)} unique items cover the AOIs")
+    # In "clip" load mode, each asset is clipped once, to all AOIs it covers
+    bounds = item_bounds(assigned, aois)
+    if dry_run:
+        plan = plan_downloads(config, items, aoi=bounds)
+        export_metrics(config)
+        return plan
+
+    manifest, _ = start_manifest(config)
+    manifest.add_items(items, complete=True)
+    items = save_metadata(config, items)
+    manifest.mark_stage("save_metadata")
+
+    with AssetExecutor(config) as executor:
+        saved_files = [load_data(config, items, executor, manifest, aoi=bounds)]
+    if getattr(getattr(config, "cog", None), "enabled", False):
+        manifest.verify_files(transcode_data(config, items))
+    if getattr(config.processing, "indices", None):
+        saved_files.append(compute_indices(config, items))
+
+    outputs = {aoi.name: fan_out_aoi(config, aoi, assigned[aoi.name]) for aoi in aois}
+    manifest.mark_processed([item.id for item in items])
+    manifest.mark_stage("process_data")
+    metrics.observe("pipeline.run", time.perf_counter() - start)
+    export_metrics(config)
+
+    logging.info(f"Batch finished: {len(items)} items loaded once for {len(aois)} AOIs")
+    return outputs
+
+
 # Function to run the flow locally
 def run_pipeline(config: Config):
+    if batch_enabled(config):
+        return eo_batch_pipeline(config)
     return eo_pipeline(config)
@@ -0,0 +1,400 @@
+# eo_data_pipeline/pipeline/manifest.py
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Optional
+
+from omegaconf import DictConfig, ListConfig, OmegaConf
+from pystac import Item
+
+# States of an asset, in order of progress
+PENDING = "pending"
+DOWNLOADED = "downloaded"
+VERIFIED = "verified"
+PROCESSED = "processed"
+STATES = (PENDING, DOWNLOADED, VERIFIED, PROCESSED)
+
+
+def _to_container(value):
+    # OmegaConf lists and mappings, e.g. batch AOIs, as plain JSON values
+    if isinstance(value, (DictConfig, ListConfig)):
+        return OmegaConf.to_container(value)
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def file_checksum(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Compute the SHA-256 digest of a file.
+
+    Args:
+        path (str): Path of the file.
+        chunk_size (int): Number of bytes read at a time.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RunManifest:
+    """
+    A persistent record of the progress of a pipeline run, stored in SQLite.
+
+    The manifest records the search result of the run, the stages that completed,
+    and the state of every (item, band) asset: "pending" once planned,
+    "downloaded" once saved, "verified" once its size (and optionally checksum) is
+    recorded, and "processed" once it was added to a datacube. A run resumed with
+    the same search parameters reuses the stored search result, skips completed
+    stages and skips assets whose files still match the recorded size and
+    checksum, so that an interrupted run continues where it stopped.
+
+    Attributes:
+        path (str): Path of the SQLite database file.
+        verify (str): "size" to verify files by size only, "checksum" to also
+            compare SHA-256 digests.
+        logger (logging.Logger): Logger for this class.
+    """
+
+    def __init__(self, path: str, verify: str = "size"):
+        """
+        Initialize the RunManifest, creating its database if needed.
+
+        Args:
+            path (str): Path of the SQLite database file.
+            verify (str): "size" or "checksum".
+
+        Raises:
+            ValueError: If the verification mode is unknown.
+        """
+        if verify not in ("size", "checksum"):
+            raise ValueError(
+                f"Invalid verification mode: {verify}. Choose from: size, checksum"
+            )
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.verify = verify
+        self.logger = logging.getLogger(__name__)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS run ("
+                "id INTEGER PRIMARY KEY CHECK (id = 1), key TEXT, started_at REAL, "
+                "search_complete INTEGER DEFAULT 0)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "item_id TEXT PRIMARY KEY, position INTEGER, item TEXT)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS stages (name TEXT PRIMARY KEY, done_at REAL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS assets ("
+                "item_id TEXT, band TEXT, path TEXT, state TEXT, size INTEGER, "
+                "checksum TEXT, updated_at REAL, PRIMARY KEY (item_id, band))"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def make_key(config) -> str:
+        """
+        Build the key identifying the work of a run from its configuration.
+
+        Args:
+            config (Config): Pipeline configuration.
+
+        Returns:
+            str: Hex digest of the search parameters and bands of the run.
+        """
+        pipeline = config.pipeline
+        batch = getattr(config, "batch", None)
+        shard = getattr(config, "shard", None)
+        identity = json.dumps(
+            [
+                config.earth_search.url,
+                [pipeline.time_steps.start, pipeline.time_steps.end],
+                [float(v) for v in pipeline.aoi],
+                list(pipeline.spectral_bands),
+                getattr(pipeline, "max_cloud_cover", 20),
+                getattr(pipeline, "min_valid_fraction", None),
+                getattr(batch, "aois", None) or [],
+                getattr(batch, "aoi_file", None),
+            ]
+            # Shards of a run select different items; unsharded keys are unchanged
+            + ([shard.count, shard.index] if getattr(shard, "count", 1) > 1 else []),
+            sort_keys=True,
+            default=_to_container,
+        )
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def key(self) -> Optional[str]:
+        """
+        Return the key of the recorded run.
+
+        Returns:
+            str: Key of the run, or None if no run was recorded.
+        """
+        with self._connect() as db:
+            row = db.execute("SELECT key FROM run WHERE id = 1").fetchone()
+        return None if row is None else row[0]
+
+    def start(self, key: str, resume: bool = False) -> bool:
+        """
+        Start a run, continuing the recorded one if requested and possible.
+
+        Args:
+            key (str): Key of the run, see make_key.
+            resume (bool): Whether to continue the recorded run.
+
+        Returns:
+            bool: True if the recorded run is continued, False if the manifest was
+            reset for a new run.
+        """
+        with self._connect() as db:
+            row = db.execute("SELECT key FROM run WHERE id = 1").fetchone()
+            if resume and row is not None and row[0] == key:
+                self.logger.info(f"Resuming run recorded in {self.path}")
+                return True
+            if resume:
+                self.logger.warning(
+                    "No run with the same parameters to resume, starting a new run"
+                )
+            for table in ("run", "items", "stages", "assets"):
+                db.execute(f"DELETE FROM {table}")
+            db.execute(
+                "INSERT INTO run (id, key, started_at) VALUES (1, ?, ?)",
+                (key, time.time()),
+            )
+        return False
+
+    def add_items(self, items: list, complete: bool = False):
+        """
+        Record items found by the search of the run.
+
+        Args:
+            items (list): STAC items, e.g. one page of search results.
+            complete (bool): Whether the search has finished.
+        """
+        with self._connect() as db:
+            (position,) = db.execute("SELECT COUNT(*) FROM items").fetchone()
+            db.executemany(
+                "INSERT OR IGNORE INTO items (item_id, position, item) VALUES (?, ?, ?)",
+                [
+                    (item.id, position + i, json.dumps(item.to_dict()))
+                    for i, item in enumerate(items)
+                ],
+            )
+            if complete:
+                db.execute("UPDATE run SET search_complete = 1 WHERE id = 1")
+
+    def items(self) -> Optional[list]:
+        """
+        Return the items of the run if its search has finished.
+
+        Returns:
+            list: STAC items in search order, or None if the search did not finish.
+        """
+        with self._connect() as db:
+            row = db.execute("SELECT search_complete FROM run WHERE id = 1").fetchone()
+            if row is None or not row[0]:
+                return None
+            rows = db.execute("SELECT item FROM items ORDER BY position").fetchall()
+        return [Item.from_dict(json.loads(item)) for (item,) in rows]
+
+    def stage_done(self, name: str) -> bool:
+        """
+        Check whether a stage of the run has completed.
+
+        Args:
+            name (str): Name of the stage, e.g. "save_metadata".
+
+        Returns:
+            bool: True if the stage was marked as completed.
+        """
+        with self._connect() as db:
+            row = db.execute("SELECT 1 FROM stages WHERE name = ?", (name,)).fetchone()
+        return row is not None
+
+    def mark_stage(self, name: str):
+        """
+        Mark a stage of the run as completed.
+
+        Args:
+            name (str): Name of the stage.
+        """
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO stages (name, done_at) VALUES (?, ?)",
+                (name, time.time()),
+            )
+
+    def completed(self, downloads: list) -> tuple:
+        """
+        Split planned assets into those still to load and those already loaded.
+
+        An asset counts as loaded if it was verified or processed and its file
+        still has the recorded size, and checksum in "checksum" mode.
+
+        Args:
+            downloads (list): (item_id, band, asset, file_path) tuples as returned
+                by DataLoader.plan_downloads.
+
+        Returns:
+            tuple: (downloads still to load, file paths of loaded assets).
+        """
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT item_id, band, path, size, checksum FROM assets "
+                "WHERE state IN (?, ?)",
+                (VERIFIED, PROCESSED),
+            ).fetchall()
+        recorded = {(row[0], row[1]): row[2:] for row in rows}
+
+        remaining, done = [], []
+        for download in downloads:
+            item_id, band, _, file_path = download
+            record = recorded.get((item_id, band))
+            if record is not None and self._matches(file_path, *record):
+                done.append(file_path)
+            else:
+                remaining.append(download)
+        with self._connect() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO assets "
+                "(item_id, band, path, state, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (item_id, band, file_path, PENDING, time.time())
+                    for item_id, band, _, file_path in remaining
+                ],
+            )
+        if done:
+            self.logger.info(f"Skipping {len(done)} assets completed by an earlier run")
+        return remaining, done
+
+    def _matches(self, file_path, path, size, checksum):
+        if path != file_path or not os.path.exists(file_path):
+            return False
+        if os.path.getsize(file_path) != size:
+            return False
+        return self.verify != "checksum" or file_checksum(file_path) == checksum
+
+    def record(self, downloads: list, results: list):
+        """
+        Record the outcome of loading assets, verifying the saved files.
+
+        Saved files are marked "downloaded", then "verified" with their size and,
+        in "checksum" mode, their SHA-256 digest. Failed assets stay "pending".
+
+        Args:
+            downloads (list): (item_id, band, asset, file_path) tuples.
+            results (list): DownloadResult of each asset, in the same order.
+        """
+        saved = [
+            (item_id, band, file_path)
+            for (item_id, band, _, file_path), result in zip(downloads, results)
+            if result.ok
+        ]
+        with self._connect() as db:
+            db.executemany(
+                "UPDATE assets SET state = ?, path = ?, updated_at = ? "
+                "WHERE item_id = ? AND band = ?",
+                [
+                    (DOWNLOADED, file_path, time.time(), item_id, band)
+                    for item_id, band, file_path in saved
+                ],
+            )
+        self.verify_files([file_path for _, _, file_path in saved])
+
+    def verify_files(self, paths: list):
+        """
+        Record the size and checksum of saved files and mark them "verified".
+
+        Also used after files were rewritten in place, e.g. transcoded to COG.
+
+        Args:
+            paths (list): Paths of the saved files.
+        """
+        rows = []
+        for file_path in paths:
+            checksum = file_checksum(file_path) if self.verify == "checksum" else None
+            rows.append(
+                (VERIFIED, os.path.getsize(file_path), checksum, time.time(), file_path)
+            )
+        with self._connect() as db:
+            db.executemany(
+                "UPDATE assets SET state = ?, size = ?, checksum = ?, updated_at = ? "
+                "WHERE path = ?",
+                rows,
+            )
+
+    def mark_processed(self, item_ids: list):
+        """
+        Mark the verified assets of items as added to a datacube.
+
+        Args:
+            item_ids (list): Ids of the processed items.
+        """
+        with self._connect() as db:
+            db.executemany(
+                "UPDATE assets SET state = ?, updated_at = ? "
+                "WHERE item_id = ? AND state = ?",
+                [(PROCESSED, time.time(), item_id, VERIFIED) for item_id in item_ids],
+            )
+
+    def saved_files(self) -> list:
+        """
+        Return the paths of the assets of the run that were loaded.
+
+        Returns:
+            list: Paths of the verified and processed asset files.
+        """
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT path FROM assets WHERE state IN (?, ?) ORDER BY item_id, band",
+                (VERIFIED, PROCESSED),
+            ).fetchall()
+        return [path for (path,) in rows]
+
+    def states(self) -> dict:
+        """
+        Count the assets of the run by state.
+
+        Returns:
+            dict: Number of assets in each state.
+        """
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT state, COUNT(*) FROM assets GROUP BY state"
+            ).fetchall()
+        counts = dict.fromkeys(STATES, 0)
+        counts.update(dict(rows))
+        return counts
+
+
+def open_manifest(config) -> RunManifest:
+    """
+    Open the manifest of a run.
+
+    The manifest lives next to the catalog unless ``run.manifest_path`` is set.
+
+    Args:
+        config (Config): Pipeline configuration.
+
+    Returns:
+        RunManifest: The manifest.
+    """
+    run = getattr(config, "run", None)
+    path = getattr(run, "manifest_path", None) or os.path.join(
+        config.storage.catalog_path, "run_manifest.sqlite"
+    )
+    return RunManifest(path, verify=getattr(run, "verify", "size"))
@@ -0,0 +1,184 @@
+# eo_data_pipeline/pipeline/sharding.py
+
+import copy
+import hashlib
+import logging
+import os
+
+from pystac import Catalog
+
+from eo_data_pipeline.config.config_schema import Config
+from eo_data_pipeline.data_loader.loader import DataLoader
+from eo_data_pipeline.pipeline.manifest import RunManifest, open_manifest
+
+logger = logging.getLogger(__name__)
+
+
+def shard_of(item_id: str, count: int) -> int:
+    """
+    Return the shard an item belongs to.
+
+    The shard only depends on the item id, so every worker assigns every item
+    to the same shard, whichever other items its search returns.
+
+    Args:
+        item_id (str): Id of the STAC item.
+        count (int): Number of shards.
+
+    Returns:
+        int: Shard index in ``[0, count)``.
+    """
+    digest = hashlib.sha256(item_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def is_sharded(config: Config) -> bool:
+    """Return whether the run is split into more than one shard."""
+    return getattr(getattr(config, "shard", None), "count", 1) > 1
+
+
+def shard_items(config: Config, items: list) -> list:
+    """
+    Select the items of the shard of this worker.
+
+    Args:
+        config (Config): Pipeline configuration.
+        items (list): STAC items, e.g. a page of search results.
+
+    Returns:
+        list: Items of shard ``shard.index``; all items if the run is not sharded.
+    """
+    if not is_sharded(config):
+        return items
+    count, index = config.shard.count, config.shard.index
+    return [item for item in items if shard_of(item.id, count) == index]
+
+
+def _shard_dir(path, index):
+    return os.path.join(path, f"shard-{index:03d}") if path else path
+
+
+def _shard_file(path, index):
+    if not path:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.shard-{index:03d}{extension}"
+
+
+def shard_config(config: Config, index: int = None) -> Config:
+    """
+    Return the configuration of a shard, writing to its own partition.
+
+    The storage, catalog, asset cache, search cache, datacube, grid and composite
+    directories of the shard are ``shard-<index>`` directories inside the
+    configured ones, and the manifest and metrics files get a ``.shard-<index>``
+    suffix, so workers sharing a file system never write to the same file, nor
+    share an SQLite database, whose locking is unreliable on network file
+    systems. The GeoParquet table is only written by merge_shards.
+
+    Args:
+        config (Config): Pipeline configuration of the whole run.
+        index (int, optional): Shard index, defaults to ``shard.index``.
+
+    Returns:
+        Config: A copy of the configuration with partitioned paths.
+
+    Raises:
+        ValueError: If no shard index is given or configured.
+    """
+    index = config.shard.index if index is None else index
+    if index is None:
+        raise ValueError("shard.index must be set when shard.count is above 1")
+    config = copy.deepcopy(config)
+    config.shard.index = index
+    config.storage.path = _shard_dir(config.storage.path, index)
+    config.storage.catalog_path = _shard_dir(config.storage.catalog_path, index)
+    config.storage.cache_path = _shard_dir(config.storage.cache_path, index)
+    config.storage.geoparquet_path = None
+    config.earth_search.cache_path = _shard_dir(config.earth_search.cache_path, index)
+    for section in ("processing", "grid", "composite"):
+        section = getattr(config, section, None)
+        if getattr(section, "output_path", None):
+            section.output_path = _shard_dir(section.output_path, index)
+    run = getattr(config, "run", None)
+    if getattr(run, "manifest_path", None):
+        run.manifest_path = _shard_file(run.manifest_path, index)
+    metrics_config = getattr(config, "metrics", None)
+    for name in ("output_path", "prometheus_path"):
+        if getattr(metrics_config, name, None):
+            setattr(
+                metrics_config, name, _shard_file(getattr(metrics_config, name), index)
+            )
+    return config
+
+
+def merge_shards(config: Config, allow_partial: bool = False) -> dict:
+    """
+    Combine the catalog fragments of all shards into the catalog of the run.
+
+    The items of every shard catalog are saved with DataLoader.save_metadata
+    into ``storage.catalog_path``, in the configured catalog mode, and the
+    files of their assets, which stay in the storage partitions of the shards,
+    are added to its catalog index. A shard counts as complete once its
+    manifest records the load_data stage for the same search parameters.
+
+    Args:
+        config (Config): Pipeline configuration of the whole run.
+        allow_partial (bool): Merge the complete shards even if others are not.
+
+    Returns:
+        dict: Number of merged items and assets, and the incomplete shards.
+
+    Raises:
+        RuntimeError: If a shard is incomplete and allow_partial is False.
+    """
+    count = config.shard.count
+    items, assets, incomplete = {}, [], []
+    for index in range(count):
+        fragment = shard_config(config, index)
+        manifest = open_manifest(fragment)
+        catalog_file = os.path.join(fragment.storage.catalog_path, "catalog.json")
+        if (
+            not os.path.exists(catalog_file)
+            or manifest.key() != RunManifest.make_key(fragment)
+            or not manifest.stage_done("load_data")
+        ):
+            incomplete.append(index)
+            continue
+        for item in Catalog.from_file(catalog_file).get_items():
+            item = item.full_copy()
+            items.setdefault(item.id, item)
+            for band in config.pipeline.spectral_bands:
+                path = os.path.join(fragment.storage.path, f"{item.id}_{band}.tif")
+                if os.path.exists(path):
+                    assets.append((item.id, band, path))
+
+    if incomplete and not allow_partial:
+        raise RuntimeError(
+            f"Shards {incomplete} of {count} have not completed their download"
+        )
+    if incomplete:
+        logger.warning(f"Merging without the incomplete shards {incomplete}")
+
+    loader = DataLoader(config)
+    # Items of the fragments keep links to their own catalogs
+    merged = list(items.values())
+    for item in merged:
+        item.set_root(None)
+        item.set_parent(None)
+        item.set_self_href(None)
+    try:
+        written = loader.save_metadata(merged)
+        if loader.index is not None:
+            loader.index.add_assets(assets)
+    finally:
+        loader.close()
+    logger.info(
+        f"Merged {len(merged)} items ({written} written) and {len(assets)} assets "
+        f"of {count - len(incomplete)} shards into {config.storage.catalog_path}"
+    )
+    return {
+        "items": len(merged),
+        "assets": len(assets),
+        "incomplete_shards": incomplete,
+    }
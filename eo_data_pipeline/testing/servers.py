@@ -0,0 +1,632 @@
+# eo_data_pipeline/testing/servers.py
+
+import copy
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STAC_CONFORMANCE = [
+    "https://api.stacspec.org/v1.0.0/core",
+    "https://api.stacspec.org/v1.0.0/item-search",
+    "https://api.stacspec.org/v1.0.0/item-search#fields",
+    "https://api.stacspec.org/v1.0.0/item-search#query",
+    "https://api.stacspec.org/v1.0.0/item-search#sort",
+]
+
+
+class _StandInRequestHandler(BaseHTTPRequestHandler):
+    """
+    Base request handler of the stand-in servers, keeping connections alive and
+    recording every connection on the owning server.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.stand_in.record_connection()
+
+    def log_message(self, format, *args):
+        # Keep test output quiet
+        pass
+
+    def _send_status(self, status, headers=None):
+        # Answer without a body, keeping the connection open like S3 does
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send_json(self, document, status=200):
+        body = json.dumps(document).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _AssetRequestHandler(_StandInRequestHandler):
+    """
+    Request handler serving files from the server root with HEAD, ETag and
+    single byte-range support, similar to what S3 offers for Earth Search assets.
+    """
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        stand_in = self.server.stand_in
+        stand_in.record_request(self.command, self.path, self.headers.get("Range"))
+        throttle = stand_in.admit()
+        if throttle is not None:
+            if stand_in.latency:
+                time.sleep(stand_in.latency)
+            self._send_status(*throttle)
+            return
+        try:
+            if stand_in.latency:
+                time.sleep(stand_in.latency)
+            self._serve_file(send_body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up, e.g. after a timeout
+        finally:
+            stand_in.finish()
+
+    def _serve_file(self, send_body):
+        stand_in = self.server.stand_in
+
+        file_path = os.path.join(stand_in.root, self.path.lstrip("/").split("?")[0])
+        if not os.path.isfile(file_path):
+            self._send_status(404)
+            return
+
+        stat = os.stat(file_path)
+        size = stat.st_size
+        etag = f'"{size:x}-{stat.st_mtime_ns:x}"'
+
+        start, end = 0, size - 1
+        status = 200
+        range_header = self.headers.get("Range")
+        if range_header:
+            match = re.match(r"bytes=(\d*)-(\d*)$", range_header.strip())
+            if match and match.group(1):
+                start = int(match.group(1))
+                if match.group(2):
+                    end = min(int(match.group(2)), size - 1)
+            elif match and match.group(2):
+                start = max(size - int(match.group(2)), 0)
+            if start >= size:
+                self._send_status(416, {"Content-Range": f"bytes */{size}"})
+                return
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if send_body:
+            with open(file_path, "rb") as f:
+                f.seek(start)
+                self.wfile.write(f.read(end - start + 1))
+
+
+class _StacRequestHandler(_StandInRequestHandler):
+    """
+    Request handler implementing the parts of the STAC API used by DataFetcher:
+    the landing page and a paginated item search with the query and fields
+    extensions.
+    """
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path.rstrip("/") == "/search":
+            params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+            if "bbox" in params:
+                params["bbox"] = [float(v) for v in params["bbox"].split(",")]
+            for key in ("collections", "ids"):
+                if key in params:
+                    params[key] = params[key].split(",")
+            self._search(params)
+        elif parsed.path.rstrip("/") == "":
+            self._landing_page()
+        else:
+            self._send_status(404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        params = json.loads(self.rfile.read(length) or b"{}")
+        if urlparse(self.path).path.rstrip("/") == "/search":
+            self._search(params)
+        else:
+            self._send_status(404)
+
+    def _landing_page(self):
+        stand_in = self.server.stand_in
+        stand_in.record_request(self.command, self.path, None)
+        self._send_json(
+            {
+                "type": "Catalog",
+                "id": "stand-in",
+                "description": "Local stand-in for Earth Search",
+                "stac_version": "1.0.0",
+                "conformsTo": STAC_CONFORMANCE,
+                "links": [
+                    {"rel": "self", "href": f"{stand_in.url}/"},
+                    {"rel": "root", "href": f"{stand_in.url}/"},
+                    {
+                        "rel": "search",
+                        "type": "application/geo+json",
+                        "href": f"{stand_in.url}/search",
+                        "method": "POST",
+                    },
+                ],
+            }
+        )
+
+    def _search(self, params):
+        stand_in = self.server.stand_in
+        stand_in.record_request(self.command, self.path, params)
+        if stand_in.latency:
+            time.sleep(stand_in.latency)
+
+        matches = [item for item in stand_in.items if _matches(item, params)]
+        limit = int(params.get("limit") or 10)
+        offset = int(params.get("token") or 0)
+        page = matches[offset : offset + limit]
+        features = [_apply_fields(item, params.get("fields")) for item in page]
+
+        links = [{"rel": "root", "href": f"{stand_in.url}/"}]
+        if offset + limit < len(matches):
+            body = {k: v for k, v in params.items() if k != "token"}
+            body["token"] = str(offset + limit)
+            links.append(
+                {
+                    "rel": "next",
+                    "href": f"{stand_in.url}/search",
+                    "method": "POST",
+                    "body": body,
+                    "merge": False,
+                }
+            )
+        self._send_json(
+            {
+                "type": "FeatureCollection",
+                "features": features,
+                "links": links,
+                "numberMatched": len(matches),
+                "numberReturned": len(features),
+            }
+        )
+
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _matches(item, params):
+    """Check whether an item dictionary matches the search parameters."""
+    collections = params.get("collections")
+    if collections and item.get("collection") not in collections:
+        return False
+    if params.get("ids") and item["id"] not in params["ids"]:
+        return False
+
+    bbox = params.get("bbox")
+    if bbox:
+        ibox = item["bbox"]
+        if (
+            ibox[0] > bbox[2]
+            or ibox[2] < bbox[0]
+            or ibox[1] > bbox[3]
+            or ibox[3] < bbox[1]
+        ):
+            return False
+
+    interval = params.get("datetime")
+    if interval:
+        when = _parse_datetime(item["properties"]["datetime"])
+        start, _, end = interval.partition("/")
+        if not end:
+            start, end = interval, interval
+        if start not in ("", "..") and when < _parse_datetime(start):
+            return False
+        if end not in ("", "..") and when > _parse_datetime(end):
+            return False
+
+    operators = {
+        "lt": lambda a, b: a < b,
+        "lte": lambda a, b: a <= b,
+        "gt": lambda a, b: a > b,
+        "gte": lambda a, b: a >= b,
+        "eq": lambda a, b: a == b,
+        "neq": lambda a, b: a != b,
+    }
+    for name, conditions in (params.get("query") or {}).items():
+        value = item["properties"].get(name)
+        for op, expected in conditions.items():
+            if value is None or not operators[op](value, expected):
+                return False
+    return True
+
+
+def _apply_fields(item, fields):
+    """Apply an item-search fields include/exclude projection."""
+    if not fields:
+        return item
+    include = fields.get("include") or []
+    exclude = fields.get("exclude") or []
+
+    if include:
+        # Fields that are always returned according to the specification
+        default = ["type", "stac_version", "id", "bbox", "geometry", "links"]
+        default.append("properties.datetime")
+        projected = {}
+        for path in default + list(include):
+            source, target = item, projected
+            keys = path.split(".")
+            for key in keys[:-1]:
+                if key not in source:
+                    break
+                source = source[key]
+                target = target.setdefault(key, {})
+            else:
+                if keys[-1] in source:
+                    target[keys[-1]] = copy.deepcopy(source[keys[-1]])
+        item = projected
+    else:
+        item = copy.deepcopy(item)
+
+    for path in exclude:
+        target = item
+        keys = path.split(".")
+        for key in keys[:-1]:
+            target = target.get(key, {})
+        target.pop(keys[-1], None)
+    return item
+
+
+def make_item(
+    item_id,
+    when,
+    bbox,
+    bands,
+    cloud_cover=5.0,
+    asset_url=None,
+    collection="sentinel-2-l2a",
+    extra_properties=None,
+):
+    """
+    Build a synthetic Sentinel-2 L2A STAC item dictionary.
+
+    Args:
+        item_id (str): Item id.
+        when (datetime): Acquisition time.
+        bbox (list): Bounding box [lon_min, lat_min, lon_max, lat_max].
+        bands (list): Asset keys to add.
+        cloud_cover (float): Value of ``eo:cloud_cover``.
+        asset_url (str, optional): Base URL of the asset hrefs. Assets are named
+            ``<item_id>_<band>.tif`` below it.
+        collection (str): Collection id.
+        extra_properties (dict, optional): Additional item properties.
+
+    Returns:
+        dict: STAC item dictionary.
+    """
+    lon_min, lat_min, lon_max, lat_max = bbox
+    base_url = asset_url or "http://example.com"
+    timestamp = when.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    properties = {
+        "datetime": timestamp,
+        "updated": timestamp,
+        "eo:cloud_cover": cloud_cover,
+        "platform": "sentinel-2a",
+    }
+    properties.update(extra_properties or {})
+    return {
+        "type": "Feature",
+        "stac_version": "1.0.0",
+        "id": item_id,
+        "collection": collection,
+        "bbox": list(bbox),
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [
+                [
+                    [lon_min, lat_min],
+                    [lon_max, lat_min],
+                    [lon_max, lat_max],
+                    [lon_min, lat_max],
+                    [lon_min, lat_min],
+                ]
+            ],
+        },
+        "properties": properties,
+        "links": [],
+        "assets": {
+            band: {
+                "href": f"{base_url}/{item_id}_{band}.tif",
+                "type": "image/tiff; application=geotiff; profile=cloud-optimized",
+                "roles": ["data"],
+            }
+            for band in bands
+        },
+    }
+
+
+def make_catalog(
+    count,
+    bbox,
+    start="2023-01-01",
+    bands=("blue", "nir"),
+    step=timedelta(days=1),
+    asset_url=None,
+):
+    """
+    Build ``count`` synthetic items over ``bbox``, one per ``step`` from ``start``.
+
+    Returns:
+        list: STAC item dictionaries.
+    """
+    first = datetime.fromisoformat(start).replace(tzinfo=timezone.utc)
+    return [
+        make_item(
+            f"S2A_stand_in_{i:06d}",
+            first + i * step,
+            bbox,
+            bands,
+            cloud_cover=float(i % 20),
+            asset_url=asset_url,
+        )
+        for i in range(count)
+    ]
+
+
+class _StandInServer:
+    """
+    Base class running a stand-in HTTP server on a background thread.
+    """
+
+    handler_class = _StandInRequestHandler
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record_request(self, method, path, detail):
+        with self._lock:
+            self.requests.append((method, path, detail))
+
+    def record_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.handler_class)
+        self._httpd.daemon_threads = True
+        self._httpd.stand_in = self
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class LocalAssetServer(_StandInServer):
+    """
+    A local HTTP stand-in for the object store behind Earth Search.
+
+    Files below ``root`` are served at ``http://127.0.0.1:<port>/<relative path>``
+    on a background thread. Requests and connections are recorded so tests and
+    benchmarks can assert on range requests and connection reuse.
+
+    Throttling like that of S3 can be injected: requests beyond ``max_concurrent``
+    in flight are answered with 503 (SlowDown), and requests beyond ``max_rate``
+    per second with 429 and a ``Retry-After`` header.
+
+    Attributes:
+        root (str): Directory whose files are served.
+        latency (float): Seconds to sleep before answering each request.
+        max_concurrent (int, optional): Requests served at once before answering
+            503.
+        max_rate (float, optional): Requests served per second before answering
+            429.
+        requests (list): Recorded ``(method, path, range_header)`` tuples.
+        connections (int): Number of TCP connections accepted so far.
+        throttled (int): Number of requests answered with 429 or 503.
+        peak_concurrency (int): Largest number of requests served at once.
+    """
+
+    handler_class = _AssetRequestHandler
+
+    def __init__(
+        self,
+        root: str,
+        latency: float = 0.0,
+        max_concurrent: int = None,
+        max_rate: float = None,
+    ):
+        """
+        Initialize the server without starting it.
+
+        Args:
+            root (str): Directory whose files are served.
+            latency (float): Seconds to sleep before answering each request.
+            max_concurrent (int, optional): Requests served at once before
+                answering 503.
+            max_rate (float, optional): Requests served per second before
+                answering 429; bursts of up to ``max_rate`` requests are allowed.
+        """
+        super().__init__(latency=latency)
+        self.root = root
+        self.max_concurrent = max_concurrent
+        self.max_rate = max_rate
+        self.throttled = 0
+        self.peak_concurrency = 0
+        self._active = 0
+        self._tokens = max_rate
+        self._refilled = time.monotonic()
+
+    def admit(self):
+        """
+        Admit a request, or return the (status, headers) it is throttled with.
+        """
+        with self._lock:
+            if self.max_rate:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.max_rate,
+                    self._tokens + (now - self._refilled) * self.max_rate,
+                )
+                self._refilled = now
+                if self._tokens < 1:
+                    self.throttled += 1
+                    wait = (1 - self._tokens) / self.max_rate
+                    return 429, {"Retry-After": f"{wait:.3f}"}
+                self._tokens -= 1
+            if self.max_concurrent and self._active >= self.max_concurrent:
+                self.throttled += 1
+                return 503, {}
+            self._active += 1
+            self.peak_concurrency = max(self.peak_concurrency, self._active)
+        return None
+
+    def finish(self):
+        """Record the end of an admitted request."""
+        with self._lock:
+            self._active -= 1
+
+    def url_for(self, relative_path: str) -> str:
+        """
+        Return the URL under which a file below ``root`` is served.
+        """
+        return f"{self.url}/{relative_path.lstrip('/')}"
+
+
+class LocalStacAPI(_StandInServer):
+    """
+    A local HTTP stand-in for the Earth Search STAC API.
+
+    Serves a landing page and a paginated ``/search`` endpoint over an in-memory
+    list of item dictionaries, supporting the bbox, datetime, collections, ids,
+    query, limit and fields parameters. Pages are linked with POST ``next`` links
+    carrying a ``token``, like Earth Search does.
+
+    Attributes:
+        items (list): STAC item dictionaries to search.
+        latency (float): Seconds to sleep before answering each search request.
+        requests (list): Recorded ``(method, path, parameters)`` tuples.
+        connections (int): Number of TCP connections accepted so far.
+    """
+
+    handler_class = _StacRequestHandler
+
+    def __init__(self, items: list, latency: float = 0.0):
+        """
+        Initialize the server without starting it.
+
+        Args:
+            items (list): STAC item dictionaries to search.
+            latency (float): Seconds to sleep before answering each search request.
+        """
+        super().__init__(latency=latency)
+        self.items = items
+
+    @property
+    def search_requests(self):
+        """Parameters of all search requests received so far."""
+        with self._lock:
+            return [
+                detail
+                for _, path, detail in self.requests
+                if path.startswith("/search")
+            ]
+
+
+class _ProcessHandle:
+    """URL and request count of a stand-in server running in a child process."""
+
+    def __init__(self, url):
+        self.url = url
+        self.request_count = None
+
+
+def _serve_forever(server_class, args, kwargs, queue, stop):
+    with server_class(*args, **kwargs) as server:
+        queue.put(server.url)
+        stop.wait()
+        queue.put(len(server.requests))
+
+
+@contextmanager
+def serve_in_process(server_class, *args, **kwargs):
+    """
+    Run a stand-in server in a child process.
+
+    Benchmarks use this so that the server does not compete with the code under
+    test for the GIL. The yielded handle exposes the server ``url``; once the
+    context exits, ``request_count`` holds the number of requests served.
+
+    Args:
+        server_class (type): LocalAssetServer or LocalStacAPI.
+        *args: Positional arguments of the server class.
+        **kwargs: Keyword arguments of the server class.
+
+    Yields:
+        _ProcessHandle: Handle of the running server.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    stop = context.Event()
+    process = context.Process(
+        target=_serve_forever,
+        args=(server_class, args, kwargs, queue, stop),
+        daemon=True,
+    )
+    process.start()
+    handle = _ProcessHandle(queue.get(timeout=60))
+    try:
+        yield handle
+    finally:
+        stop.set()
+        handle.request_count = queue.get(timeout=60)
+        process.join()
@@ -1,13 +1,11 @@
 # scripts/run_pipeline.py
+import sys
+
 import hydra
 from hydra.core.config_store import ConfigStore
 from omegaconf import DictConfig, OmegaConf
 
-from eo_data_pipeline.config.config_schema import (Config, EarthSearchConfig,
-                                                   PipelineConfig,
-                                                   StorageConfig,
-                                                   TimeStepsConfig)
-from eo_data_pipeline.pipeline.flow import run_pipeline
+from eo_data_pipeline.config.config_schema import Config, config_from_dict
 
 cs = ConfigStore.instance()
 cs.store(name="hydra_config", node=Config)
@@ -21,15 +19,10 @@ cs.store(name="hydra_config", node=Config)
 def main(config: DictConfig):
     # Convert DictConfig to Config dataclass
     config_dict = OmegaConf.to_container(config, resolve=True)
-    config_instance = Config(
-        earth_search=EarthSearchConfig(**config_dict["earth_search"]),
-        pipeline=PipelineConfig(
-            time_steps=TimeStepsConfig(**config_dict["pipeline"]["time_steps"]),
-            aoi=config_dict["pipeline"]["aoi"],
-            spectral_bands=config_dict["pipeline"]["spectral_bands"],
-        ),
-        storage=StorageConfig(**config_dict["storage"]),
-    )
+    config_instance = config_from_dict(config_dict)
+
+    # The flow, and Prefect with it, is only imported once the config is built
+    from eo_data_pipeline.pipeline.flow import run_pipeline
 
     # Run the pipeline
     result = run_pipeline(config_instance)
@@ -37,4 +30,8 @@ def main(config: DictConfig):
 
 
 if __name__ == "__main__":
+    # "--resume" is shorthand for the run.resume=true override
+    if "--resume" in sys.argv:
+        sys.argv.remove("--resume")
+        sys.argv.append("run.resume=true")
     main()
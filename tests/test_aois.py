@@ -0,0 +1,232 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+import rasterio
+from omegaconf import DictConfig
+from pystac import Item
+from rasterio.transform import from_origin
+from shapely.geometry import box, mapping
+
+from eo_data_pipeline.data_fetcher.aois import (
+    assign_items,
+    load_aois,
+    merge_aois,
+    search_aois,
+    to_feature_collection,
+)
+from eo_data_pipeline.data_loader.fanout import AOIFanOut
+
+TRIANGLE = {
+    "type": "Polygon",
+    "coordinates": [[[14.2, 46.2], [14.3, 46.2], [14.25, 46.3], [14.2, 46.2]]],
+}
+
+
+def make_item(item_id, bbox):
+    return Item(item_id, mapping(box(*bbox)), bbox, datetime(2023, 1, 1), {})
+
+
+def test_load_aois_from_list():
+    aois = load_aois(
+        [
+            [14.0, 46.0, 14.1, 46.1],
+            {"name": "box", "bbox": [15.0, 46.0, 15.1, 46.1]},
+            {"name": "triangle", "geometry": TRIANGLE},
+        ]
+    )
+
+    assert [aoi.name for aoi in aois] == ["aoi_0", "box", "triangle"]
+    assert aois[1].bbox == [15.0, 46.0, 15.1, 46.1]
+    assert aois[2].geometry.geom_type == "Polygon"
+    assert aois[2].bbox == pytest.approx([14.2, 46.2, 14.3, 46.3])
+
+
+def test_load_aois_from_geojson(tmp_path):
+    path = tmp_path / "fields.geojson"
+    path.write_text(
+        json.dumps(
+            {
+                "type": "FeatureCollection",
+                "features": [
+                    {"type": "Feature", "properties": {"id": 7}, "geometry": TRIANGLE},
+                    {
+                        "type": "Feature",
+                        "properties": {"id": 8},
+                        "geometry": mapping(box(14.0, 46.0, 14.1, 46.1)),
+                    },
+                ],
+            }
+        )
+    )
+
+    aois = load_aois(aoi_file=str(path), name_property="id")
+    assert [aoi.name for aoi in aois] == ["7", "8"]
+
+
+def test_load_aois_rejects_invalid():
+    with pytest.raises(ValueError):
+        load_aois([[14.1, 46.0, 14.0, 46.1]])
+    with pytest.raises(ValueError, match="not a polygon"):
+        load_aois([{"geometry": {"type": "Point", "coordinates": [14.0, 46.0]}}])
+    with pytest.raises(ValueError, match="unique"):
+        load_aois(
+            [
+                {"name": "a", "bbox": [14.0, 46.0, 14.1, 46.1]},
+                {"name": "a", "bbox": [15.0, 46.0, 15.1, 46.1]},
+            ]
+        )
+    for name in ("..", "../escape", "a/b", "a\\b", ""):
+        with pytest.raises(ValueError, match="not a valid directory name"):
+            load_aois([{"name": name, "bbox": [14.0, 46.0, 14.1, 46.1]}])
+
+
+def test_merge_aois():
+    aois = load_aois(
+        [
+            [14.0, 46.0, 14.1, 46.1],
+            # Within max_search_size of the first one
+            [14.5, 46.5, 14.6, 46.6],
+            # Far away, but close to the next one
+            [20.0, 40.0, 20.8, 40.8],
+            [20.85, 40.0, 21.6, 40.8],
+            # Far from everything
+            [-70.0, -10.0, -69.9, -9.9],
+        ]
+    )
+
+    searches = merge_aois(aois, merge_distance=0.1, max_search_size=1.0)
+    assert sorted(searches) == [
+        [-70.0, -10.0, -69.9, -9.9],
+        [14.0, 46.0, 14.6, 46.6],
+        [20.0, 40.0, 21.6, 40.8],
+    ]
+    assert len(merge_aois(aois, merge_distance=0, max_search_size=0)) == 5
+
+
+def test_merge_aois_keeps_groups_within_max_search_size():
+    # A row of AOIs 0.25 degrees apart: only groups up to 1 degree wide merge
+    aois = load_aois([[14.0 + 0.3 * i, 46.0, 14.05 + 0.3 * i, 46.1] for i in range(20)])
+
+    searches = merge_aois(aois, merge_distance=0.1, max_search_size=1.0)
+    assert len(searches) == 5
+    for bounds in searches:
+        assert bounds[2] - bounds[0] <= 1.0
+    for aoi in aois:
+        assert any(s[0] <= aoi.bbox[0] and s[2] >= aoi.bbox[2] for s in searches)
+    assert merge_aois([]) == []
+
+
+def test_assign_items():
+    aois = load_aois(
+        [
+            {"name": "a", "bbox": [14.0, 46.0, 14.1, 46.1]},
+            {"name": "tri", "geometry": TRIANGLE},
+        ]
+    )
+    items = [
+        make_item("both", [14.0, 46.0, 14.5, 46.5]),
+        make_item("a_only", [13.9, 45.9, 14.05, 46.05]),
+        # Inside the bounding box of the triangle, but not the triangle
+        make_item("neither", [14.28, 46.28, 14.3, 46.3]),
+    ]
+
+    assigned = assign_items(items, aois)
+    assert [item.id for item in assigned["a"]] == ["both", "a_only"]
+    assert [item.id for item in assigned["tri"]] == ["both"]
+
+
+def test_search_aois_dedupes_and_selects():
+    aois = load_aois(
+        [
+            {"name": "a", "bbox": [14.0, 46.0, 14.1, 46.1]},
+            {"name": "b", "bbox": [15.0, 46.0, 15.1, 46.1]},
+        ]
+    )
+    results = {
+        "west": [
+            make_item("shared", [14.0, 46.0, 15.5, 46.5]),
+            make_item("a1", [14.0, 46.0, 14.2, 46.2]),
+        ],
+        "east": [
+            make_item("shared", [14.0, 46.0, 15.5, 46.5]),
+            make_item("b1", [15.0, 46.0, 15.2, 46.2]),
+        ],
+        "gap": [make_item("none", [14.5, 46.5, 14.6, 46.6])],
+    }
+    searches = ["west", "east", "gap"]
+
+    items, assigned = search_aois(results.get, aois, searches)
+    assert [item.id for item in items] == ["shared", "a1", "b1"]
+    assert [item.id for item in assigned["b"]] == ["shared", "b1"]
+
+    # Items dropped for all of their AOIs are not needed
+    items, assigned = search_aois(
+        results.get,
+        aois,
+        searches,
+        select=lambda aoi_items, bbox: [i for i in aoi_items if i.id != "a1"],
+    )
+    assert [item.id for item in items] == ["shared", "b1"]
+    assert assigned["a"] == assigned["b"][:1]
+
+
+def test_to_feature_collection_round_trip(tmp_path):
+    aois = load_aois([{"name": "tri", "geometry": TRIANGLE}])
+    path = tmp_path / "aois.geojson"
+    path.write_text(json.dumps(to_feature_collection(aois)))
+
+    loaded = load_aois(aoi_file=str(path))
+    assert loaded[0].name == "tri"
+    assert loaded[0].geometry.equals(aois[0].geometry)
+
+
+def test_fan_out(tmp_path):
+    storage = tmp_path / "raw"
+    storage.mkdir()
+    items = [make_item(f"scene_{i}", [14.0, 46.0, 14.5, 46.5]) for i in range(2)]
+    for item in items:
+        with rasterio.open(
+            storage / f"{item.id}_blue.tif",
+            "w",
+            driver="GTiff",
+            dtype="uint16",
+            count=1,
+            width=50,
+            height=50,
+            crs="EPSG:4326",
+            transform=from_origin(14.0, 46.5, 0.01, 0.01),
+        ) as dst:
+            dst.write(np.ones((1, 50, 50), "uint16"))
+    config = DictConfig(
+        {
+            "storage": {"path": str(storage)},
+            "batch": {"output_path": str(tmp_path / "aois")},
+        }
+    )
+    aoi = load_aois([{"name": "tri", "geometry": TRIANGLE}])[0]
+
+    fan_out = AOIFanOut(config)
+    # The nir files were not downloaded and are skipped
+    clipped = fan_out.fan_out(aoi, items, ["blue", "nir"])
+
+    aoi_path = tmp_path / "aois" / "tri"
+    assert sorted(clipped) == [
+        str(aoi_path / "scene_0_blue.tif"),
+        str(aoi_path / "scene_1_blue.tif"),
+    ]
+    with rasterio.open(clipped[0]) as src:
+        data = src.read(1)
+        assert src.width == src.height == 10
+        # Corners of the triangle's bounding box are outside the triangle
+        assert data[0, 0] == data[0, -1] == 0
+        assert data[-1, 5] == 1
+    items_json = json.loads((aoi_path / "items.json").read_text())
+    assert [f["id"] for f in items_json["features"]] == ["scene_0", "scene_1"]
+    assert load_aois(aoi_file=str(aoi_path / "aoi.geojson"))[0].name == "tri"
+
+    # Existing clips are kept when fanning out again
+    mtime = (aoi_path / "scene_0_blue.tif").stat().st_mtime_ns
+    assert fan_out.fan_out(aoi, items, ["blue"]) == clipped
+    assert (aoi_path / "scene_0_blue.tif").stat().st_mtime_ns == mtime
@@ -0,0 +1,138 @@
+import os
+from datetime import datetime
+
+import pytest
+from omegaconf import DictConfig
+from pystac import Asset, Item
+
+from eo_data_pipeline.data_loader.cache import AssetCache
+from eo_data_pipeline.data_loader.downloader import DownloadError
+from eo_data_pipeline.data_loader.loader import DataLoader
+from eo_data_pipeline.testing.servers import LocalAssetServer
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AssetCache(str(tmp_path / "cache"))
+
+
+def test_make_key_depends_on_version_metadata():
+    href = "http://example.com/B01.tif"
+    assert AssetCache.make_key(href) == AssetCache.make_key(href)
+    assert AssetCache.make_key(href, checksum="1220aa") != AssetCache.make_key(
+        href, checksum="1220bb"
+    )
+    assert AssetCache.make_key(href, size=10) != AssetCache.make_key(href, size=11)
+    assert AssetCache.make_key(href, etag='"a"') != AssetCache.make_key(href)
+
+
+def test_materialise_hit_and_miss(cache, tmp_path):
+    source = tmp_path / "downloaded.tif"
+    source.write_bytes(b"data" * 100)
+    target = tmp_path / "out" / "item_B01.tif"
+    target.parent.mkdir()
+
+    assert not cache.materialise("key", str(target))
+    cache.add("key", str(source))
+
+    assert cache.materialise("key", str(target))
+    assert target.read_bytes() == b"data" * 100
+    assert "key" in cache
+    assert len(cache) == 1
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    cache = AssetCache(str(tmp_path / "cache"), max_bytes=250)
+    for key in ["a", "b"]:
+        path = tmp_path / key
+        path.write_bytes(b"x" * 100)
+        cache.add(key, str(path))
+
+    # Touch "a" so that "b" becomes the least recently used object
+    assert cache.materialise("a", str(tmp_path / "a_copy"))
+    path = tmp_path / "c"
+    path.write_bytes(b"x" * 100)
+    cache.add("c", str(path))
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.size() == 200
+
+
+def test_load_data_uses_cache_on_rerun(tmp_path):
+    remote = tmp_path / "remote"
+    remote.mkdir()
+    (remote / "B01.tif").write_bytes(os.urandom(4096))
+    (remote / "B02.tif").write_bytes(os.urandom(4096))
+
+    config = DictConfig(
+        {
+            "storage": {
+                "path": str(tmp_path / "raw"),
+                "catalog_path": str(tmp_path / "catalog"),
+                "cache_path": str(tmp_path / "cache"),
+            }
+        }
+    )
+
+    with LocalAssetServer(str(remote)) as server:
+        item = Item(
+            id="item", geometry={}, bbox=[], datetime=datetime.now(), properties={}
+        )
+        item.add_asset(
+            "B01",
+            Asset(href=server.url_for("B01.tif"), extra_fields={"file:size": 4096}),
+        )
+        item.add_asset("B02", Asset(href=server.url_for("B02.tif")))
+
+        loader = DataLoader(config)
+        loader.load_data([item], ["B01", "B02"])
+        assert (loader.cache_hits, loader.cache_misses) == (0, 2)
+
+        # Second run with a fresh storage path, as for a rerun in a new directory
+        config.storage.path = str(tmp_path / "raw2")
+        loader = DataLoader(config)
+        saved_files = loader.load_data([item], ["B01", "B02"])
+
+        assert (loader.cache_hits, loader.cache_misses) == (2, 0)
+        assert [r.status for r in loader.download_results] == ["cached", "cached"]
+        assert open(saved_files[0], "rb").read() == (remote / "B01.tif").read_bytes()
+        gets = [r for r in server.requests if r[0] == "GET"]
+        assert len(gets) == 2
+
+
+def test_load_data_skips_cache_without_version(tmp_path, monkeypatch):
+    remote = tmp_path / "remote"
+    remote.mkdir()
+    (remote / "B01.tif").write_bytes(os.urandom(4096))
+
+    config = DictConfig(
+        {
+            "storage": {
+                "path": str(tmp_path / "raw"),
+                "catalog_path": str(tmp_path / "catalog"),
+                "cache_path": str(tmp_path / "cache"),
+            }
+        }
+    )
+
+    with LocalAssetServer(str(remote)) as server:
+        item = Item(
+            id="item", geometry={}, bbox=[], datetime=datetime.now(), properties={}
+        )
+        item.add_asset("B01", Asset(href=server.url_for("B01.tif")))
+
+        for storage_path in ("raw", "raw2"):
+            config.storage.path = str(tmp_path / storage_path)
+            loader = DataLoader(config)
+
+            def head(url):
+                raise DownloadError(f"Failed to fetch headers of {url}")
+
+            # Neither file fields nor an ETag identify the version of the asset
+            monkeypatch.setattr(loader.downloader, "head", head)
+            loader.load_data([item], ["B01"])
+            assert [r.status for r in loader.download_results] == ["downloaded"]
+
+        assert loader.cache.size() == 0
@@ -0,0 +1,231 @@
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+from eo_data_pipeline.cli import load_config, main
+from eo_data_pipeline.pipeline.engine import LocalTask
+from eo_data_pipeline.testing.servers import (
+    LocalAssetServer,
+    LocalStacAPI,
+    make_catalog,
+)
+
+BBOX = [14.0, 46.0, 14.5, 46.5]
+
+# Runs the CLI in a fresh interpreter and fails if it imported Prefect
+NO_PREFECT = (
+    "import sys; from eo_data_pipeline.cli import main; code = main(sys.argv[1:]); "
+    "assert 'prefect' not in sys.modules; sys.exit(code)"
+)
+
+
+def overrides(tmp_path, url):
+    return [
+        f"earth_search.url={url}",
+        f"pipeline.aoi={BBOX}",
+        "pipeline.spectral_bands=[blue,nir]",
+        "pipeline.time_steps.start=2023-01-01",
+        "pipeline.time_steps.end=2023-01-31",
+        f"storage.path={tmp_path / 'raw'}",
+        f"storage.catalog_path={tmp_path / 'catalog'}",
+        f"storage.cache_path={tmp_path / 'cache'}",
+        f"processing.output_path={tmp_path / 'cube'}",
+    ]
+
+
+@pytest.fixture
+def stac(tmp_path):
+    remote = tmp_path / "remote"
+    remote.mkdir()
+    with LocalAssetServer(str(remote)) as assets:
+        items = make_catalog(3, BBOX, asset_url=assets.url)
+        for item in items:
+            for band in ("blue", "nir"):
+                with rasterio.open(
+                    remote / f"{item['id']}_{band}.tif",
+                    "w",
+                    driver="GTiff",
+                    dtype="uint16",
+                    count=1,
+                    width=32,
+                    height=32,
+                    crs="EPSG:32633",
+                    transform=from_origin(400000, 5100000, 10, 10),
+                ) as dst:
+                    dst.write(np.ones((1, 32, 32), "uint16"))
+        with LocalStacAPI(items) as api:
+            yield api
+
+
+def test_load_config_overrides(tmp_path):
+    config_file = tmp_path / "job.yaml"
+    config_file.write_text("execution:\n  backend: process\n")
+
+    config = load_config(
+        str(config_file), ["pipeline.aoi=[14.0,46.0,14.5,46.5]", "run.resume=true"]
+    )
+    assert config.execution.backend == "process"
+    assert config.pipeline.aoi == BBOX
+    assert config.run.resume is True
+    # Defaults of the packaged configuration
+    assert config.earth_search.url == "https://earth-search.aws.element84.com/v1"
+
+
+def test_validate(capsys):
+    assert main(["validate"]) == 0
+    assert main(["validate", "pipeline.aoi=[14.5,46.0,14.0,46.5]"]) == 2
+    assert "Invalid configuration" in capsys.readouterr().err
+    assert main(["validate", "pipeline.unknown=1"]) == 2
+
+
+def test_validate_imports_no_heavy_modules():
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys; from eo_data_pipeline.cli import main; main(['validate']); "
+            "print([m for m in ('prefect', 'rasterio', 'pystac_client', 'hydra') "
+            "if m in sys.modules])",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert output.splitlines()[-1] == "[]"
+
+
+def test_dry_run(stac, tmp_path, capsys):
+    assert main(["dry-run", "--items", *overrides(tmp_path, stac.url)]) == 0
+
+    report = json.loads(capsys.readouterr().out)
+    assert report["items"] == 3
+    assert report["assets"] == {"blue": 3, "nir": 3}
+    assert len(report["item_ids"]) == 3
+    # Sizes from HEAD requests to the stand-in asset server
+    assert report["plan"]["assets"] == 6
+    assert report["plan"]["unknown_sizes"] == 0
+    assert report["plan"]["download_bytes"] > 0
+    assert not (tmp_path / "raw").exists()
+
+
+def test_download_then_process_without_prefect(stac, tmp_path):
+    def run(*args):
+        return subprocess.run(
+            [sys.executable, "-c", NO_PREFECT, "--no-prefect", *args],
+            capture_output=True,
+            text=True,
+        )
+
+    args = overrides(tmp_path, stac.url)
+    process = run("process", *args)
+    assert process.returncode == 1
+    assert "run the download first" in process.stderr
+
+    download = run("download", *args)
+    assert download.returncode == 0, download.stderr
+    assert len(list((tmp_path / "raw").glob("*.tif"))) == 6
+    assert not (tmp_path / "cube").exists()
+
+    process = run("process", *args)
+    assert process.returncode == 0, process.stderr
+    assert len(list((tmp_path / "cube").glob("*.nc"))) == 1
+
+
+def test_run_with_prefect(stac, tmp_path, monkeypatch, capsys):
+    from prefect.testing.utilities import prefect_test_harness
+
+    from eo_data_pipeline.pipeline.engine import ENGINE_VARIABLE
+
+    # The flows run as Prefect flows, against a temporary Prefect database
+    monkeypatch.delenv(ENGINE_VARIABLE, raising=False)
+    with prefect_test_harness():
+        assert main(["run", *overrides(tmp_path, stac.url)]) == 0
+
+    assert "Pipeline execution completed" in capsys.readouterr().out
+    assert len(list((tmp_path / "raw").glob("*.tif"))) == 6
+    assert len(list((tmp_path / "cube").glob("*.nc"))) == 1
+
+
+def test_run_masks_clouds_in_composites(tmp_path, capsys):
+    # The packaged composite settings mask clouds once the SCL band is loaded
+    assert main(["validate", "composite.enabled=true"]) == 2
+    assert "mask band scl is not in" in capsys.readouterr().err
+
+    remote = tmp_path / "remote"
+    remote.mkdir()
+    with LocalAssetServer(str(remote)) as assets:
+        items = make_catalog(
+            3, BBOX, bands=("blue", "nir", "scl"), asset_url=assets.url
+        )
+        for item, value in zip(items, (9000, 100, 200)):
+            scl = np.full((32, 32), 4, "uint8")
+            if value == 9000:
+                scl[:16] = 9  # Cloud over the top half of the first scene
+            for band, data in (
+                ("blue", np.full((32, 32), value, "uint16")),
+                ("nir", np.full((32, 32), value, "uint16")),
+                ("scl", scl),
+            ):
+                with rasterio.open(
+                    remote / f"{item['id']}_{band}.tif",
+                    "w",
+                    driver="GTiff",
+                    dtype=data.dtype,
+                    count=1,
+                    width=32,
+                    height=32,
+                    crs="EPSG:32633",
+                    transform=from_origin(400000, 5100000, 10, 10),
+                ) as dst:
+                    dst.write(data, 1)
+        with LocalStacAPI(items) as api:
+            run = subprocess.run(
+                [
+                    sys.executable,
+                    "-c",
+                    NO_PREFECT,
+                    "--no-prefect",
+                    "run",
+                    *overrides(tmp_path, api.url),
+                    "pipeline.spectral_bands=[blue,nir,scl]",
+                    "composite.enabled=true",
+                    f"composite.output_path={tmp_path / 'composites'}",
+                ],
+                capture_output=True,
+                text=True,
+            )
+    assert run.returncode == 0, run.stderr
+
+    (path,) = (tmp_path / "composites").glob("*.tif")
+    with rasterio.open(path) as src:
+        assert src.descriptions == ("blue", "nir")
+        blue = src.read(1)
+    # Median of the clear scenes only under the cloud
+    assert (blue[:16] == 150).all()
+    assert (blue[16:] == 200).all()
+
+
+def test_local_task_retries_and_submit():
+    calls = []
+
+    def flaky(value):
+        calls.append(value)
+        if len(calls) < 3:
+            raise OSError("transient")
+        return value * 2
+
+    task = LocalTask(flaky, retries=2)
+    assert task(4) == 8
+    assert len(calls) == 3
+
+    calls.clear()
+    with pytest.raises(OSError):
+        LocalTask(flaky, retries=1)(4)
+
+    calls.clear()
+    assert LocalTask(flaky, retries=2).submit(5).result() == 10
@@ -0,0 +1,123 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+import rasterio
+from omegaconf import DictConfig
+from pystac import Asset, Item
+from rasterio.transform import from_origin
+from rasterio.warp import transform_bounds
+from shapely.geometry import Polygon
+
+from eo_data_pipeline.data_loader.clipper import clip_to_aoi, clip_to_geometry
+from eo_data_pipeline.data_loader.loader import DataLoader
+from eo_data_pipeline.testing.servers import LocalAssetServer
+
+CRS = "EPSG:32633"
+ORIGIN = (400000.0, 5100000.0)
+
+
+@pytest.fixture
+def cog_path(tmp_path):
+    remote = tmp_path / "remote"
+    remote.mkdir()
+    path = remote / "scene_B02.tif"
+    data = np.random.default_rng(0).integers(0, 10000, (1, 1024, 1024), "uint16")
+    profile = {
+        "driver": "GTiff",
+        "dtype": "uint16",
+        "count": 1,
+        "width": 1024,
+        "height": 1024,
+        "crs": CRS,
+        "transform": from_origin(*ORIGIN, 10, 10),
+        "tiled": True,
+        "blockxsize": 256,
+        "blockysize": 256,
+    }
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(data)
+    return path
+
+
+def aoi_for(col_off, row_off, size):
+    """AOI in EPSG:4326 for a square pixel window of the fixture scene."""
+    left = ORIGIN[0] + col_off * 10
+    top = ORIGIN[1] - row_off * 10
+    bounds = (left, top - size * 10, left + size * 10, top)
+    return list(transform_bounds(CRS, "EPSG:4326", *bounds))
+
+
+def test_clip_to_aoi_local_file(cog_path, tmp_path):
+    out = tmp_path / "clip.tif"
+    clip_to_aoi(str(cog_path), aoi_for(300, 400, 100), str(out))
+
+    with rasterio.open(out) as clipped, rasterio.open(cog_path) as src:
+        assert clipped.crs == src.crs
+        # Reprojecting the AOI box grows it slightly, but not by much
+        assert 100 <= clipped.width < 110
+        assert 100 <= clipped.height < 110
+        # Index of the pixel centre at the clip's upper-left corner
+        row, col = src.index(clipped.transform.c + 5, clipped.transform.f - 5)
+        window = rasterio.windows.Window(col, row, clipped.width, clipped.height)
+        np.testing.assert_array_equal(clipped.read(), src.read(window=window))
+
+
+def test_clip_to_aoi_over_http_uses_range_requests(cog_path, tmp_path):
+    out = tmp_path / "clip.tif"
+    with LocalAssetServer(str(cog_path.parent)) as server:
+        clip_to_aoi(server.url_for(cog_path.name), aoi_for(10, 10, 50), str(out))
+
+    gets = [r for r in server.requests if r[0] == "GET"]
+    assert gets and all(r[2] is not None for r in gets)
+    fetched = 0
+    for _, _, range_header in gets:
+        start, end = range_header.split("=")[1].split("-")
+        fetched += int(end) - int(start) + 1
+    assert fetched < cog_path.stat().st_size / 4
+
+
+def test_load_data_clip_mode(cog_path, tmp_path):
+    config = DictConfig(
+        {
+            "storage": {
+                "path": str(tmp_path / "raw"),
+                "catalog_path": str(tmp_path / "catalog"),
+                "load_mode": "clip",
+            }
+        }
+    )
+    loader = DataLoader(config)
+    item = Item(
+        id="scene", geometry={}, bbox=[], datetime=datetime.now(), properties={}
+    )
+    item.add_asset("blue", Asset(href=str(cog_path)))
+    item.add_asset("nir", Asset(href=str(cog_path)))
+
+    saved_files = loader.load_data([item], ["blue"], aoi=aoi_for(0, 0, 20))
+    outside = loader.load_data([item], ["nir"], aoi=[0.0, 0.0, 0.1, 0.1])
+
+    assert len(saved_files) == 1
+    with rasterio.open(saved_files[0]) as clipped:
+        assert clipped.width < 30
+    assert outside == []
+    assert loader.download_results[0].status == "failed"
+
+
+def test_clip_to_geometry_masks_outside_polygon(cog_path, tmp_path):
+    left, bottom, right, top = aoi_for(100, 100, 200)
+    # Triangle over the lower-left half of the window
+    triangle = Polygon([(left, bottom), (right, bottom), (left, top)])
+    out = tmp_path / "triangle.tif"
+    clip_to_geometry(str(cog_path), triangle, str(out))
+
+    with rasterio.open(out) as clipped, rasterio.open(cog_path) as src:
+        data = clipped.read(1)
+        assert clipped.nodata == 0
+        assert 200 <= clipped.width < 210
+        # Upper-right corner is outside the triangle, lower-left corner inside
+        assert data[0, -1] == 0
+        row, col = src.index(*clipped.xy(data.shape[0] - 20, 20))
+        assert data[-20, 20] == src.read(1)[row, col]
+        assert 0.4 < (data != 0).mean() < 0.6
+    assert not (tmp_path / "triangle.tif.part").exists()
@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+import rasterio
+from omegaconf import DictConfig
+from pystac import Item
+from rasterio.transform import from_origin
+
+from eo_data_pipeline.data_loader.cog import COGTranscoder, is_cog
+
+
+def write_band(
+    path, driver="GTiff", size=1024, dtype="uint16", values=(1, 5000), **options
+):
+    rng = np.random.default_rng(0)
+    data = rng.choice(np.array(values, dtype), (size, size))
+    with rasterio.open(
+        path,
+        "w",
+        driver=driver,
+        dtype=dtype,
+        count=1,
+        width=size,
+        height=size,
+        crs="EPSG:32633",
+        transform=from_origin(400000, 5100000, 10, 10),
+        **options,
+    ) as dst:
+        dst.write(data, 1)
+    return data
+
+
+def make_config(tmp_path, **cog):
+    return DictConfig(
+        {
+            "storage": {"path": str(tmp_path)},
+            "pipeline": {"scl_band": "scl"},
+            "cog": {"max_workers": 2, "block_size": 256, **cog},
+        }
+    )
+
+
+@pytest.fixture
+def item(tmp_path):
+    return Item("scene", None, None, datetime(2023, 1, 1), {})
+
+
+@pytest.mark.parametrize("codec", ["DEFLATE", "ZSTD", "LERC"])
+def test_transcode_to_cog(tmp_path, item, codec):
+    # Striped GeoTIFF and JPEG2000 saved under the .tif name, as for *-jp2 bands
+    blue = write_band(tmp_path / "scene_blue.tif")
+    jp2 = write_band(
+        tmp_path / "scene_blue-jp2.tif",
+        driver="JP2OpenJPEG",
+        QUALITY=100,
+        REVERSIBLE="YES",
+    )
+    scl = write_band(tmp_path / "scene_scl.tif", dtype="uint8", values=(4, 9))
+
+    transcoder = COGTranscoder(make_config(tmp_path, codec=codec))
+    paths = transcoder.transcode([item], ["blue", "blue-jp2", "scl", "nir"])
+
+    assert len(paths) == 3
+    for path, data in zip(paths, [blue, jp2, scl]):
+        assert is_cog(path, codec)
+        with rasterio.open(path) as src:
+            assert src.driver == "GTiff"
+            assert src.block_shapes == [(256, 256)]
+            assert src.overviews(1)[:2] == [2, 4]
+            # Lossless for all codecs by default
+            np.testing.assert_array_equal(src.read(1), data)
+
+    # Nearest overviews of the class band only contain existing classes
+    with rasterio.open(tmp_path / "scene_scl.tif", overview_level=1) as src:
+        assert set(np.unique(src.read(1))) == {4, 9}
+
+    # Files already transcoded are skipped
+    assert transcoder.transcode([item], ["blue", "blue-jp2", "scl"]) == []
+
+
+def test_invalid_codec(tmp_path):
+    with pytest.raises(ValueError, match="Invalid COG codec"):
+        COGTranscoder(make_config(tmp_path, codec="JPEG"))
@@ -0,0 +1,136 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+import rasterio
+from omegaconf import DictConfig
+from pystac import Item
+from rasterio.transform import from_origin
+
+from eo_data_pipeline.data_processor.composite import Compositor, time_bin
+
+# SCL classes
+CLEAR, CLOUD = 4, 9
+
+
+def write_band(path, data, resolution=10):
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        dtype=data.dtype,
+        count=1,
+        width=data.shape[1],
+        height=data.shape[0],
+        crs="EPSG:32633",
+        transform=from_origin(400000, 5100000, resolution, resolution),
+        nodata=0,
+    ) as dst:
+        dst.write(data, 1)
+
+
+def make_scene(tmp_path, item_id, day, red, nir, cloudy_rows=0):
+    """Scene of 64 x 64 pixels; the top ``cloudy_rows`` 20 m rows are cloudy."""
+    write_band(tmp_path / f"{item_id}_red.tif", np.full((64, 64), red, "uint16"))
+    write_band(tmp_path / f"{item_id}_nir.tif", np.full((64, 64), nir, "uint16"))
+    scl = np.full((32, 32), CLEAR, "uint8")
+    scl[:cloudy_rows] = CLOUD
+    write_band(tmp_path / f"{item_id}_scl.tif", scl, resolution=20)
+    return Item(item_id, None, None, datetime(2023, 1, day), {})
+
+
+@pytest.fixture
+def items(tmp_path):
+    return [
+        make_scene(tmp_path, "a", 1, 1000, 2000),
+        make_scene(tmp_path, "b", 11, 2000, 8000, cloudy_rows=16),
+        make_scene(tmp_path, "c", 21, 3000, 4000),
+        # No files loaded
+        Item("d", None, None, datetime(2023, 2, 1), {}),
+    ]
+
+
+def make_config(tmp_path, method, spectral_bands=("red", "nir", "scl"), **composite):
+    return DictConfig(
+        {
+            "storage": {"path": str(tmp_path)},
+            "pipeline": {
+                "spectral_bands": list(spectral_bands),
+                "valid_scl_classes": [CLEAR],
+            },
+            "composite": {
+                "method": method,
+                "output_path": str(tmp_path / "composites"),
+                "block_size": 16,
+                "max_workers": 2,
+                **composite,
+            },
+        }
+    )
+
+
+def read(path):
+    with rasterio.open(path) as src:
+        assert src.descriptions == ("red", "nir")
+        return src.read()
+
+
+def test_time_bin():
+    when = datetime(2023, 1, 11)
+    assert time_bin(when, "week") == "2023-W02"
+    assert time_bin(when, "month") == "2023-01"
+    assert time_bin(when, "year") == "2023"
+
+
+@pytest.mark.parametrize(
+    "method, clear, cloudy",
+    [
+        # Pixels under the cloud of scene b only see scenes a and c
+        ("median", (2000, 4000), (2000, 3000)),
+        ("mean", (2000, 14000 / 3), (2000, 3000)),
+        # Highest NDVI: b (0.6) where clear, otherwise a (0.33) over c (0.14)
+        ("best", (2000, 8000), (1000, 2000)),
+    ],
+)
+def test_composite_methods(tmp_path, items, method, clear, cloudy):
+    paths = Compositor(make_config(tmp_path, method)).build(
+        items, ["red", "nir", "scl"]
+    )
+
+    assert len(paths) == 1
+    assert paths[0].endswith(
+        f"2023-01_32633_10m_400000_5100000_64x64_uint16_{method}.tif"
+    )
+    red, nir = read(paths[0])
+    np.testing.assert_allclose((red[-1, 0], nir[-1, 0]), clear, rtol=1e-6)
+    np.testing.assert_allclose((red[0, 0], nir[0, 0]), cloudy, rtol=1e-6)
+
+
+def test_composite_all_cloudy_is_nodata(tmp_path):
+    items = [make_scene(tmp_path, "a", 1, 1000, 2000, cloudy_rows=32)]
+    (path,) = Compositor(make_config(tmp_path, "median")).build(items, ["red", "nir"])
+    assert np.isnan(read(path)).all()
+
+
+def test_invalid_method(tmp_path):
+    with pytest.raises(ValueError, match="Invalid composite method"):
+        Compositor(make_config(tmp_path, "mode"))
+
+
+def test_composite_without_mask_band(tmp_path, items):
+    config = make_config(tmp_path, "mean", ("red", "nir"), mask_band=None)
+    (path,) = Compositor(config).build(items, ["red", "nir"])
+    red, nir = read(path)
+    # The cloudy pixels of scene b are kept
+    np.testing.assert_allclose((red[0, 0], nir[0, 0]), (2000, 14000 / 3), rtol=1e-6)
+
+
+def test_bands_must_be_loaded(tmp_path):
+    with pytest.raises(ValueError, match="mask band scl is not in"):
+        Compositor(make_config(tmp_path, "median", ("red", "nir")))
+    with pytest.raises(ValueError, match=r"score reads bands \['red'\]"):
+        Compositor(make_config(tmp_path, "best", ("nir", "scl")))
+    # The score may read an index computed before the composites
+    config = make_config(tmp_path, "best", ("nir", "scl"), score="ndvi_index")
+    config.processing = {"indices": {"ndvi_index": None}}
+    Compositor(config)
@@ -2,8 +2,14 @@ from unittest.mock import MagicMock
 
 import pytest
 from omegaconf import DictConfig
+from pystac_client.exceptions import APIError
 
-from eo_data_pipeline.data_fetcher.fetcher import DataFetcher
+from eo_data_pipeline.data_fetcher.fetcher import (
+    DataFetcher,
+    split_aoi,
+    split_time_range,
+)
+from eo_data_pipeline.testing.servers import LocalStacAPI, make_catalog
 
 
 @pytest.fixture
@@ -106,3 +112,148 @@ def test_fetch_data_partial_match(mocker, fetcher):
 
     # Check the results
     assert len(items) == 0
+
+
+@pytest.fixture
+def stac_api():
+    items = make_catalog(7, [14.0, 46.0, 14.5, 46.5])
+    del items[3]["assets"]["nir"]  # Missing one band
+    with LocalStacAPI(items) as api:
+        yield api
+
+
+def test_iter_pages_streams_lazily(stac_api):
+    fetcher = DataFetcher(
+        DictConfig({"earth_search": {"url": stac_api.url, "page_size": 2}})
+    )
+
+    pages = fetcher.iter_pages(
+        ("2023-01-01", "2023-01-31"), [14.0, 46.0, 15.0, 47.0], ["blue", "nir"]
+    )
+    first_page = next(pages)
+
+    # Only the first page has been requested so far
+    assert len(stac_api.search_requests) == 1
+    assert [item.id for item in first_page] == [
+        "S2A_stand_in_000000",
+        "S2A_stand_in_000001",
+    ]
+
+    remaining = list(pages)
+    assert [len(page) for page in remaining] == [1, 2, 1]
+    assert len(stac_api.search_requests) == 4
+    assert all(request["limit"] == 2 for request in stac_api.search_requests)
+
+
+def test_iter_items_with_fields_projection(stac_api):
+    fields = {"include": ["assets.blue", "assets.nir", "properties.eo:cloud_cover"]}
+    fetcher = DataFetcher(
+        DictConfig(
+            {"earth_search": {"url": stac_api.url, "page_size": 3, "fields": fields}}
+        )
+    )
+
+    items = list(
+        fetcher.iter_items(
+            ("2023-01-01", "2023-01-31"), [14.0, 46.0, 15.0, 47.0], ["blue", "nir"]
+        )
+    )
+
+    assert len(items) == 6
+    assert stac_api.search_requests[0]["fields"] == fields
+    assert set(items[0].properties) == {"datetime", "eo:cloud_cover"}
+    assert set(items[0].assets) == {"blue", "nir"}
+
+
+def test_fetch_data_with_fields_projection(stac_api):
+    fields = {"include": ["assets.blue", "assets.nir", "properties.eo:cloud_cover"]}
+    fetcher = DataFetcher(
+        DictConfig({"earth_search": {"url": stac_api.url, "fields": fields}})
+    )
+
+    items = fetcher.fetch_data(
+        ("2023-01-01", "2023-01-31"), [14.0, 46.0, 15.0, 47.0], ["blue", "nir"]
+    )
+
+    # The single, unpartitioned search sends the same projection as iter_pages
+    assert len(items) == 6
+    assert len(stac_api.search_requests) == 1
+    assert stac_api.search_requests[0]["fields"] == fields
+    assert set(items[0].properties) == {"datetime", "eo:cloud_cover"}
+
+
+def test_split_aoi():
+    tiles = split_aoi([0.0, 0.0, 2.5, 1.0], 1.0)
+    assert tiles == [
+        [0.0, 0.0, 1.0, 1.0],
+        [1.0, 0.0, 2.0, 1.0],
+        [2.0, 0.0, 2.5, 1.0],
+    ]
+
+
+def test_split_time_range():
+    assert split_time_range(("2023-01-01", "2023-01-25"), 10) == [
+        ("2023-01-01", "2023-01-10"),
+        ("2023-01-11", "2023-01-20"),
+        ("2023-01-21", "2023-01-25"),
+    ]
+
+
+def test_fetch_data_partitioned_deduplicates():
+    # One item per day, crossing the border between the two 1 degree tiles
+    items = make_catalog(20, [0.5, 0.0, 1.5, 1.0])
+    items += make_catalog(20, [0.1, 0.1, 0.2, 0.2], start="2023-01-01T12:00:00")
+    for i, item in enumerate(items[20:]):
+        item["id"] = f"west_{i}"
+
+    with LocalStacAPI(items) as api:
+        config = DictConfig(
+            {
+                "earth_search": {
+                    "url": api.url,
+                    "partition_tile_size": 1.0,
+                    "partition_days": 7,
+                    "max_concurrent_searches": 4,
+                }
+            }
+        )
+        fetched = DataFetcher(config).fetch_data(
+            ("2023-01-01", "2023-01-14"), [0.0, 0.0, 2.0, 1.0], ["blue", "nir"]
+        )
+
+        # 2 tiles x 2 windows
+        assert len(api.search_requests) == 4
+
+    ids = [item.id for item in fetched]
+    assert len(ids) == len(set(ids)) == 28
+    assert sum(item_id.startswith("west_") for item_id in ids) == 14
+
+
+def test_fetch_data_partitioned_retries(mocker, fetcher):
+    fetcher.partition_days = 10
+    mocker.patch("pystac_client.Client.open", autospec=True)
+    mocker.patch("eo_data_pipeline.data_fetcher.fetcher.time.sleep")
+    mock_search = MagicMock()
+    fake_item = MagicMock()
+    fake_item.id = "item"
+    fake_item.assets = {"B01": MagicMock()}
+    mock_search.items.return_value = [fake_item]
+    search = mocker.patch.object(
+        fetcher, "_search", side_effect=[APIError("throttled"), mock_search]
+    )
+
+    items = fetcher.fetch_data(("2023-01-01", "2023-01-05"), [0, 0, 1, 1], ["B01"])
+
+    assert items == [fake_item]
+    assert search.call_count == 2
+
+
+def test_fetch_data_partitioned_gives_up(mocker, fetcher):
+    fetcher.partition_days = 10
+    fetcher.search_retries = 1
+    mocker.patch("pystac_client.Client.open", autospec=True)
+    mocker.patch("eo_data_pipeline.data_fetcher.fetcher.time.sleep")
+    mocker.patch.object(fetcher, "_search", side_effect=APIError("down"))
+
+    with pytest.raises(APIError):
+        fetcher.fetch_data(("2023-01-01", "2023-01-05"), [0, 0, 1, 1], ["B01"])
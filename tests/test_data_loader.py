@@ -5,7 +5,7 @@ from unittest.mock import Mock, patch
 
 import pytest
 from omegaconf import DictConfig
-from pystac import Asset, Item
+from pystac import Asset, Catalog, Item
 
 from eo_data_pipeline.data_loader.loader import DataLoader
 
@@ -86,3 +86,59 @@ def test_load_data_no_assets(data_loader):
 
     # Assertions
     assert len(saved_files) == 0
+
+
+def make_items(count, updated="2023-01-01T00:00:00Z"):
+    return [
+        Item(
+            id=f"item_{i}",
+            geometry={},
+            bbox=[],
+            datetime=datetime(2023, 1, 1 + i),
+            properties={"updated": updated},
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def catalog_loader(tmp_path):
+    return DataLoader(
+        DictConfig(
+            {
+                "storage": {
+                    "path": str(tmp_path / "raw"),
+                    "catalog_path": str(tmp_path / "catalog"),
+                }
+            }
+        )
+    )
+
+
+def test_save_metadata_upsert(catalog_loader):
+    assert catalog_loader.save_metadata(make_items(2)) == 2
+
+    # Known, unchanged items are not rewritten
+    assert catalog_loader.save_metadata(make_items(2)) == 0
+
+    items = make_items(3)
+    items[0].properties["updated"] = "2023-06-01T00:00:00Z"
+    assert catalog_loader.save_metadata(items) == 2
+
+    catalog = Catalog.from_file(
+        os.path.join(catalog_loader.catalog_path, "catalog.json")
+    )
+    saved = {item.id: item for item in catalog.get_items()}
+    assert sorted(saved) == ["item_0", "item_1", "item_2"]
+    assert saved["item_0"].properties["updated"] == "2023-06-01T00:00:00Z"
+
+
+def test_save_metadata_overwrite(catalog_loader):
+    catalog_loader.catalog_mode = "overwrite"
+    catalog_loader.save_metadata(make_items(3))
+    catalog_loader.save_metadata(make_items(1))
+
+    catalog = Catalog.from_file(
+        os.path.join(catalog_loader.catalog_path, "catalog.json")
+    )
+    assert [item.id for item in catalog.get_items()] == ["item_0"]
@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+import rasterio
+import xarray as xr
+from omegaconf import DictConfig
+from pystac import Item
+from rasterio.transform import from_origin
+
+from eo_data_pipeline.data_processor.datacube import DatacubeBuilder
+
+
+def make_item(index):
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    return Item(
+        id=f"S2A_33TVM_2023010{index}",
+        geometry={},
+        bbox=[],
+        datetime=start + timedelta(days=5 * index),
+        properties={},
+    )
+
+
+def write_band(path, value, size=64, resolution=10):
+    profile = {
+        "driver": "GTiff",
+        "dtype": "uint16",
+        "count": 1,
+        "width": size,
+        "height": size,
+        "crs": "EPSG:32633",
+        "transform": from_origin(400000, 5100000, resolution, resolution),
+        "nodata": 0,
+    }
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(np.full((1, size, size), value, dtype="uint16"))
+
+
+@pytest.fixture
+def config(tmp_path):
+    storage = tmp_path / "raw"
+    storage.mkdir()
+    return DictConfig(
+        {
+            "storage": {"path": str(storage)},
+            "processing": {
+                "output_path": str(tmp_path / "cube"),
+                "format": "netcdf",
+                "chunks": {"time": 4, "y": 32, "x": 32},
+                "compression_level": 4,
+            },
+        }
+    )
+
+
+def write_scenes(config, items):
+    for i, item in enumerate(items):
+        write_band(f"{config.storage.path}/{item.id}_blue.tif", 100 + i)
+        write_band(f"{config.storage.path}/{item.id}_nir.tif", 200 + i)
+        write_band(f"{config.storage.path}/{item.id}_scl.tif", 4, 32, 20)
+
+
+def test_build_netcdf_groups_by_grid(config):
+    items = [make_item(i) for i in range(3)]
+    write_scenes(config, items)
+
+    cubes = DatacubeBuilder(config).build(items[::-1], ["blue", "nir", "scl"])
+
+    assert len(cubes) == 2
+    cube_10m = [path for path in cubes if "_10m_" in path][0]
+    with xr.open_dataset(cube_10m) as ds:
+        assert ds["data"].dims == ("time", "band", "y", "x")
+        assert list(ds["band"].values) == ["blue", "nir"]
+        assert list(ds["item_id"].values) == [item.id for item in items]
+        assert ds["time"].to_index().is_monotonic_increasing
+        assert int(ds["data"].sel(band="nir").isel(time=2, x=0, y=0)) == 202
+        assert ds["data"].encoding["chunksizes"] == (4, 1, 32, 32)
+        assert ds["data"].encoding["zlib"]
+        assert float(ds["x"][0]) == 400005.0
+
+
+def test_build_netcdf_appends_new_dates(config):
+    items = [make_item(i) for i in range(3)]
+    write_scenes(config, items)
+    builder = DatacubeBuilder(config)
+    builder.build(items[:2], ["blue", "nir"])
+
+    # Re-adding known items is a no-op, new items are appended along time
+    cubes = builder.build(items, ["blue", "nir"])
+
+    with xr.open_dataset(cubes[0]) as ds:
+        assert ds.sizes["time"] == 3
+        assert list(ds["item_id"].values) == [item.id for item in items]
+        assert int(ds["data"].sel(band="blue").isel(time=2, x=5, y=5)) == 102
+
+
+def test_build_restricted_to_saved_files(config):
+    items = [make_item(i) for i in range(2)]
+    write_scenes(config, items)
+    saved_files = [f"{config.storage.path}/{items[0].id}_blue.tif"]
+
+    cubes = DatacubeBuilder(config).build(items, ["blue", "nir"], saved_files)
+
+    with xr.open_dataset(cubes[0]) as ds:
+        assert ds.sizes["time"] == 1
+        assert list(ds["band"].values) == ["blue"]
+
+
+def test_build_zarr_appends(config):
+    pytest.importorskip("zarr")
+    config.processing.format = "zarr"
+    items = [make_item(i) for i in range(3)]
+    write_scenes(config, items)
+    builder = DatacubeBuilder(config)
+
+    builder.build(items[:1], ["blue", "nir"])
+    cubes = builder.build(items, ["blue", "nir"])
+
+    with xr.open_zarr(cubes[0]) as ds:
+        assert ds.sizes["time"] == 3
+        assert int(ds["data"].sel(band="nir").isel(time=1, x=0, y=0)) == 201
+
+
+def test_invalid_format(config):
+    config.processing.format = "hdf4"
+    with pytest.raises(ValueError, match="Invalid datacube format"):
+        DatacubeBuilder(config)
+
+
+def test_build_netcdf_appends_across_time_chunks(config):
+    items = [make_item(i) for i in range(7)]
+    write_scenes(config, items)
+    builder = DatacubeBuilder(config)
+    builder.build(items[:3], ["blue", "nir"])
+
+    # Time chunks hold 4 scenes: the append fills the first chunk, then the next
+    cubes = builder.build(items, ["blue", "nir"])
+
+    with xr.open_dataset(cubes[0]) as ds:
+        assert list(ds["item_id"].values) == [item.id for item in items]
+        blue = ds["data"].sel(band="blue").isel(x=7, y=40).values
+        assert list(blue) == [100 + i for i in range(7)]
+
+
+def test_build_zarr_appends_time_chunks_at_once(config, monkeypatch):
+    pytest.importorskip("zarr")
+    config.processing.format = "zarr"
+    items = [make_item(i) for i in range(7)]
+    write_scenes(config, items)
+    builder = DatacubeBuilder(config)
+    builder.build(items[:3], ["blue", "nir"])
+
+    writes = []
+    to_zarr = xr.Dataset.to_zarr
+
+    def counting_to_zarr(dataset, *args, **kwargs):
+        writes.append(dataset.sizes["time"])
+        return to_zarr(dataset, *args, **kwargs)
+
+    monkeypatch.setattr(xr.Dataset, "to_zarr", counting_to_zarr)
+    # Time chunks hold 4 scenes: one append fills the first chunk, one the next
+    cubes = builder.build(items, ["blue", "nir"])
+
+    assert writes == [1, 3]
+    with xr.open_zarr(cubes[0]) as ds:
+        assert list(ds["item_id"].values) == [item.id for item in items]
+        blue = ds["data"].sel(band="blue").isel(x=7, y=40).values
+        assert list(blue) == [100 + i for i in range(7)]
@@ -0,0 +1,92 @@
+import os
+from datetime import datetime
+
+import pytest
+from omegaconf import DictConfig
+from pystac import Asset, Item
+
+from eo_data_pipeline.data_loader.downloader import AssetDownloader, DownloadError
+from eo_data_pipeline.data_loader.loader import DataLoader
+from eo_data_pipeline.testing.servers import LocalAssetServer
+
+
+@pytest.fixture
+def asset_server(tmp_path):
+    root = tmp_path / "remote"
+    root.mkdir()
+    for i in range(6):
+        (root / f"B{i:02d}.tif").write_bytes(os.urandom(256 * 1024 + i))
+    with LocalAssetServer(str(root)) as server:
+        yield server
+
+
+def test_download_streams_to_file(asset_server, tmp_path):
+    downloader = AssetDownloader()
+    file_path = str(tmp_path / "B00.tif")
+
+    transferred = downloader.download(asset_server.url_for("B00.tif"), file_path)
+
+    expected = open(os.path.join(asset_server.root, "B00.tif"), "rb").read()
+    assert open(file_path, "rb").read() == expected
+    assert transferred == len(expected)
+    assert not os.path.exists(file_path + ".part")
+
+
+def test_download_resumes_partial_file(asset_server, tmp_path):
+    downloader = AssetDownloader()
+    file_path = str(tmp_path / "B01.tif")
+    expected = open(os.path.join(asset_server.root, "B01.tif"), "rb").read()
+
+    # Simulate an interrupted earlier attempt
+    with open(file_path + ".part", "wb") as f:
+        f.write(expected[:1000])
+
+    transferred = downloader.download(asset_server.url_for("B01.tif"), file_path)
+
+    assert open(file_path, "rb").read() == expected
+    assert transferred == len(expected) - 1000
+    assert asset_server.requests[-1][2] == "bytes=1000-"
+
+
+def test_download_missing_asset_raises(asset_server, tmp_path):
+    downloader = AssetDownloader()
+    file_path = str(tmp_path / "missing.tif")
+
+    with pytest.raises(DownloadError):
+        downloader.download(asset_server.url_for("missing.tif"), file_path)
+
+    assert not os.path.exists(file_path)
+
+
+def test_load_data_concurrent_with_status(asset_server, tmp_path):
+    storage = tmp_path / "raw"
+    config = DictConfig(
+        {
+            "storage": {
+                "path": str(storage),
+                "catalog_path": str(tmp_path / "catalog"),
+                "max_concurrent_downloads": 2,
+            }
+        }
+    )
+    loader = DataLoader(config)
+
+    items = []
+    for i in range(3):
+        item = Item(
+            id=f"item_{i}", geometry={}, bbox=[], datetime=datetime.now(), properties={}
+        )
+        item.add_asset("blue", Asset(href=asset_server.url_for(f"B{2 * i:02d}.tif")))
+        item.add_asset("nir", Asset(href=asset_server.url_for(f"B{2 * i + 1:02d}.tif")))
+        items.append(item)
+    items[2].assets["nir"].href = asset_server.url_for("missing.tif")
+
+    saved_files = loader.load_data(items, ["blue", "nir"])
+
+    assert len(saved_files) == 5
+    assert [r.status for r in loader.download_results].count("failed") == 1
+    failed = [r for r in loader.download_results if not r.ok][0]
+    assert failed.file_path.endswith("item_2_nir.tif")
+    assert failed.error
+    # Transfers share the pooled keep-alive connections
+    assert asset_server.connections <= 2
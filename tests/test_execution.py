@@ -0,0 +1,85 @@
+import os
+
+import pytest
+from omegaconf import DictConfig
+from pystac import Item
+
+from eo_data_pipeline.pipeline.execution import AssetExecutor
+from eo_data_pipeline.testing.servers import LocalAssetServer, make_catalog
+
+BANDS = ["blue", "nir"]
+
+
+@pytest.fixture
+def asset_server(tmp_path):
+    remote = tmp_path / "remote"
+    remote.mkdir()
+    with LocalAssetServer(str(remote)) as server:
+        items = [
+            Item.from_dict(item)
+            for item in make_catalog(3, [14.0, 46.0, 14.5, 46.5], asset_url=server.url)
+        ]
+        for item in items:
+            for band in BANDS:
+                (remote / f"{item.id}_{band}.tif").write_bytes(os.urandom(1024))
+        yield server, items
+
+
+def make_config(tmp_path, backend, **execution):
+    return DictConfig(
+        {
+            "storage": {
+                "path": str(tmp_path / "raw"),
+                "catalog_path": str(tmp_path / "catalog"),
+            },
+            "execution": {"backend": backend, "max_workers": 2, **execution},
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "backend, options",
+    [("thread", {}), ("process", {}), ("dask", {"dask_scheduler": "threads"})],
+)
+def test_load_all_bands(tmp_path, asset_server, backend, options):
+    server, items = asset_server
+
+    with AssetExecutor(make_config(tmp_path, backend, **options)) as executor:
+        executor.loader.save_metadata(items)
+        saved_files = executor.load(items, BANDS)
+
+    assert sorted(os.path.basename(path) for path in saved_files) == sorted(
+        f"{item.id}_{band}.tif" for item in items for band in BANDS
+    )
+    assert all(os.path.getsize(path) == 1024 for path in saved_files)
+    rows = executor.loader.index.query(bands=["nir"])
+    assert sorted(row["item_id"] for row in rows) == [item.id for item in items]
+
+
+def test_thread_backend_shares_connections(tmp_path, asset_server):
+    server, items = asset_server
+
+    with AssetExecutor(make_config(tmp_path, "thread")) as executor:
+        executor.load(items, BANDS)
+
+    assert len(server.requests) == 6
+    assert server.connections <= 2
+
+
+def test_invalid_backend(tmp_path):
+    with pytest.raises(ValueError, match="Invalid execution backend"):
+        AssetExecutor(make_config(tmp_path, "spark"))
+
+
+def test_dask_reuses_one_distributed_client(tmp_path, asset_server):
+    distributed = pytest.importorskip("distributed")
+    server, items = asset_server
+
+    with distributed.LocalCluster(n_workers=1, processes=False) as cluster:
+        config = make_config(tmp_path, "dask", dask_scheduler=cluster.scheduler_address)
+        with AssetExecutor(config) as executor:
+            executor.load(items[:1], BANDS)
+            client = executor._pool
+            executor.load(items[1:], BANDS)
+            assert executor._pool is client
+        assert client.status == "closed"
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+from pystac import Item
+from shapely import wkb
+
+from eo_data_pipeline.data_loader.geoparquet import read_geoparquet, write_geoparquet
+from eo_data_pipeline.testing.servers import make_catalog
+
+pc = pytest.importorskip("pyarrow.compute")
+
+
+@pytest.fixture
+def items():
+    dicts = make_catalog(60, [14.0, 46.0, 15.0, 47.0])
+    for item in dicts:
+        item["properties"].update(
+            {"mgrs:utm_zone": 33, "mgrs:latitude_band": "T", "mgrs:grid_square": "VM"}
+        )
+    return [Item.from_dict(item) for item in dicts]
+
+
+def test_write_partitions_by_month(items, tmp_path):
+    path = tmp_path / "items"
+
+    assert write_geoparquet(items, str(path)) == 60
+
+    months = sorted(p.name for p in (path / "year=2023").iterdir())
+    assert months == ["month=1", "month=2", "month=3"]
+    row = read_geoparquet(str(path), filter=pc.field("id") == items[0].id).to_pylist()
+    assert row[0]["mgrs_tile"] == "33TVM"
+    assert row[0]["eo:cloud_cover"] == 0.0
+    assert dict(row[0]["assets"])["blue"] == items[0].assets["blue"].href
+    assert wkb.loads(row[0]["geometry"]).bounds == (14.0, 46.0, 15.0, 47.0)
+    assert row[0]["bbox"] == {"xmin": 14.0, "ymin": 46.0, "xmax": 15.0, "ymax": 47.0}
+
+
+def test_write_appends_new_items(items, tmp_path):
+    path = str(tmp_path / "items")
+
+    assert write_geoparquet(items[:20], path) == 20
+    assert write_geoparquet(items, path) == 40
+    assert write_geoparquet(items, path) == 0
+
+    table = read_geoparquet(path, columns=["id"])
+    assert sorted(table.column("id").to_pylist()) == sorted(item.id for item in items)
+
+
+def test_read_filters(items, tmp_path):
+    path = str(tmp_path / "items")
+    write_geoparquet(items, path)
+
+    table = read_geoparquet(
+        path,
+        filter=(pc.field("month") == 2) & (pc.field("eo:cloud_cover") < 5),
+        columns=["id", "datetime"],
+    )
+
+    assert table.num_rows == 5  # Items 40-44
+    assert all(when.month == 2 for when in table.column("datetime").to_pylist())
+
+
+def test_geometry_crs_is_crs84(items, tmp_path):
+    path = str(tmp_path / "items")
+    write_geoparquet(items, path)
+
+    pq = pytest.importorskip("pyarrow.parquet")
+    written = next((tmp_path / "items").rglob("*.parquet"))
+    geo = json.loads(pq.read_schema(written).metadata[b"geo"])
+    assert geo["primary_column"] == "geometry"
+    # A missing crs means OGC:CRS84, while null would mean an undefined CRS
+    assert "crs" not in geo["columns"]["geometry"]
@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pystac import Item
+
+from eo_data_pipeline.data_access.index import CatalogIndex
+
+
+def make_item(index, bbox, cloud_cover=5.0):
+    return Item(
+        id=f"item_{index}",
+        geometry=None,
+        bbox=bbox,
+        datetime=datetime(2023, 1, 1, 10, tzinfo=timezone.utc) + timedelta(days=index),
+        properties={"eo:cloud_cover": cloud_cover},
+    )
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = CatalogIndex(str(tmp_path))
+    items = [
+        make_item(0, [14.0, 46.0, 15.0, 47.0]),
+        make_item(1, [15.5, 46.0, 16.5, 47.0], cloud_cover=30.0),
+        make_item(2, [14.5, 46.5, 15.5, 47.5]),
+    ]
+    index.add_items(items)
+    index.add_assets(
+        [
+            (item.id, band, f"/data/{item.id}_{band}.tif")
+            for item in items
+            for band in ("blue", "nir")
+        ]
+    )
+    return index
+
+
+def ids(rows):
+    return sorted({row["item_id"] for row in rows})
+
+
+def test_query_bbox(index):
+    assert ids(index.query(bbox=[14.1, 46.1, 14.2, 46.2])) == ["item_0"]
+    assert ids(index.query(bbox=[15.2, 46.8, 15.6, 47.2])) == ["item_1", "item_2"]
+    assert index.query(bbox=[0.0, 0.0, 1.0, 1.0]) == []
+
+
+def test_query_time_range_includes_end_date(index):
+    rows = index.query(time_range=("2023-01-02", "2023-01-03"))
+    assert ids(rows) == ["item_1", "item_2"]
+    assert rows[0]["datetime"] == datetime(2023, 1, 2, 10, tzinfo=timezone.utc)
+
+
+def test_query_bands_and_cloud_cover(index):
+    rows = index.query(bands=["nir"], max_cloud_cover=20)
+    assert [row["path"] for row in rows] == [
+        "/data/item_0_nir.tif",
+        "/data/item_2_nir.tif",
+    ]
+
+
+def test_add_items_replaces(index):
+    index.add_items([make_item(0, [0.0, 0.0, 1.0, 1.0])])
+    assert ids(index.query(bbox=[0.5, 0.5, 0.6, 0.6])) == ["item_0"]
+    assert ids(index.query(bbox=[14.1, 46.1, 14.2, 46.2])) == []
+    assert len(index.query()) == 6
+
+
+def test_connections_are_kept_per_thread_and_closed(index):
+    with index._connect() as db:
+        pass
+    with index._connect() as again:
+        assert again is db
+
+    def query_in_thread():
+        with index._connect() as other:
+            connections.append(other)
+        index.query()
+
+    connections = []
+    thread = threading.Thread(target=query_in_thread)
+    thread.start()
+    thread.join()
+    assert connections[0] is not db
+    assert len(index._connections) == 2
+
+    index.close()
+    for connection in (db, connections[0]):
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+    # Reconnects after close
+    assert ids(index.query(bands=["blue"])) == ["item_0", "item_1", "item_2"]
+    index.close()
+
+
+def test_context_manager_closes(tmp_path):
+    with CatalogIndex(str(tmp_path)) as index:
+        index.add_items([make_item(0, [14.0, 46.0, 15.0, 47.0])])
+        connections = list(index._connections)
+    assert index._connections == []
+    with pytest.raises(sqlite3.ProgrammingError):
+        connections[0].execute("SELECT 1")
@@ -0,0 +1,107 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+import rasterio
+from omegaconf import DictConfig
+from pystac import Item
+from rasterio.transform import from_origin
+
+from eo_data_pipeline.data_processor.datacube import DatacubeBuilder
+from eo_data_pipeline.data_processor.indices import (
+    SpectralIndexCalculator,
+    evaluate,
+    expression_bands,
+    parse_expression,
+)
+
+
+def write_band(path, data, resolution=10, nodata=0):
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        dtype=data.dtype,
+        count=1,
+        width=data.shape[1],
+        height=data.shape[0],
+        crs="EPSG:32633",
+        transform=from_origin(400000, 5100000, resolution, resolution),
+        nodata=nodata,
+    ) as dst:
+        dst.write(data, 1)
+
+
+@pytest.fixture
+def config(tmp_path):
+    return DictConfig(
+        {
+            "storage": {"path": str(tmp_path)},
+            "pipeline": {"spectral_bands": ["red", "nir", "swir16"]},
+            "processing": {
+                "output_path": str(tmp_path / "cube"),
+                "indices": {"ndvi": None, "ndmi": None},
+                "index_block_size": 64,
+            },
+        }
+    )
+
+
+@pytest.fixture
+def item(tmp_path):
+    red = np.full((200, 200), 1000, "uint16")
+    red[0, 0] = 0  # nodata
+    write_band(tmp_path / "scene_red.tif", red)
+    write_band(tmp_path / "scene_nir.tif", np.full((200, 200), 3000, "uint16"))
+    # 20 m band, resampled to the 10 m grid of nir
+    write_band(tmp_path / "scene_swir16.tif", np.full((100, 100), 2000, "uint16"), 20)
+    return Item("scene", None, None, datetime(2023, 1, 1), {})
+
+
+def test_parse_expression():
+    tree = parse_expression("where(nir > 0, (nir - red) / (nir + red), -1)")
+    assert expression_bands(tree) == ["nir", "red"]
+    result = evaluate(tree, {"nir": np.array([3.0, 0.0]), "red": np.array([1.0, 1.0])})
+    np.testing.assert_allclose(result, [0.5, -1])
+
+
+@pytest.mark.parametrize(
+    "expression", ["__import__('os')", "nir.real", "'a' + nir", "nir[0]", "nir +"]
+)
+def test_parse_expression_rejects_unsafe_input(expression):
+    with pytest.raises(ValueError):
+        parse_expression(expression)
+
+
+def test_unknown_bands_and_indices(config):
+    config.processing.indices = {"ndwi": None}
+    with pytest.raises(ValueError, match="not in pipeline.spectral_bands"):
+        SpectralIndexCalculator(config)
+    config.processing.indices = {"mystery": None}
+    with pytest.raises(ValueError, match="unknown index"):
+        SpectralIndexCalculator(config)
+
+
+def test_compute_indices(config, item, tmp_path):
+    paths = SpectralIndexCalculator(config).compute([item])
+
+    assert paths == [str(tmp_path / "scene_ndvi.tif"), str(tmp_path / "scene_ndmi.tif")]
+    with rasterio.open(paths[0]) as src:
+        assert src.dtypes[0] == "float32"
+        assert src.block_shapes[0] == (64, 64)
+        ndvi = src.read(1)
+    assert np.isnan(ndvi[0, 0])
+    np.testing.assert_allclose(ndvi[1:, 1:], 0.5)
+    with rasterio.open(paths[1]) as src:
+        assert (src.width, src.height) == (200, 200)
+        np.testing.assert_allclose(src.read(1), 0.2, rtol=1e-6)
+
+    # Index files are picked up as cube bands like the loaded bands
+    cubes = DatacubeBuilder(config).build([item], ["ndvi", "ndmi"])
+    assert len(cubes) == 1
+
+
+def test_compute_skips_missing_bands(config, item, tmp_path):
+    (tmp_path / "scene_swir16.tif").unlink()
+    paths = SpectralIndexCalculator(config).compute([item])
+    assert paths == [str(tmp_path / "scene_ndvi.tif")]
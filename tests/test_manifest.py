@@ -0,0 +1,168 @@
+from datetime import datetime
+
+import pytest
+from omegaconf import DictConfig
+from pystac import Item
+
+from eo_data_pipeline.data_loader.downloader import DownloadResult
+from eo_data_pipeline.pipeline.manifest import RunManifest
+
+
+def make_config(**pipeline):
+    return DictConfig(
+        {
+            "earth_search": {"url": "https://earth-search.aws.element84.com/v1"},
+            "pipeline": {
+                "time_steps": {"start": "2023-01-01", "end": "2023-01-31"},
+                "aoi": [10.0, 45.0, 10.1, 45.1],
+                "spectral_bands": ["red", "nir"],
+                **pipeline,
+            },
+        }
+    )
+
+
+def make_item(item_id):
+    return Item(item_id, None, None, datetime(2023, 1, 1), {})
+
+
+def plan(tmp_path, item_ids=("a", "b"), bands=("red", "nir")):
+    return [
+        (item_id, band, None, str(tmp_path / f"{item_id}_{band}.tif"))
+        for item_id in item_ids
+        for band in bands
+    ]
+
+
+def download(downloads, failed=()):
+    results = []
+    for item_id, band, _, file_path in downloads:
+        if (item_id, band) in failed:
+            results.append(DownloadResult("url", file_path, "failed", error="boom"))
+            continue
+        with open(file_path, "wb") as f:
+            f.write(f"{item_id}_{band}".encode())
+        results.append(DownloadResult("url", file_path, "downloaded"))
+    return results
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = RunManifest(str(tmp_path / "manifest.sqlite"))
+    manifest.start("key")
+    return manifest
+
+
+def test_make_key():
+    key = RunManifest.make_key(make_config())
+    assert key == RunManifest.make_key(make_config())
+    assert key != RunManifest.make_key(make_config(spectral_bands=["red"]))
+    assert key != RunManifest.make_key(make_config(max_cloud_cover=50))
+
+
+def test_start_resumes_only_same_run(tmp_path):
+    path = str(tmp_path / "manifest.sqlite")
+    manifest = RunManifest(path)
+    assert not manifest.start("key", resume=True)
+    manifest.mark_stage("save_metadata")
+
+    manifest = RunManifest(path)
+    assert manifest.start("key", resume=True)
+    assert manifest.stage_done("save_metadata")
+
+    # Different parameters start a new run
+    assert not RunManifest(path).start("other", resume=True)
+    assert not manifest.stage_done("save_metadata")
+
+
+def test_start_without_resume_resets(manifest):
+    manifest.add_items([make_item("a")], complete=True)
+    manifest.mark_stage("save_metadata")
+    assert not manifest.start("key")
+    assert manifest.items() is None
+    assert not manifest.stage_done("save_metadata")
+
+
+def test_items_round_trip(manifest):
+    manifest.add_items([make_item("b"), make_item("a")])
+    # Items of an unfinished search are not reused
+    assert manifest.items() is None
+    manifest.add_items([make_item("c")], complete=True)
+    assert [item.id for item in manifest.items()] == ["b", "a", "c"]
+
+
+def test_completed_skips_verified_files(tmp_path, manifest):
+    downloads = plan(tmp_path)
+    remaining, done = manifest.completed(downloads)
+    assert remaining == downloads and done == []
+    assert manifest.states()["pending"] == 4
+
+    manifest.record(downloads, download(downloads, failed={("b", "nir")}))
+    assert manifest.states() == {
+        "pending": 1,
+        "downloaded": 0,
+        "verified": 3,
+        "processed": 0,
+    }
+
+    remaining, done = manifest.completed(downloads)
+    assert [(item_id, band) for item_id, band, _, _ in remaining] == [("b", "nir")]
+    assert len(done) == 3
+
+
+def test_completed_detects_changed_files(tmp_path, manifest):
+    downloads = plan(tmp_path, item_ids=("a",))
+    manifest.completed(downloads)
+    manifest.record(downloads, download(downloads))
+
+    (tmp_path / "a_red.tif").write_bytes(b"truncated")
+    (tmp_path / "a_nir.tif").unlink()
+    remaining, done = manifest.completed(downloads)
+    assert len(remaining) == 2 and done == []
+    assert manifest.states()["pending"] == 2
+
+
+def test_checksum_verification(tmp_path):
+    manifest = RunManifest(str(tmp_path / "manifest.sqlite"), verify="checksum")
+    manifest.start("key")
+    downloads = plan(tmp_path, item_ids=("a",), bands=("red",))
+    manifest.completed(downloads)
+    manifest.record(downloads, download(downloads))
+
+    # Same size, different contents
+    (tmp_path / "a_red.tif").write_bytes(b"A_RED")
+    remaining, done = manifest.completed(downloads)
+    assert remaining == downloads and done == []
+
+
+def test_verify_files_after_rewrite(tmp_path, manifest):
+    downloads = plan(tmp_path, item_ids=("a",), bands=("red",))
+    manifest.completed(downloads)
+    manifest.record(downloads, download(downloads))
+
+    # Files rewritten in place, e.g. transcoded, are verified again
+    (tmp_path / "a_red.tif").write_bytes(b"transcoded contents")
+    manifest.verify_files([str(tmp_path / "a_red.tif")])
+    remaining, done = manifest.completed(downloads)
+    assert remaining == [] and len(done) == 1
+
+
+def test_mark_processed(tmp_path, manifest):
+    downloads = plan(tmp_path)
+    manifest.completed(downloads)
+    manifest.record(downloads, download(downloads, failed={("b", "red")}))
+    manifest.mark_processed(["a", "b"])
+    assert manifest.states() == {
+        "pending": 1,
+        "downloaded": 0,
+        "verified": 0,
+        "processed": 3,
+    }
+    # Processed assets are complete as well
+    remaining, _ = manifest.completed(downloads)
+    assert len(remaining) == 1
+
+
+def test_invalid_verify_mode(tmp_path):
+    with pytest.raises(ValueError):
+        RunManifest(str(tmp_path / "manifest.sqlite"), verify="mtime")
@@ -0,0 +1,99 @@
+import json
+import os
+
+import pytest
+from omegaconf import DictConfig
+from pystac import Item
+
+from eo_data_pipeline.data_loader.loader import DataLoader
+from eo_data_pipeline.metrics import Metrics, metrics
+from eo_data_pipeline.testing.servers import LocalAssetServer, make_catalog
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.configure(enabled=True)
+    yield metrics
+    metrics.configure(enabled=False)
+
+
+def test_disabled_records_nothing():
+    registry = Metrics()
+
+    with registry.timer("stage"), registry.in_flight("in_flight"):
+        registry.incr("bytes", 10)
+    registry.observe("stage", 1.0)
+
+    assert registry.summary() == {"timers": {}, "counters": {}, "gauges": {}}
+
+
+def test_timers_counters_gauges():
+    registry = Metrics(enabled=True)
+
+    for seconds in (1.0, 3.0):
+        registry.observe("load.asset", seconds)
+    with registry.timer("stage"):
+        pass
+    registry.incr("load.bytes", 100)
+    registry.incr("load.bytes", 50)
+    with registry.in_flight("load.in_flight"):
+        with registry.in_flight("load.in_flight"):
+            pass
+
+    summary = registry.summary()
+    assert summary["timers"]["load.asset"] == {
+        "count": 2,
+        "total_s": 4.0,
+        "min_s": 1.0,
+        "max_s": 3.0,
+    }
+    assert summary["timers"]["stage"]["count"] == 1
+    assert summary["counters"] == {"load.bytes": 150}
+    assert summary["gauges"]["load.in_flight"] == {"value": 0, "max": 2}
+
+
+def test_exports(tmp_path):
+    registry = Metrics(enabled=True)
+    registry.observe("load.asset", 2.5)
+    registry.incr("load.bytes", 1024)
+
+    registry.to_json(str(tmp_path / "run.json"))
+    text = registry.to_prometheus()
+
+    with open(tmp_path / "run.json") as f:
+        assert json.load(f)["counters"]["load.bytes"] == 1024
+    assert "eo_pipeline_load_asset_seconds_count 1" in text
+    assert "eo_pipeline_load_asset_seconds_sum 2.5" in text
+    assert "eo_pipeline_load_bytes_total 1024" in text
+
+
+def test_load_data_instrumented(tmp_path, enabled_metrics):
+    remote = tmp_path / "remote"
+    remote.mkdir()
+    with LocalAssetServer(str(remote)) as server:
+        items = [
+            Item.from_dict(item)
+            for item in make_catalog(2, [14.0, 46.0, 14.5, 46.5], asset_url=server.url)
+        ]
+        for item in items:
+            for band in ("blue", "nir"):
+                (remote / f"{item.id}_{band}.tif").write_bytes(os.urandom(256))
+        loader = DataLoader(
+            DictConfig(
+                {
+                    "storage": {
+                        "path": str(tmp_path / "raw"),
+                        "catalog_path": str(tmp_path / "catalog"),
+                    }
+                }
+            )
+        )
+        loader.save_metadata(items)
+        loader.load_data(items, ["blue", "nir"])
+
+    summary = enabled_metrics.summary()
+    assert summary["counters"]["catalog.items_written"] == 2
+    assert summary["counters"]["load.assets.downloaded"] == 4
+    assert summary["counters"]["load.bytes"] == 4 * 256
+    assert summary["timers"]["load.asset"]["count"] == 4
+    assert 1 <= summary["gauges"]["load.in_flight"]["max"] <= 4
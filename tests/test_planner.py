@@ -0,0 +1,121 @@
+from datetime import datetime
+
+import pytest
+from omegaconf import DictConfig
+from pystac import Asset, Item
+from shapely.geometry import box, mapping
+
+from eo_data_pipeline.data_loader.cache import AssetCache
+from eo_data_pipeline.data_loader.planner import DownloadPlanner
+from eo_data_pipeline.testing.servers import LocalAssetServer
+
+SIZES = {"a_blue": 1000, "a_nir": 2000, "b_blue": 3000, "b_nir": 4000}
+
+
+@pytest.fixture
+def remote(tmp_path):
+    root = tmp_path / "remote"
+    root.mkdir()
+    for name, size in SIZES.items():
+        (root / f"{name}.tif").write_bytes(b"x" * size)
+    return root
+
+
+def make_config(tmp_path, **storage):
+    return DictConfig(
+        {
+            "storage": {
+                "path": str(tmp_path / "raw"),
+                "catalog_path": str(tmp_path / "catalog"),
+                "cache_path": str(tmp_path / "cache"),
+                "index": False,
+                **storage,
+            },
+            "plan": {"bandwidth_mbps": 0.008},
+        }
+    )
+
+
+def make_items(url_for, file_size=False):
+    items = []
+    for item_id in ("a", "b"):
+        item = Item(
+            item_id,
+            mapping(box(14.0, 46.0, 15.0, 47.0)),
+            [14.0, 46.0, 15.0, 47.0],
+            datetime(2023, 1, 1),
+            {},
+        )
+        for band in ("blue", "nir"):
+            name = f"{item_id}_{band}"
+            extra = {"file:size": SIZES[name]} if file_size else {}
+            item.add_asset(band, Asset(url_for(f"{name}.tif"), extra_fields=extra))
+        items.append(item)
+    return items
+
+
+def test_plan_from_head_requests(remote, tmp_path):
+    planner = DownloadPlanner(make_config(tmp_path))
+    with LocalAssetServer(str(remote)) as server:
+        estimates = planner.plan(make_items(server.url_for), ["blue", "nir"])
+    planner.close()
+
+    assert [estimate.size for estimate in estimates] == [1000, 2000, 3000, 4000]
+    assert {estimate.source for estimate in estimates} == {"head"}
+    assert {method for method, _, _ in server.requests} == {"HEAD"}
+    plan = planner.summarize(estimates)
+    assert plan["bytes"] == plan["download_bytes"] == 10000
+    assert plan["bytes_by_band"] == {"blue": 4000, "nir": 6000}
+    # 10000 bytes at 8000 bit/s
+    assert plan["estimated_seconds"] == 10
+    assert not (tmp_path / "raw").exists()
+
+
+def test_plan_from_file_size_sends_no_requests(remote, tmp_path):
+    planner = DownloadPlanner(make_config(tmp_path))
+    with LocalAssetServer(str(remote)) as server:
+        estimates = planner.plan(make_items(server.url_for, file_size=True), ["blue"])
+    assert server.requests == []
+    assert [estimate.source for estimate in estimates] == ["file:size"] * 2
+    assert planner.summarize(estimates)["bytes"] == 4000
+
+
+def test_plan_savings(remote, tmp_path):
+    config = make_config(tmp_path)
+    with LocalAssetServer(str(remote)) as server:
+        items = make_items(server.url_for, file_size=True)
+        # a_blue was downloaded before, b_nir is in the asset cache
+        (tmp_path / "raw").mkdir()
+        (tmp_path / "raw" / "a_blue.tif").write_bytes(b"x" * 1000)
+        # A partial file does not count
+        (tmp_path / "raw" / "a_nir.tif").write_bytes(b"x" * 10)
+        cache = AssetCache(str(tmp_path / "cache"))
+        cache.add(
+            AssetCache.make_key(server.url_for("b_nir.tif"), size=4000),
+            str(remote / "b_nir.tif"),
+        )
+
+        planner = DownloadPlanner(config)
+        plan = planner.summarize(planner.plan(items, ["blue", "nir"]))
+
+    assert plan["assets_by_status"] == {"download": 2, "on_disk": 1, "cached": 1}
+    assert plan["on_disk_bytes"] == 1000
+    assert plan["cached_bytes"] == 4000
+    assert plan["download_bytes"] == 5000
+
+
+def test_plan_clip_mode_and_unknown_sizes(remote, tmp_path):
+    planner = DownloadPlanner(make_config(tmp_path, load_mode="clip"))
+    with LocalAssetServer(str(remote)) as server:
+        items = make_items(server.url_for, file_size=True)
+        # The size of this asset is unknown
+        del items[1].assets["nir"].extra_fields["file:size"]
+        planner.head_requests = False
+        # A quarter of the footprint of the items
+        estimates = planner.plan(items, ["blue", "nir"], aoi=[14.0, 46.0, 14.5, 46.5])
+
+    assert estimates[3].size is None
+    plan = planner.summarize(estimates)
+    assert plan["unknown_sizes"] == 1
+    # The unknown nir asset counts with the mean size of the known one
+    assert plan["bytes_by_band"] == {"blue": 1000, "nir": 1000}
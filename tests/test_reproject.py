@@ -0,0 +1,118 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+import rasterio
+from omegaconf import DictConfig
+from pystac import Item
+from rasterio.transform import from_origin
+from rasterio.warp import transform_bounds
+
+from eo_data_pipeline.data_processor.datacube import DatacubeBuilder
+from eo_data_pipeline.data_processor.reproject import Reprojector, TargetGrid
+
+# 4 km scenes on both sides of the 18E boundary of UTM zones 33 and 34
+ZONE_33 = ("EPSG:32633", from_origin(728000, 5100000, 10, 10))
+ZONE_34 = ("EPSG:32634", from_origin(268000, 5100000, 10, 10))
+
+
+def write_band(path, value, grid, resolution=10, size=400, dtype="uint16"):
+    crs, transform = grid
+    transform = from_origin(transform.c, transform.f, resolution, resolution)
+    size = size * 10 // resolution
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        dtype=dtype,
+        count=1,
+        width=size,
+        height=size,
+        crs=crs,
+        transform=transform,
+        nodata=0,
+    ) as dst:
+        dst.write(np.full((size, size), value, dtype), 1)
+
+
+@pytest.fixture
+def items(tmp_path):
+    items = []
+    for item_id, grid, day in [("a", ZONE_33, 1), ("b", ZONE_33, 2), ("c", ZONE_34, 3)]:
+        write_band(tmp_path / f"{item_id}_red.tif", 1000 + day, grid)
+        write_band(tmp_path / f"{item_id}_swir16.tif", 2000 + day, grid, resolution=20)
+        write_band(
+            tmp_path / f"{item_id}_scl.tif", 4, grid, resolution=20, dtype="uint8"
+        )
+        items.append(Item(item_id, None, None, datetime(2023, 1, day), {}))
+    return items
+
+
+@pytest.fixture
+def config(tmp_path):
+    # AOI covering the scenes of both zones
+    west = transform_bounds(ZONE_33[0], "EPSG:4326", 728000, 5096000, 732000, 5100000)
+    east = transform_bounds(ZONE_34[0], "EPSG:4326", 268000, 5096000, 272000, 5100000)
+    aoi = [west[0], min(west[1], east[1]), east[2], max(west[3], east[3])]
+    return DictConfig(
+        {
+            "storage": {"path": str(tmp_path)},
+            "pipeline": {"aoi": aoi},
+            "processing": {"output_path": str(tmp_path / "cube")},
+            "grid": {
+                "crs": "EPSG:3035",
+                "resolution": 20,
+                "output_path": str(tmp_path / "aligned"),
+                "block_size": 128,
+                "max_workers": 2,
+            },
+        }
+    )
+
+
+def test_target_grid_from_bounds():
+    grid = TargetGrid.from_bounds("EPSG:3035", 20, bounds=[1005, 2003, 2010, 2990])
+    assert (grid.transform.c, grid.transform.f) == (1000, 3000)
+    assert (grid.width, grid.height) == (51, 50)
+    assert len(grid.windows(16)) == 4 * 4
+
+
+def test_align_onto_common_grid(config, items, tmp_path):
+    reprojector = Reprojector(config)
+    paths = reprojector.align(items, ["red", "swir16", "scl"])
+
+    assert len(paths) == 9
+    # One plan per source grid: 10 m and 20 m in each zone
+    assert (reprojector.plans.misses, reprojector.plans.hits) == (4, 5)
+
+    profiles = []
+    for path in paths:
+        with rasterio.open(path) as src:
+            profiles.append((src.crs, src.transform, src.shape))
+            data = src.read(1, masked=True)
+        assert data.count() > 0
+        if path.endswith("_scl.tif"):
+            # Nearest resampling of class bands
+            assert set(np.unique(data.compressed())) == {4}
+    assert len(set(profiles)) == 1
+
+    with rasterio.open(tmp_path / "aligned" / "a_red.tif") as src:
+        data = src.read(1, masked=True)
+    # Bilinear resampling of a constant band keeps its value
+    assert set(np.unique(data.compressed())) == {1001}
+    # Scene "a" covers only the western part of the grid
+    assert data.mask[:, -1].all()
+    assert not data.mask.all()
+
+
+def test_aligned_files_share_one_datacube(config, items, tmp_path):
+    paths = Reprojector(config).align(items, ["red", "swir16"])
+    builder = DatacubeBuilder(config, storage_path=config.grid.output_path)
+    cubes = builder.build(items, ["red", "swir16"], saved_files=paths)
+    assert len(cubes) == 1
+
+
+def test_invalid_resampling(config):
+    config.grid.resampling = "fancy"
+    with pytest.raises(ValueError, match="Invalid resampling"):
+        Reprojector(config)
@@ -0,0 +1,110 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+import rasterio
+from omegaconf import DictConfig
+from pystac import Asset, Item
+from rasterio.transform import from_origin
+from rasterio.warp import transform_bounds
+
+from eo_data_pipeline.data_fetcher.fetcher import DataFetcher
+from eo_data_pipeline.data_loader.scene_filter import (
+    VALID_FRACTION_PROPERTY,
+    SceneFilter,
+    valid_fraction,
+)
+
+CRS = "EPSG:32633"
+ORIGIN = (400000.0, 5100000.0)
+
+
+def write_scl(path, classes):
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        dtype="uint8",
+        count=1,
+        width=classes.shape[1],
+        height=classes.shape[0],
+        crs=CRS,
+        transform=from_origin(*ORIGIN, 20, 20),
+    ) as dst:
+        dst.write(classes, 1)
+    return str(path)
+
+
+def aoi_for(col_off, row_off, width, height):
+    """AOI in EPSG:4326 for a pixel window of a 20 m SCL raster."""
+    left = ORIGIN[0] + col_off * 20
+    top = ORIGIN[1] - row_off * 20
+    bounds = (left, top - height * 20, left + width * 20, top)
+    return list(transform_bounds(CRS, "EPSG:4326", *bounds))
+
+
+@pytest.fixture
+def scl_path(tmp_path):
+    # Left half vegetation (4), right half cloud (9)
+    classes = np.full((100, 100), 4, "uint8")
+    classes[:, 50:] = 9
+    return write_scl(tmp_path / "scl.tif", classes)
+
+
+def make_item(item_id, href):
+    item = Item(item_id, None, None, datetime(2023, 1, 1), {})
+    if href:
+        item.add_asset("scl", Asset(href))
+    return item
+
+
+@pytest.fixture
+def config():
+    return DictConfig(
+        {
+            "pipeline": {"min_valid_fraction": 0.8, "valid_scl_classes": [4, 5, 6]},
+            "storage": {"max_concurrent_downloads": 2},
+        }
+    )
+
+
+def test_valid_fraction_over_aoi(scl_path):
+    # Clear part only, cloudy part only, and a window across both halves
+    assert valid_fraction(scl_path, aoi_for(10, 10, 30, 30), [4]) > 0.9
+    assert valid_fraction(scl_path, aoi_for(60, 10, 30, 30), [4]) < 0.1
+    assert valid_fraction(scl_path, aoi_for(25, 0, 50, 100), [4]) == pytest.approx(
+        0.5, abs=0.05
+    )
+
+
+def test_valid_fraction_counts_aoi_outside_scene_as_invalid(scl_path):
+    # Half of the AOI lies west of the scene
+    assert valid_fraction(scl_path, aoi_for(-20, 10, 40, 40), [4]) == pytest.approx(
+        0.5, abs=0.05
+    )
+
+
+def test_scene_filter(config, scl_path, tmp_path):
+    cloudy = write_scl(tmp_path / "cloudy.tif", np.full((100, 100), 9, "uint8"))
+    items = [
+        make_item("clear", scl_path),
+        make_item("cloudy", cloudy),
+        make_item("no-scl", None),
+        make_item("unreadable", str(tmp_path / "missing.tif")),
+    ]
+
+    kept = SceneFilter(config).filter(items, aoi_for(10, 10, 30, 30))
+
+    assert [item.id for item in kept] == ["clear", "no-scl", "unreadable"]
+    assert kept[0].properties[VALID_FRACTION_PROPERTY] > 0.9
+    assert VALID_FRACTION_PROPERTY not in kept[1].properties
+
+
+def test_max_cloud_cover_from_pipeline_config():
+    config = DictConfig(
+        {
+            "earth_search": {"url": "https://example.com"},
+            "pipeline": {"max_cloud_cover": 35},
+        }
+    )
+    assert DataFetcher(config)._query() == {"eo:cloud_cover": {"lt": 35}}
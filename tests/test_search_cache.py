@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+
+from omegaconf import DictConfig
+
+from eo_data_pipeline.data_fetcher.fetcher import DataFetcher
+from eo_data_pipeline.data_fetcher.search_cache import SearchCache
+from eo_data_pipeline.testing.servers import LocalStacAPI, make_catalog, make_item
+
+TIME_RANGE = ("2023-01-01", "2023-01-31")
+AOI = [14.0, 46.0, 14.5, 46.5]
+
+
+def make_fetcher(api, tmp_path, **options):
+    return DataFetcher(
+        DictConfig(
+            {
+                "earth_search": {
+                    "url": api.url,
+                    "cache_path": str(tmp_path / "search_cache"),
+                    **options,
+                }
+            }
+        )
+    )
+
+
+def test_put_get_and_ttl(tmp_path, mocker):
+    cache = SearchCache(str(tmp_path), ttl=60)
+    key = SearchCache.make_key("s2", "2023-01-01/2023-01-31", AOI, {})
+    assert cache.get(key) is None
+
+    cache.put(key, [{"id": "a"}, {"id": "b"}])
+    assert [item["id"] for item in cache.get(key)] == ["a", "b"]
+
+    mocker.patch("time.time", return_value=datetime.now().timestamp() + 61)
+    assert cache.get(key) is None
+
+
+def test_make_key_depends_on_search():
+    key = SearchCache.make_key("s2", "2023-01-01/2023-01-31", AOI, {})
+    assert key == SearchCache.make_key("s2", "2023-01-01/2023-01-31", AOI, {})
+    assert key != SearchCache.make_key("s2", "2023-01-01/2023-02-28", AOI, {})
+
+
+def test_merge_tracks_watermark(tmp_path):
+    cache = SearchCache(str(tmp_path))
+    items = make_catalog(3, AOI)
+
+    cache.merge("key", items[:2])
+    assert cache.watermark("key") == ("updated", items[1]["properties"]["updated"])
+
+    merged = cache.merge("key", [items[0], items[2]])
+    assert [item["id"] for item in merged] == [item["id"] for item in items]
+    assert cache.watermark("key")[1] == items[2]["properties"]["updated"]
+
+
+def test_merge_compares_watermarks_as_times(tmp_path):
+    cache = SearchCache(str(tmp_path))
+    stamps = ["2023-01-01T00:00:00Z", "2023-01-01T00:00:00.5Z"]
+    cache.merge(
+        "key", [{"id": str(i), "properties": {"updated": stamps[i]}} for i in (0, 1)]
+    )
+    assert cache.watermark("key") == ("updated", "2023-01-01T00:00:00.500000Z")
+
+    # Later as a string, but half a second earlier as a time
+    cache.merge(
+        "key", [{"id": "2", "properties": {"updated": "2023-01-01T01:00:00+01:00"}}]
+    )
+    assert cache.watermark("key")[1] == "2023-01-01T00:00:00.500000Z"
+
+
+def test_fetch_data_served_from_cache(tmp_path):
+    with LocalStacAPI(make_catalog(5, AOI)) as api:
+        first = make_fetcher(api, tmp_path).fetch_data(TIME_RANGE, AOI, ["blue"])
+        requests = len(api.search_requests)
+        second = make_fetcher(api, tmp_path).fetch_data(TIME_RANGE, AOI, ["blue"])
+
+        assert len(api.search_requests) == requests
+    assert [item.id for item in second] == [item.id for item in first]
+    assert second[0].assets["blue"].href == first[0].assets["blue"].href
+
+
+def test_fetch_data_incremental(tmp_path):
+    items = make_catalog(5, AOI)
+    with LocalStacAPI(items) as api:
+        fetcher = make_fetcher(api, tmp_path, incremental=True)
+        assert len(fetcher.fetch_data(TIME_RANGE, AOI, ["blue"])) == 5
+
+        items.append(
+            make_item("new", datetime(2023, 1, 20, tzinfo=timezone.utc), AOI, ["blue"])
+        )
+        fetched = fetcher.fetch_data(TIME_RANGE, AOI, ["blue"])
+
+        last_query = api.search_requests[-1]["query"]
+    assert [item.id for item in fetched][-1] == "new"
+    assert len(fetched) == 6
+    assert last_query["updated"] == {"gt": items[4]["properties"]["updated"]}
@@ -0,0 +1,179 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+from collections import Counter
+
+import numpy as np
+import pytest
+import rasterio
+from pystac import Catalog
+from rasterio.transform import from_origin
+
+from eo_data_pipeline.cli import load_config, main
+from eo_data_pipeline.data_access.index import CatalogIndex
+from eo_data_pipeline.pipeline.sharding import merge_shards, shard_config, shard_of
+from eo_data_pipeline.testing.servers import (
+    LocalAssetServer,
+    LocalStacAPI,
+    make_catalog,
+)
+
+BBOX = [14.0, 46.0, 14.5, 46.5]
+SHARDS = 3
+
+
+def overrides(tmp_path, url):
+    return [
+        f"earth_search.url={url}",
+        f"pipeline.aoi={BBOX}",
+        "pipeline.spectral_bands=[blue,nir]",
+        "pipeline.time_steps.start=2023-01-01",
+        "pipeline.time_steps.end=2023-01-31",
+        f"storage.path={tmp_path / 'raw'}",
+        f"storage.catalog_path={tmp_path / 'catalog'}",
+        f"storage.cache_path={tmp_path / 'cache'}",
+        f"processing.output_path={tmp_path / 'cube'}",
+        f"shard.count={SHARDS}",
+    ]
+
+
+@pytest.fixture
+def stac(tmp_path):
+    remote = tmp_path / "remote"
+    remote.mkdir()
+    with LocalAssetServer(str(remote)) as assets:
+        items = make_catalog(9, BBOX, asset_url=assets.url)
+        for item in items:
+            for band in ("blue", "nir"):
+                with rasterio.open(
+                    remote / f"{item['id']}_{band}.tif",
+                    "w",
+                    driver="GTiff",
+                    dtype="uint16",
+                    count=1,
+                    width=32,
+                    height=32,
+                    crs="EPSG:32633",
+                    transform=from_origin(400000, 5100000, 10, 10),
+                ) as dst:
+                    dst.write(np.ones((1, 32, 32), "uint16"))
+        with LocalStacAPI(items) as api:
+            yield api
+
+
+def test_shard_of_is_deterministic_and_balanced():
+    ids = [f"S2A_33TVM_20230{i:04d}_0_L2A" for i in range(3000)]
+    shards = [shard_of(item_id, 4) for item_id in ids]
+    assert shards == [shard_of(item_id, 4) for item_id in ids]
+    counts = Counter(shards)
+    assert set(counts) == {0, 1, 2, 3}
+    assert all(650 < count < 850 for count in counts.values())
+
+
+def test_shard_config_partitions_paths(tmp_path):
+    config = load_config(
+        overrides=[
+            f"storage.path={tmp_path / 'raw'}",
+            f"storage.catalog_path={tmp_path / 'catalog'}",
+            f"storage.geoparquet_path={tmp_path / 'items.parquet'}",
+            f"storage.cache_path={tmp_path / 'cache'}",
+            f"earth_search.cache_path={tmp_path / 'search_cache'}",
+            f"metrics.output_path={tmp_path / 'metrics.json'}",
+            "shard.count=4",
+            "shard.index=2",
+        ]
+    )
+
+    shard = shard_config(config)
+    assert shard.storage.path == str(tmp_path / "raw" / "shard-002")
+    assert shard.storage.catalog_path == str(tmp_path / "catalog" / "shard-002")
+    assert shard.storage.geoparquet_path is None
+    # No SQLite database is shared between workers
+    assert shard.storage.cache_path == str(tmp_path / "cache" / "shard-002")
+    assert shard.earth_search.cache_path == str(tmp_path / "search_cache" / "shard-002")
+    assert shard.processing.output_path.endswith(os.path.join("cube", "shard-002"))
+    assert shard.metrics.output_path == str(tmp_path / "metrics.shard-002.json")
+    # The configuration of the run is unchanged
+    assert config.storage.path == str(tmp_path / "raw")
+    assert shard_config(config, 0).shard.index == 0
+
+    with pytest.raises(ValueError, match="shard.index"):
+        shard_config(load_config(overrides=["shard.count=4"]))
+
+
+def test_dry_run_plans_the_shard(stac, tmp_path, capsys):
+    args = overrides(tmp_path, stac.url)
+    # Assets of shard 0 that are already in its partition
+    partition = tmp_path / "raw" / "shard-000"
+    partition.mkdir(parents=True)
+    for path in (tmp_path / "remote").iterdir():
+        if shard_of(path.name.rsplit("_", 1)[0], SHARDS) == 0:
+            shutil.copy(path, partition / path.name)
+
+    item_ids = []
+    for index in range(SHARDS):
+        assert main(["dry-run", "--items", *args, f"shard.index={index}"]) == 0
+        report = json.loads(capsys.readouterr().out)
+        assert report["shard"] == index
+        assert all(shard_of(item_id, SHARDS) == index for item_id in report["item_ids"])
+        on_disk = report["plan"]["assets_by_status"]["on_disk"]
+        assert on_disk == (2 * report["items"] if index == 0 else 0)
+        item_ids += report["item_ids"]
+    assert len(item_ids) == len(set(item_ids)) == 9
+
+
+def test_shards_in_parallel_processes_then_merge(stac, tmp_path):
+    args = overrides(tmp_path, stac.url)
+    config = load_config(overrides=args)
+    with pytest.raises(RuntimeError, match=r"Shards \[0, 1, 2\]"):
+        merge_shards(config)
+
+    # One worker process per shard, sharing the file system
+    workers = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "eo_data_pipeline.cli",
+                "--no-prefect",
+                "--log-level",
+                "WARNING",
+                "run",
+                *args,
+                f"shard.index={index}",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        for index in range(SHARDS)
+    ]
+    for worker in workers:
+        _, stderr = worker.communicate(timeout=300)
+        assert worker.returncode == 0, stderr
+
+    # Every asset was loaded by exactly one shard, into its partition
+    files = sorted(
+        name
+        for index in range(SHARDS)
+        for name in os.listdir(tmp_path / "raw" / f"shard-{index:03d}")
+        if name.endswith(".tif")
+    )
+    assert len(files) == len(set(files)) == 18
+    for index in range(SHARDS):
+        shard_files = os.listdir(tmp_path / "raw" / f"shard-{index:03d}")
+        assert all(
+            shard_of(name.rsplit("_", 1)[0], SHARDS) == index
+            for name in shard_files
+            if name.endswith(".tif")
+        )
+
+    result = merge_shards(config)
+    assert result == {"items": 9, "assets": 18, "incomplete_shards": []}
+    catalog = Catalog.from_file(str(tmp_path / "catalog" / "catalog.json"))
+    assert len(list(catalog.get_items())) == 9
+    indexed = CatalogIndex(str(tmp_path / "catalog")).query(bands=["blue"])
+    assert len(indexed) == 9
+    assert all(os.path.exists(row["path"]) for row in indexed)
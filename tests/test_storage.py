@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta, timezone
+
+import dask.array
+import numpy as np
+import pytest
+import rasterio
+from omegaconf import DictConfig
+from pystac import Asset, Item
+from rasterio.transform import from_origin
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window
+
+from eo_data_pipeline.data_access.access_layer import DataAccessLayer
+from eo_data_pipeline.data_loader.loader import DataLoader
+
+TRANSFORM = from_origin(400000, 5100000, 10, 10)
+
+
+def write_scene(path, value=None):
+    data = np.arange(3 * 512 * 512, dtype="uint16").reshape(3, 512, 512)
+    if value is not None:
+        data[:] = value
+    profile = {
+        "driver": "GTiff",
+        "dtype": "uint16",
+        "count": 3,
+        "width": 512,
+        "height": 512,
+        "crs": "EPSG:32633",
+        "transform": TRANSFORM,
+        "tiled": True,
+        "blockxsize": 128,
+        "blockysize": 128,
+    }
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(data)
+        dst.build_overviews([2, 4])
+    return data
+
+
+@pytest.fixture
+def scene(tmp_path):
+    path = tmp_path / "scene.tif"
+    return str(path), write_scene(path)
+
+
+def test_load_data_full(scene):
+    path, data = scene
+    np.testing.assert_array_equal(DataAccessLayer(path).load_data(), data)
+
+
+def test_load_data_window_and_bands(scene):
+    path, data = scene
+    access = DataAccessLayer(path)
+
+    subset = access.load_data(window=Window(10, 20, 30, 40), bands=[2])
+
+    np.testing.assert_array_equal(subset, data[1:2, 20:60, 10:40])
+    assert access.transform.c == 400000 + 10 * 10
+
+
+def test_load_data_overview_level(scene):
+    path, _ = scene
+    assert DataAccessLayer(path).load_data(overview_level=1).shape == (3, 128, 128)
+
+
+def test_open_lazy_is_dask_backed(scene):
+    path, data = scene
+
+    array = DataAccessLayer(path).open_lazy(
+        chunks={"x": 128, "y": 128}, window=Window(0, 0, 256, 128), bands=[1, 3]
+    )
+
+    assert isinstance(array.data, dask.array.Array)
+    assert array.shape == (2, 128, 256)
+    np.testing.assert_array_equal(array.values, data[[0, 2], :128, :256])
+
+
+def test_open_lazy_bbox(scene):
+    path, _ = scene
+    bounds = (400000 + 1000, 5100000 - 2000, 400000 + 1500, 5100000 - 1000)
+    bbox = transform_bounds("EPSG:32633", "EPSG:4326", *bounds)
+
+    array = DataAccessLayer(path).open_lazy(bbox=bbox)
+
+    # Reprojecting the box grows it by at most a few pixels
+    assert 50 <= array.sizes["x"] <= 55
+    assert 100 <= array.sizes["y"] <= 106
+
+
+def test_open_stack_from_catalog(tmp_path):
+    storage = tmp_path / "raw"
+    storage.mkdir()
+    catalog_path = tmp_path / "catalog"
+    items = []
+    for i in range(3):
+        item = Item(
+            id=f"item_{i}",
+            geometry={"type": "Point", "coordinates": [14.0, 46.0]},
+            bbox=[14.0, 46.0, 14.0, 46.0],
+            datetime=datetime(2023, 1, 10, tzinfo=timezone.utc) - timedelta(days=i),
+            properties={},
+        )
+        item.add_asset("blue", Asset(href="http://example.com/blue.tif"))
+        write_scene(storage / f"item_{i}_blue.tif", value=i)
+        items.append(item)
+    loader = DataLoader(
+        DictConfig(
+            {"storage": {"path": str(storage), "catalog_path": str(catalog_path)}}
+        )
+    )
+    loader.save_metadata(items)
+
+    stack = DataAccessLayer.open_stack(
+        str(catalog_path), str(storage), "blue", chunks={"x": 256, "y": 256}
+    )
+
+    assert isinstance(stack.data, dask.array.Array)
+    assert stack.dims == ("time", "band", "y", "x")
+    assert list(stack["item_id"].values) == ["item_2", "item_1", "item_0"]
+    assert int(stack.isel(time=0, band=0, x=0, y=0)) == 2
+
+
+def test_open_stack_missing_band(tmp_path):
+    catalog_path = tmp_path / "catalog"
+    loader = DataLoader(
+        DictConfig(
+            {"storage": {"path": str(tmp_path), "catalog_path": str(catalog_path)}}
+        )
+    )
+    loader.save_metadata([])
+
+    with pytest.raises(ValueError, match="No files found"):
+        DataAccessLayer.open_stack(str(catalog_path), str(tmp_path), "blue")
+
+
+def test_query_saved_files(tmp_path):
+    storage = tmp_path / "raw"
+    catalog_path = tmp_path / "catalog"
+    item = Item(
+        id="item_0",
+        geometry=None,
+        bbox=[14.0, 46.0, 15.0, 47.0],
+        datetime=datetime(2023, 1, 10, tzinfo=timezone.utc),
+        properties={},
+    )
+    item.add_asset("blue", Asset(href="http://example.com/blue.tif"))
+    loader = DataLoader(
+        DictConfig(
+            {"storage": {"path": str(storage), "catalog_path": str(catalog_path)}}
+        )
+    )
+    loader.save_metadata([item])
+    loader.download_asset = lambda url, file_path: 0
+    loader.load_data([item], ["blue"])
+
+    rows = DataAccessLayer.query(
+        str(catalog_path),
+        bbox=[14.5, 46.5, 14.6, 46.6],
+        time_range=("2023-01-10", "2023-01-10"),
+    )
+
+    assert [row["path"] for row in rows] == [str(storage / "item_0_blue.tif")]
+    assert DataAccessLayer.query(str(catalog_path), bands=["nir"]) == []
@@ -0,0 +1,227 @@
+import asyncio
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from omegaconf import DictConfig
+from pystac import Asset, Item
+
+from eo_data_pipeline.data_loader.downloader import DownloadError
+from eo_data_pipeline.data_loader.loader import DataLoader
+from eo_data_pipeline.data_loader.transfer import (
+    AdaptiveConcurrency,
+    TokenBucket,
+    TransferEngine,
+    backoff_delay,
+    retry_after,
+)
+from eo_data_pipeline.testing.servers import LocalAssetServer
+
+
+@pytest.fixture
+def remote(tmp_path):
+    root = tmp_path / "remote"
+    root.mkdir()
+    for i in range(24):
+        (root / f"B{i:02d}.tif").write_bytes(os.urandom(64 * 1024 + i))
+    return root
+
+
+@pytest.fixture
+def engine():
+    engine = TransferEngine(max_retries=8, backoff_base=0.01, backoff_max=1.0)
+    yield engine
+    engine.close()
+
+
+def download_all(engine, server, tmp_path, names):
+    target = tmp_path / "local"
+    target.mkdir(exist_ok=True)
+    # Many threads hand their transfers to the engine at once
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        return list(
+            pool.map(
+                lambda name: engine.download(server.url_for(name), str(target / name)),
+                names,
+            )
+        )
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    rng = random.Random(0)
+    delays = [backoff_delay(3, 0.5, 30, rng) for _ in range(1000)]
+    assert 0 <= min(delays) and max(delays) <= 4
+    assert len(set(delays)) == 1000
+    assert max(backoff_delay(20, 0.5, 30, rng) for _ in range(100)) <= 30
+
+
+def test_retry_after():
+    assert retry_after({"Retry-After": "2"}) == 2
+    assert retry_after({"Retry-After": "0.25"}) == 0.25
+    when = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < retry_after({"Retry-After": format_datetime(when, usegmt=True)}) <= 30
+    assert retry_after({"Retry-After": "soon"}) is None
+    assert retry_after({}) is None
+
+
+def test_token_bucket_limits_rate():
+    async def run():
+        bucket = TokenBucket(rate=20, burst=1)
+        start = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # The first token is available at once, the others 50 ms apart
+    assert 0.22 < asyncio.run(run()) < 1.0
+
+
+def test_adaptive_concurrency_aimd():
+    async def run():
+        limit = AdaptiveConcurrency(initial=4, maximum=8, latency_target=1.0)
+        starts = [await limit.acquire() for _ in range(4)]
+
+        # Saturated: each response adds 1 / limit
+        limit.on_response(starts[0], 0.1)
+        assert limit.limit == pytest.approx(4.25)
+
+        # A throttled response halves the limit once per round of requests
+        limit.on_response(starts[1], 0.1, throttled=True)
+        limit.on_response(starts[2], 0.1, throttled=True)
+        assert limit.limit == pytest.approx(2.125)
+        assert limit.decreases == 1
+
+        for _ in range(4):
+            await limit.release()
+        # Not saturated: no growth
+        started = await limit.acquire()
+        limit.on_response(started, 0.1)
+        assert limit.limit == pytest.approx(2.125)
+
+        # Requests started after the decrease may decrease it again, e.g. when slow
+        limit.on_response(started, 2.0)
+        assert limit.limit == 1.0625
+        assert limit.decreases == 2
+
+    asyncio.run(run())
+
+
+def test_adaptive_latency_threshold():
+    limit = AdaptiveConcurrency(latency_tolerance=4)
+    assert limit.latency_threshold == float("inf")
+    limit.on_response(0, 0.1)
+    limit.on_response(0, 0.2)
+    assert limit.min_latency == 0.1
+    assert limit.latency_threshold == pytest.approx(0.4)
+
+
+def test_download(remote, tmp_path, engine):
+    with LocalAssetServer(str(remote)) as server:
+        file_path = str(tmp_path / "B00.tif")
+        transferred = engine.download(server.url_for("B00.tif"), file_path)
+        headers = engine.head(server.url_for("B00.tif"))
+
+    expected = (remote / "B00.tif").read_bytes()
+    assert open(file_path, "rb").read() == expected
+    assert transferred == len(expected)
+    assert headers["content-length"] == str(len(expected))
+    assert not os.path.exists(file_path + ".part")
+
+
+def test_download_resumes_partial_file(remote, tmp_path, engine):
+    expected = (remote / "B01.tif").read_bytes()
+    file_path = str(tmp_path / "B01.tif")
+    with open(file_path + ".part", "wb") as f:
+        f.write(expected[:1000])
+
+    with LocalAssetServer(str(remote)) as server:
+        transferred = engine.download(server.url_for("B01.tif"), file_path)
+
+    assert open(file_path, "rb").read() == expected
+    assert transferred == len(expected) - 1000
+    assert server.requests[-1][2] == "bytes=1000-"
+
+
+def test_missing_asset_is_not_retried(remote, tmp_path, engine):
+    with LocalAssetServer(str(remote)) as server:
+        with pytest.raises(DownloadError):
+            engine.download(server.url_for("missing.tif"), str(tmp_path / "m.tif"))
+    assert len(server.requests) == 1
+
+
+def test_timeouts_are_retried_then_fail(remote, tmp_path):
+    engine = TransferEngine(max_retries=2, backoff_base=0.01, timeout=0.1)
+    with LocalAssetServer(str(remote), latency=0.5) as server:
+        with pytest.raises(DownloadError, match="after 3 attempts"):
+            engine.download(server.url_for("B00.tif"), str(tmp_path / "B00.tif"))
+    engine.close()
+    assert len(server.requests) == 3
+
+
+def test_adapts_to_concurrency_throttling(remote, tmp_path, engine):
+    names = sorted(os.listdir(remote))
+    with LocalAssetServer(str(remote), latency=0.02, max_concurrent=3) as server:
+        host = server.url.split("//")[1]
+        download_all(engine, server, tmp_path, names)
+
+    for name in names:
+        assert (tmp_path / "local" / name).read_bytes() == (remote / name).read_bytes()
+    assert server.throttled > 0
+    # The limit started above what the server accepts and was brought down
+    assert engine.hosts[host].decreases >= 1
+    # Most requests were not throttled
+    assert server.throttled < len(names)
+
+
+def test_rate_limit_avoids_throttling(remote, tmp_path):
+    names = sorted(os.listdir(remote))[:12]
+    engine = TransferEngine(rate=8, burst=5, backoff_base=0.01)
+    with LocalAssetServer(str(remote), max_rate=10) as server:
+        download_all(engine, server, tmp_path, names)
+    engine.close()
+    assert server.throttled == 0
+
+
+def test_retries_rate_throttling(remote, tmp_path):
+    names = sorted(os.listdir(remote))
+    # Without a configured rate, about every other request is throttled
+    engine = TransferEngine(max_retries=20, backoff_base=0.01, backoff_max=1.0)
+    with LocalAssetServer(str(remote), max_rate=10) as server:
+        download_all(engine, server, tmp_path, names)
+    engine.close()
+
+    assert server.throttled > 0
+    for name in names:
+        assert (tmp_path / "local" / name).read_bytes() == (remote / name).read_bytes()
+
+
+def test_data_loader_uses_engine(remote, tmp_path):
+    config = DictConfig(
+        {
+            "storage": {
+                "path": str(tmp_path / "raw"),
+                "catalog_path": str(tmp_path / "catalog"),
+                "index": False,
+            },
+            "transfer": {"enabled": True, "max_per_host": 8, "backoff_base": 0.01},
+        }
+    )
+    loader = DataLoader(config)
+    assert isinstance(loader.downloader, TransferEngine)
+    assert loader.max_concurrent_downloads == 8
+
+    with LocalAssetServer(str(remote), max_concurrent=2) as server:
+        items = []
+        for i in range(4):
+            item = Item(f"scene_{i}", None, None, datetime(2023, 1, 1), {})
+            item.add_asset("blue", Asset(server.url_for(f"B{i:02d}.tif")))
+            items.append(item)
+        saved_files = loader.load_data(items, ["blue"])
+    loader.downloader.close()
+
+    assert len(saved_files) == 4
+    assert all(result.status == "downloaded" for result in loader.download_results)